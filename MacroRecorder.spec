@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('plugins', 'plugins')],
-    hiddenimports=[],
+    hiddenimports=['gui', 'engine.cli'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -16,6 +16,7 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# Окно без консоли: для двойного щелчка
 exe = EXE(
     pyz,
     a.scripts,
@@ -37,3 +38,26 @@ exe = EXE(
     entitlements_file=None,
     icon=['icon.ico'],
 )
+
+# Та же программа с консолью: команды recorder.py (play, record, info...) печатают вывод
+cli_exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='MacroRecorderCLI',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['icon.ico'],
+)
@@ -0,0 +1,83 @@
+"""Общее для бенчмарков: лучший из прогонов и сравнение с базой"""
+import json
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines.json')
+# Допуск относительно базы и абсолютный запас для шумных микросекундных метрик
+TOLERANCE = 0.4
+SLACK_US = 500
+# Прогонов всего набора: на общей машине единичный прогон слишком шумный
+RUNS = 3
+
+# Метрики, для которых больше - лучше; у остальных лучше меньше
+HIGHER_IS_BETTER = ('throughput',)
+# Справочные метрики, по которым регрессии не ищутся. Сдвиг меток при захвате
+# зависит от того, как ОС делит GIL между генератором и опросом, и слишком шумный
+INFORMATIONAL = ('compile_ms_', 'overflow_', 'skew_')
+
+
+def best_of(runs):
+    """Лучшее значение каждой метрики по нескольким прогонам набора"""
+    best = {}
+    for results in runs:
+        for name, value in results.items():
+            if name not in best:
+                best[name] = value
+            elif name.startswith(HIGHER_IS_BETTER):
+                best[name] = max(best[name], value)
+            else:
+                best[name] = min(best[name], value)
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно базы"""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base is None or name.startswith(INFORMATIONAL):
+            continue
+        if name.startswith(HIGHER_IS_BETTER):
+            if value < base * (1 - tolerance):
+                regressions.append(f"{name}: {value:,.0f} < базы {base:,.0f}")
+        else:
+            slack = SLACK_US if '_us' in name else SLACK_US / 1000
+            if value > base * (1 + tolerance) + slack:
+                regressions.append(f"{name}: {value:,.2f} > базы {base:,.2f}")
+    return regressions
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument('--save-baseline', action='store_true', help="записать результаты как базу")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--runs', type=int, default=RUNS,
+                        help="прогонов набора; берется лучший результат по каждой метрике")
+
+
+def check_baseline(args, section, results):
+    """Сохраняет или сравнивает раздел baselines.json -> код выхода"""
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[section] = results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2)
+        print(f"База сохранена в {args.baseline}")
+        return 0
+
+    if section not in baselines:
+        print("Базы нет: запустите с --save-baseline")
+        return 0
+    regressions = compare(results, baselines[section], args.tolerance)
+    if regressions:
+        print("Регрессии:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("Регрессий нет")
+    return 0
@@ -0,0 +1,253 @@
+"""Бенчмарк записи: синтетический генератор ввода без дисплея.
+
+Генератор вызывает колбэки InputHub (on_click, on_press, on_release,
+on_move) из своего потока, как это делают слушатели pynput; хаб
+раздает их сессии записи и прореженному подписчику строки состояния,
+как в GUI. Второй поток раз в CAPTURE_DRAIN_MS забирает события, как GUI-поток.
+Замеряются стоимость колбэка, сдвиг меток времени при отставании,
+потери при переполнении буфера, задержка до хранилища, время, на
+которое опрос занимает GUI-поток, и память на событие.
+
+    python benchmarks/bench_capture.py --quick
+    python benchmarks/bench_capture.py --pattern clicks --rate 50000 --duration 2 --runs 1
+    python benchmarks/bench_capture.py --save-baseline
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.input_hub import InputHub
+from engine.recording import RecordingSession, CAPTURE_DRAIN_BATCH, CAPTURE_DRAIN_MS
+from benchmarks._common import add_baseline_arguments, best_of, check_baseline
+
+PATTERNS = ('clicks', 'typing', 'moves')
+# 0 - без ограничения: генератор вызывает колбэки так быстро, как может
+RATES = (1_000, 10_000, 0)
+DURATION = 1.0
+QUICK_DURATION = 0.3
+# Сколько событий генерировать для замера памяти
+MEMORY_EVENTS = 50_000
+# Буквы для набора; 'q' останавливает запись, поэтому ее нет
+TYPING_KEYS = 'asdfghjklzxcvbnm'
+# В пачке набора столько клавиш подряд, дальше пауза
+TYPING_BURST = 20
+
+
+class _Button:
+    def __init__(self, name):
+        self.name = name
+
+
+class _Key:
+    def __init__(self, char):
+        self.char = char
+
+
+LEFT = _Button('left')
+KEYS = [_Key(c) for c in TYPING_KEYS]
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+
+def make_injector(source, pattern):
+    """Функция i -> вызывает колбэки source (хаба или сессии) для i-го входного события;
+    возвращает число событий"""
+    if pattern == 'clicks':
+        def inject(i):
+            x, y = i % 1920, i % 1080
+            source.on_click(x, y, LEFT, True)
+            source.on_click(x, y, LEFT, False)
+            return 1
+    elif pattern == 'typing':
+        def inject(i):
+            key = KEYS[i % len(KEYS)]
+            source.on_press(key)
+            source.on_release(key)
+            return 2
+    else:
+        def inject(i):
+            angle = i * 0.01
+            source.on_move(round(960 + 300 * math.cos(angle)), round(540 + 300 * math.sin(angle)))
+            return 1
+    return inject
+
+
+def _burst_pause(pattern, i, period):
+    """У набора после пачки клавиш пауза длиной в пачку"""
+    if pattern == 'typing' and period:
+        return (i // TYPING_BURST) * TYPING_BURST * period
+    return 0.0
+
+
+def run_capture(pattern, rate, duration, journal_dir):
+    """Один прогон: генератор и опрос параллельно -> метрики"""
+    # Хуки хаба не запускаются: события подает генератор
+    hub = InputHub()
+    hub.subscribe(on_move=lambda x, y: None, move_interval=0.1)
+    session = RecordingSession(record_moves=True, use_journal=journal_dir is not None,
+                               journal_dir=journal_dir or '', resolution=(1920, 1080), hub=hub)
+    session.start()
+    inject = make_injector(hub, pattern)
+    period = 1.0 / rate if rate else 0.0
+
+    done = threading.Event()
+    stalls = []
+    delays = []
+
+    def drain():
+        # Эмуляция GUI-потока: root.after(CAPTURE_DRAIN_MS, drain_capture)
+        while True:
+            finished = done.is_set()
+            started = time.perf_counter()
+            batch, _, _ = session.poll(CAPTURE_DRAIN_BATCH)
+            now_wall = time.time()
+            stalls.append(time.perf_counter() - started)
+            delays.extend(now_wall - event['time'] for event in batch)
+            if finished and not len(session.capture):
+                return
+            time.sleep(CAPTURE_DRAIN_MS / 1000)
+
+    consumer = threading.Thread(target=drain, name="drain")
+    consumer.start()
+
+    costs = []
+    scheduled = []
+    injected = 0
+    perf_start = time.perf_counter()
+    wall_start = time.time()
+    end = perf_start + duration
+    i = 0
+    while True:
+        now = time.perf_counter()
+        if now >= end:
+            break
+        due = perf_start + i * period + _burst_pause(pattern, i, period)
+        if due > now:
+            if due - now > 0.001:
+                time.sleep(due - now - 0.0005)
+            continue
+        call_start = time.perf_counter_ns()
+        injected += inject(i)
+        costs.append(time.perf_counter_ns() - call_start)
+        if period and pattern != 'moves':
+            scheduled.append(wall_start + (due - perf_start))
+        i += 1
+    elapsed = time.perf_counter() - perf_start
+
+    done.set()
+    consumer.join()
+    session.stop()
+    if session.journal:
+        session.journal.discard()
+
+    # Сдвиг метки: насколько позже расписания колбэк поставил время
+    kind = 'click' if pattern == 'clicks' else 'key_press'
+    stamps = [event['time'] for event in session.events if event['type'] == kind]
+    skews = [stamp - due for stamp, due in zip(stamps, scheduled)]
+
+    name = f"{pattern}_{rate or 'max'}"
+    metrics = {
+        f'throughput_{name}': injected / elapsed,
+        f'callback_p99_us_{name}': _percentile(costs, 99) / 1000,
+        f'drain_stall_p99_ms_{name}': _percentile(stalls, 99) * 1000,
+    }
+    # Без ограничения скорости генератор заведомо обгоняет опрос: потери там справочные
+    metrics[f'overflow_{name}' if not rate else f'dropped_{name}'] = session.capture.dropped
+    # Непрерывное движение сжимается в один штрих, который выдается только при остановке
+    if delays:
+        metrics[f'store_delay_p99_ms_{name}'] = _percentile(delays, 99) * 1000
+    if skews:
+        metrics[f'skew_p90_us_{name}'] = _percentile(skews, 90) * 1e6
+    line = (f"  {name:>14}: {injected / elapsed:>10,.0f} соб/с, колбэк p99 "
+            f"{metrics[f'callback_p99_us_{name}']:.1f} мкс, опрос p99 "
+            f"{metrics[f'drain_stall_p99_ms_{name}']:.2f} мс, потеряно {session.capture.dropped}")
+    if delays:
+        line += f", до хранилища p99 {metrics[f'store_delay_p99_ms_{name}']:.1f} мс"
+    if skews:
+        line += f", сдвиг меток p90 {metrics[f'skew_p90_us_{name}']:.0f} мкс"
+    print(line)
+    return metrics
+
+
+def measure_memory(pattern, count, journal_dir):
+    """Прирост памяти на входное событие (tracemalloc замедляет, поэтому отдельно)"""
+    session = RecordingSession(record_moves=True, use_journal=journal_dir is not None,
+                               journal_dir=journal_dir or '', resolution=(1920, 1080))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    session.start(listen=False)
+    inject = make_injector(session, pattern)
+    injected = 0
+    for i in range(count):
+        injected += inject(i)
+        if not i % 1000:
+            session.poll(CAPTURE_DRAIN_BATCH)
+    session.stop()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    if session.journal:
+        session.journal.discard()
+    per_event = (after - before) / injected
+    print(f"  {pattern:>14}: {injected} входных -> {len(session.events)} записанных, "
+          f"{per_event:.1f} байт на входное событие")
+    return {f'bytes_per_event_{pattern}': per_event}
+
+
+def run_suite(patterns, rates, duration, journal_dir):
+    results = {}
+    print("Захват:")
+    for pattern in patterns:
+        for rate in rates:
+            results.update(run_capture(pattern, rate, duration, journal_dir))
+    print("Память:")
+    for pattern in patterns:
+        results.update(measure_memory(pattern, MEMORY_EVENTS, journal_dir))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк записи")
+    parser.add_argument('--quick', action='store_true', help="короткие прогоны")
+    parser.add_argument('--pattern', choices=PATTERNS, action='append',
+                        help="шаблон ввода (можно несколько раз); по умолчанию все")
+    parser.add_argument('--rate', type=int, action='append',
+                        help="событий в секунду, 0 - без ограничения (можно несколько раз)")
+    parser.add_argument('--duration', type=float, help="секунд на прогон")
+    parser.add_argument('--no-journal', action='store_true', help="без журнала на диске")
+    add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    patterns = args.pattern or PATTERNS
+    rates = args.rate or RATES
+    duration = args.duration or (QUICK_DURATION if args.quick else DURATION)
+    custom = args.pattern or args.rate or args.duration
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_dir = None if args.no_journal else os.path.join(tmp, 'journal')
+        runs = []
+        for number in range(args.runs):
+            print(f"=== Прогон {number + 1}/{args.runs}")
+            runs.append(run_suite(patterns, rates, duration, journal_dir))
+    results = best_of(runs)
+
+    if custom and not args.save_baseline:
+        # Нестандартный набор с базой не сравниваем
+        return 0
+    return check_baseline(args, 'capture', results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
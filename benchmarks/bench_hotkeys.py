@@ -0,0 +1,117 @@
+"""Бенчмарк горячих клавиш: от нажатия до первого ввода.
+
+Слушатель pynput не нужен: HotkeyManager.trigger() вызывается из
+отдельного потока так же, как его вызывает колбэк слушателя, а
+контроллеры подменяются RecordingBackend. Макросы компилируются заранее,
+как в prepare(). Замеряется задержка от нажатия до первого выполненного
+шага для каждой политики, с заранее запущенным потоком планировщика и
+без него (холодный старт), и при уже играющих фоновых дорожках.
+
+    python benchmarks/bench_hotkeys.py --quick
+    python benchmarks/bench_hotkeys.py --save-baseline
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.backend import RecordingBackend
+from engine.hotkeys import (Binding, HotkeyManager, HOTKEY_POLICIES, POLICY_RESTART,
+                            TRIGGER_BUDGET_US)
+from engine.plan import compile_plan
+from engine.tracks import TrackScheduler
+from benchmarks._common import add_baseline_arguments, best_of, check_baseline
+
+TRIGGERS = 200
+QUICK_TRIGGERS = 50
+# Пауза между нажатиями: макрос успевает доиграть
+PAUSE = 0.01
+# Сколько фоновых дорожек играет во время нажатий
+BACKGROUND_TRACKS = 4
+
+
+def short_macro():
+    """Три клавиши подряд: покупка/комбо, как в пресетах"""
+    return compile_plan({'type': 'key_press', 'key': key, 'time': i * 0.001}
+                        for i, key in enumerate('123'))
+
+
+def background_macro():
+    return compile_plan({'type': 'key_press', 'key': 'a', 'time': i * 0.002} for i in range(1000))
+
+
+def press(manager, binding, count):
+    """Нажатия из отдельного потока, как из колбэка слушателя -> [(нажатие, дорожка)]"""
+    presses = []
+
+    def run():
+        for _ in range(count):
+            pressed_ns = time.perf_counter_ns()
+            presses.append((pressed_ns, manager.trigger(binding, pressed_ns)))
+            time.sleep(PAUSE)
+    thread = threading.Thread(target=run, name="listener")
+    thread.start()
+    thread.join()
+    return presses
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+
+def bench_trigger(policy, count, keep_alive=True, background=0):
+    scheduler = TrackScheduler(backend=RecordingBackend(keep_calls=False), keep_alive=keep_alive)
+    binding = Binding('<ctrl>+1', 'bench', policy)
+    binding.plan = short_macro()
+    manager = HotkeyManager(scheduler, [binding])
+    scheduler.prepare()
+    tracks = [scheduler.add(background_macro(), loop=True) for _ in range(background)]
+    presses = press(manager, binding, count)
+    for track in tracks:
+        track.stop()
+    scheduler.close()
+    scheduler.join()
+    # Точные значения по дорожкам: гистограмма менеджера округляет до корзины
+    latencies = [(track.first_step_ns - pressed_ns) / 1000 for pressed_ns, track in presses
+                 if track is not None and track.first_step_ns]
+    return percentile(latencies, 50), percentile(latencies, 99)
+
+
+def run_suite(triggers):
+    results = {}
+    print("Задержка от нажатия до первого ввода:")
+    cases = [(policy, True, 0) for policy in HOTKEY_POLICIES]
+    cases += [(POLICY_RESTART, False, 0), (POLICY_RESTART, True, BACKGROUND_TRACKS)]
+    for policy, keep_alive, background in cases:
+        name = policy if keep_alive else f'{policy}_cold'
+        if background:
+            name += f'_bg{background}'
+        p50, p99 = bench_trigger(policy, triggers, keep_alive, background)
+        mark = "" if p99 <= TRIGGER_BUDGET_US else f"  > бюджета {TRIGGER_BUDGET_US} мкс"
+        print(f"  {name:>16}: p50 {p50:6.0f} мкс, p99 {p99:6.0f} мкс{mark}")
+        results[f'trigger_p50_us_{name}'] = p50
+        results[f'trigger_p99_us_{name}'] = p99
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк горячих клавиш")
+    parser.add_argument('--quick', action='store_true', help="меньше нажатий")
+    add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for number in range(args.runs):
+        print(f"=== Прогон {number + 1}/{args.runs}")
+        runs.append(run_suite(QUICK_TRIGGERS if args.quick else TRIGGERS))
+    results = best_of(runs)
+    return check_baseline(args, 'hotkeys', results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
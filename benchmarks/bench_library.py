@@ -0,0 +1,89 @@
+"""Бенчмарк библиотеки макросов: открытие папки с индексом и без него.
+
+Во временной папке создаются макросы (поровну .mrec и .json) по
+EVENTS событий. Замеряются первая индексация, открытие уже
+проиндексированной библиотеки (проверка mtime + запрос) и поиск. Для
+сравнения печатается, сколько стоит прочитать метаданные прежним способом
+- разобрав каждый файл целиком.
+
+    python benchmarks/bench_library.py --quick
+    python benchmarks/bench_library.py --save-baseline
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.event_store import EventStore
+from engine.library import MacroLibrary
+from engine.macro_file import load_macro_file, save_macro_file
+from benchmarks._common import add_baseline_arguments, best_of, check_baseline
+
+FILE_COUNTS = (50, 200)
+QUICK_FILE_COUNTS = (50,)
+EVENTS = 5_000
+GAMES = ('CS2', 'Dota 2', 'OSU!', 'Blade&Soul')
+
+
+def make_library(directory, count):
+    store = EventStore.from_dicts({'type': 'click', 'x': i % 1920, 'y': i % 1080, 'button': 'left',
+                                   'time': i * 0.01} for i in range(EVENTS))
+    for i in range(count):
+        extension = '.mrec' if i % 2 else '.json'
+        metadata = {'name': f"macro {i}", 'game': GAMES[i % len(GAMES)], 'created': "2026-01-01"}
+        save_macro_file(os.path.join(directory, f"macro_{i}{extension}"), store, metadata)
+
+
+def timed_ms(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def open_library(directory):
+    with MacroLibrary(directory) as library:
+        library.scan()
+        return len(library.search())
+
+
+def run_suite(counts):
+    results = {}
+    for count in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            make_library(directory, count)
+            with MacroLibrary(directory) as library:
+                index_ms, _ = timed_ms(library.scan)
+            open_ms, found = timed_ms(lambda: open_library(directory))
+            assert found == count
+            with MacroLibrary(directory) as library:
+                search_ms, _ = timed_ms(lambda: library.search("1", game='CS2'))
+            paths = [os.path.join(directory, name) for name in os.listdir(directory)
+                     if not name.startswith('.')]
+            full_ms, _ = timed_ms(lambda: [load_macro_file(path) for path in paths])
+        print(f"  {count:>4} файлов: индексация {index_ms:7.1f} мс, открытие {open_ms:6.1f} мс, "
+              f"поиск {search_ms:5.2f} мс; полный разбор всех файлов {full_ms:7.1f} мс")
+        results[f'index_ms_{count}'] = index_ms
+        results[f'open_ms_{count}'] = open_ms
+        results[f'search_ms_{count}'] = search_ms
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк библиотеки макросов")
+    parser.add_argument('--quick', action='store_true', help="только маленькая папка")
+    add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for number in range(args.runs):
+        print(f"=== Прогон {number + 1}/{args.runs}")
+        runs.append(run_suite(QUICK_FILE_COUNTS if args.quick else FILE_COUNTS))
+    results = best_of(runs)
+    return check_baseline(args, 'library', results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Бенчмарк воспроизведения без дисплея.
+
+Планы играются так же, как в приложении: задачей play() в Runtime на
+TrackScheduler с заранее поднятым потоком. Контроллеры pynput
+подменяются RecordingBackend, поэтому скрипт работает на headless Linux.
+Замеряются пропускная способность (событий/с),
+перцентили опоздания планировщика, дрейф между циклами, задержка
+остановки и точность при нескольких дорожках на одном потоке.
+Результаты сравниваются с baselines.json.
+
+    python benchmarks/bench_playback.py            # полный прогон, сравнение с базой
+    python benchmarks/bench_playback.py --quick    # до 100k событий
+    python benchmarks/bench_playback.py --save-baseline
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+
+# Без X-сервера pynput импортируется только с заглушкой; контроллеры все равно подменяются
+os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.backend import RecordingBackend
+from engine.plan import compile_plan
+from engine.runtime import Runtime, play
+from engine.scheduler import TimingReport
+from engine.tracks import Track, TrackScheduler
+from benchmarks._common import add_baseline_arguments, best_of, check_baseline
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (10, 100, 1_000, 10_000, 100_000)
+TRACK_COUNTS = (1, 4, 16)
+# Сколько раз повторять короткие прогоны пропускной способности
+REPEATS = 10
+
+
+def synthetic_events(count, step=0.0):
+    """Смесь кликов и клавиш; step - интервал между событиями в секундах"""
+    kinds = (
+        lambda i: {'type': 'click', 'x': i % 1920, 'y': i % 1080, 'button': 'left'},
+        lambda i: {'type': 'key_press', 'key': 'a'},
+        lambda i: {'type': 'key_press', 'key': 'Key.enter'},
+    )
+    for i in range(count):
+        event = kinds[i % 3](i)
+        event['time'] = i * step
+        yield event
+
+
+@functools.lru_cache(maxsize=None)
+def compiled(count, step=0.0):
+    """План синтетического макроса -> (plan, секунды компиляции); компилируется один раз"""
+    started = time.perf_counter()
+    plan = compile_plan(synthetic_events(count, step))
+    return plan, time.perf_counter() - started
+
+
+class Bench:
+    """Runtime и TrackScheduler с заглушкой, общие для всего прогона"""
+
+    def __init__(self):
+        self.backend = RecordingBackend(keep_calls=False)
+        self.scheduler = TrackScheduler(backend=self.backend, keep_alive=True)
+        self.scheduler.prepare()
+        self.runtime = Runtime()
+        self.runtime.start()
+
+    def close(self):
+        self.runtime.close()
+        self.scheduler.close()
+        self.scheduler.join()
+
+    def spawn(self, track):
+        """Запускает дорожку задачей play() -> Future; возвращается, когда дорожка добавлена"""
+        started = threading.Event()
+        future = self.runtime.spawn(play(self.scheduler, track, on_started=lambda _: started.set()))
+        started.wait()
+        return future
+
+    def play(self, plan, loops=1, keep_samples=None, **options):
+        """Проигрывает план до конца -> (дорожка, секунды)"""
+        track = Track(plan, loop=loops != 1, loops=loops, **options)
+        track.report = TimingReport(keep=keep_samples)
+        self.backend.count = 0
+        started = time.perf_counter()
+        self.runtime.spawn(play(self.scheduler, track)).result()
+        return track, time.perf_counter() - started
+
+
+def bench_throughput(bench, sizes):
+    """Все события в один момент: меряется чистая стоимость шага"""
+    results = {}
+    backend = bench.backend
+    for size in sizes:
+        plan, compile_s = compiled(size)
+        # Маленькие макросы гоняем несколько раз и берем лучший: иначе шумно
+        rate = 0.0
+        for _ in range(max(1, min(REPEATS, 200_000 // size))):
+            track, _ = bench.play(plan, keep_samples=1, restore_mouse=False)
+            # От точки отсчета дорожки до последнего шага, без задачи и ее завершения
+            elapsed_ns = max(backend.last_ns - track.origin_ns, 1)
+            rate = max(rate, backend.count / elapsed_ns * 1e9)
+        results[f'throughput_{size}'] = rate
+        results[f'compile_ms_{size}'] = compile_s * 1000
+        print(f"  {size:>9} событий: {rate:>12,.0f} соб/с, компиляция {compile_s * 1000:8.1f} мс")
+    return results
+
+
+def bench_max_rate(bench, count):
+    """Макрос с шагом 1 мс в режиме max_rate: паузы не ждутся совсем"""
+    plan, _ = compiled(count, 0.001)
+    _, elapsed = bench.play(plan, keep_samples=1, max_rate=True, restore_mouse=False)
+    rate = bench.backend.count / elapsed
+    print(f"  {count} событий (записано за {plan.duration_ns / 1e9:.0f} сек): {elapsed * 1000:.0f} мс, {rate:,.0f} соб/с")
+    return {'throughput_max_rate': rate}
+
+
+def bench_jitter(bench, count, step):
+    plan, _ = compiled(count, step)
+    track, _ = bench.play(plan)
+    percentiles = track.report.late_percentiles_us()
+    print("  опоздание: " + ", ".join(f"p{p} {v:.0f} мкс" for p, v in percentiles.items()))
+    return {f'jitter_p{p}_us': v for p, v in percentiles.items()}
+
+
+def bench_drift(bench, count, step, loops):
+    """Сдвиг начала цикла: вторая половина циклов против первой.
+
+    Медианы по половинам отсекают разовые подвисания системы, остается
+    систематический уход шкалы, который копился бы от цикла к циклу.
+    """
+    plan, _ = compiled(count, step)
+    track, _ = bench.play(plan, loops=loops)
+    samples = list(track.report.samples)
+    firsts = [samples[i] for i in range(0, len(samples), len(plan))]
+    lates = [actual - scheduled for scheduled, actual in firsts]
+    # Дедлайны абсолютные, поэтому сама шкала не должна уезжать
+    expected = [track.origin_ns + k * plan.duration_ns for k in range(len(firsts))]
+    drift = [actual - origin for (_, actual), origin in zip(firsts, expected)]
+    half = len(drift) // 2
+    drift_us = abs(statistics.median(drift[half:]) - statistics.median(drift[:half])) / 1000
+    print(f"  {loops} циклов: дрейф {drift_us:.0f} мкс, макс. опоздание начала цикла {max(lates) / 1000:.0f} мкс")
+    return {'drift_us': drift_us}
+
+
+def bench_stop(bench, repeats):
+    """Время от stop() дорожки до завершения ее задачи play()"""
+    plan, _ = compiled(1000, 0.1)
+    latencies = []
+    for _ in range(repeats):
+        track = Track(plan)
+        future = bench.spawn(track)
+        time.sleep(0.05)
+        requested = time.perf_counter()
+        track.stop()
+        future.result()
+        latencies.append((time.perf_counter() - requested) * 1000)
+    print(f"  остановка: медиана {statistics.median(latencies):.2f} мс, макс. {max(latencies):.2f} мс")
+    return {'stop_latency_median_ms': statistics.median(latencies)}
+
+
+def bench_tracks(bench, counts, count):
+    """Несколько дорожек с разным шагом (около 3 мс) на одном TrackScheduler"""
+    results = {}
+    for tracks_count in counts:
+        plans = [compiled(count, 0.003 + i * 0.0001)[0] for i in range(tracks_count)]
+        tracks = [Track(plan, name=str(i)) for i, plan in enumerate(plans)]
+        for future in [bench.spawn(track) for track in tracks]:
+            future.result()
+        # Медиана по дорожкам: одна дорожка, попавшая под подвисание системы, не решает
+        p50 = statistics.median(t.report.late_percentiles_us()[50] for t in tracks)
+        p99 = statistics.median(t.report.late_percentiles_us()[99] for t in tracks)
+        print(f"  {tracks_count:>2} дорожек: опоздание p50 {p50:.0f} мкс, p99 {p99:.0f} мкс")
+        results[f'tracks_p50_us_{tracks_count}'] = p50
+        results[f'tracks_p99_us_{tracks_count}'] = p99
+    return results
+
+
+def run_suite(quick):
+    results = {}
+    bench = Bench()
+    try:
+        print("Пропускная способность:")
+        results.update(bench_throughput(bench, QUICK_SIZES if quick else SIZES))
+        print("Режим максимальной скорости:")
+        results.update(bench_max_rate(bench, 10_000 if quick else 100_000))
+        print("Точность планировщика (1 мс между событиями):")
+        results.update(bench_jitter(bench, 500 if quick else 2000, 0.001))
+        print("Дрейф между циклами:")
+        results.update(bench_drift(bench, 50, 0.002, 10 if quick else 30))
+        print("Задержка остановки:")
+        results.update(bench_stop(bench, 5 if quick else 20))
+        print("Несколько дорожек:")
+        results.update(bench_tracks(bench, TRACK_COUNTS, 100 if quick else 300))
+    finally:
+        bench.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк воспроизведения")
+    parser.add_argument('--quick', action='store_true', help="без макроса на 1M событий")
+    add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for number in range(args.runs):
+        print(f"=== Прогон {number + 1}/{args.runs}")
+        runs.append(run_suite(args.quick))
+    results = best_of(runs)
+    return check_baseline(args, 'playback', results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Бенчмарк управления воспроизведением: через сколько срабатывают стоп и пауза.
+
+Дорожка зажимает клавишу и кликает раз в миллисекунду; контроллеры
+подменяются RecordingBackend, поэтому момент срабатывания виден по его
+вызовам: пауза и стоп отпускают зажатую клавишу, продолжение нажимает ее
+снова. Стоп замеряется двумя путями: TrackScheduler.stop() (кнопка
+"Стоп") и отмена задачи play() в Runtime (закрытие окна, Ctrl+C в CLI).
+
+    python benchmarks/bench_runtime.py --quick
+    python benchmarks/bench_runtime.py --save-baseline
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.backend import RecordingBackend
+from engine.plan import compile_plan
+from engine.runtime import Runtime, play
+from engine.tracks import TrackScheduler
+from benchmarks._common import add_baseline_arguments, best_of, check_baseline
+
+ROUNDS = 100
+QUICK_ROUNDS = 30
+# Сколько дорожка играет до замера
+WARMUP = 0.02
+
+
+def held_macro():
+    """Удержание клавиши на фоне кликов раз в миллисекунду"""
+    events = [{'type': 'key_hold', 'key': 'w', 'time': 0.0, 'duration': 10.0}]
+    events += [{'type': 'click', 'x': i % 100, 'y': 0, 'button': 'left', 'time': i * 0.001}
+               for i in range(1, 10_000)]
+    return compile_plan(events)
+
+
+def wait_call(backend, op, since_ns, timeout=1.0):
+    """Время (perf_counter_ns) первого вызова op после since_ns"""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        for when, name, _ in reversed(backend.calls):
+            if when < since_ns:
+                break
+            if name == op:
+                return when
+        time.sleep(0)
+    raise RuntimeError(f"{op} не дождались")
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+
+def bench_round(runtime, scheduler, backend):
+    """Один запуск -> (пауза, продолжение, стоп) в мкс"""
+    started = threading.Event()
+    session = runtime.spawn(play(scheduler, held_macro(), on_started=lambda track: started.set()))
+    started.wait()
+    time.sleep(WARMUP)
+    track = scheduler.tracks()[0]
+
+    requested = time.perf_counter_ns()
+    track.pause()
+    pause_us = (wait_call(backend, 'release', requested) - requested) / 1000
+    time.sleep(WARMUP)
+    requested = time.perf_counter_ns()
+    track.resume()
+    resume_us = (wait_call(backend, 'press', requested) - requested) / 1000
+    time.sleep(WARMUP)
+    requested = time.perf_counter_ns()
+    scheduler.stop()
+    stop_us = (wait_call(backend, 'release', requested) - requested) / 1000
+    session.result(1.0)
+    return pause_us, resume_us, stop_us
+
+
+def bench_cancel(runtime, scheduler, backend):
+    """Отмена задачи play() -> мкс до отпускания клавиши"""
+    started = threading.Event()
+    session = runtime.spawn(play(scheduler, held_macro(), on_started=lambda track: started.set()))
+    started.wait()
+    time.sleep(WARMUP)
+    requested = time.perf_counter_ns()
+    session.cancel()
+    cancel_us = (wait_call(backend, 'release', requested) - requested) / 1000
+    while scheduler.tracks():
+        time.sleep(0)
+    return cancel_us
+
+
+def run_suite(rounds):
+    backend = RecordingBackend()
+    scheduler = TrackScheduler(backend=backend, keep_alive=True)
+    scheduler.prepare()
+    runtime = Runtime()
+    runtime.start()
+    samples = {'pause': [], 'resume': [], 'stop': [], 'cancel': []}
+    try:
+        for _ in range(rounds):
+            pause_us, resume_us, stop_us = bench_round(runtime, scheduler, backend)
+            samples['pause'].append(pause_us)
+            samples['resume'].append(resume_us)
+            samples['stop'].append(stop_us)
+            samples['cancel'].append(bench_cancel(runtime, scheduler, backend))
+            backend.calls.clear()
+    finally:
+        runtime.close()
+        scheduler.close()
+        scheduler.join()
+    results = {}
+    print("Задержка от команды до отпускания/нажатия клавиши:")
+    for name, values in samples.items():
+        p50, p99 = percentile(values, 50), percentile(values, 99)
+        print(f"  {name:>7}: p50 {p50:6.0f} мкс, p99 {p99:6.0f} мкс")
+        results[f'{name}_p50_us'] = p50
+        results[f'{name}_p99_us'] = p99
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк стопа и паузы")
+    parser.add_argument('--quick', action='store_true', help="меньше запусков")
+    add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for number in range(args.runs):
+        print(f"=== Прогон {number + 1}/{args.runs}")
+        runs.append(run_suite(QUICK_ROUNDS if args.quick else ROUNDS))
+    results = best_of(runs)
+    return check_baseline(args, 'runtime', results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
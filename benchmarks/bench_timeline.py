@@ -0,0 +1,86 @@
+"""Бенчмарк редактора: правки шкалы на больших записях.
+
+Замеряется средняя стоимость правки (вырезать + вставить + сменить темп)
+на записях разного размера: она должна зависеть от числа правок, а не
+событий. Отдельно - отмена и сборка правленого макроса в EventStore
+(to_store, один раз перед воспроизведением или сохранением).
+
+    python benchmarks/bench_timeline.py --quick
+    python benchmarks/bench_timeline.py --save-baseline
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.event_store import EventStore
+from engine.timeline import Timeline
+from benchmarks._common import add_baseline_arguments, best_of, check_baseline
+
+SIZES = (100_000, 1_000_000, 3_000_000)
+QUICK_SIZES = (100_000, 1_000_000)
+EDITS = 200
+
+
+def synthetic_store(count):
+    """Клики раз в миллисекунду; колонки заполняются пачкой, как при чтении .mrec"""
+    store = EventStore()
+    store.extend_columns(['click'], [None, 'left'], array('B', bytes(count)),
+                         array('d', (i * 0.001 for i in range(count))),
+                         array('i', range(count)), array('i', range(count)),
+                         array('I', [0]) * count, array('I', [1]) * count,
+                         array('d', [float('nan')]) * count)
+    return store
+
+
+def bench_edits(count):
+    timeline = Timeline(synthetic_store(count))
+    rng = random.Random(count)
+    start = time.perf_counter()
+    for _ in range(EDITS):
+        index = rng.randrange(len(timeline) - 1000)
+        clip = timeline.cut(index, index + 100)
+        timeline.insert(rng.randrange(len(timeline)), clip)
+        timeline.retime(index, index + 1000, 0.5)
+    edit_us = (time.perf_counter() - start) / (EDITS * 3) * 1e6
+    start = time.perf_counter()
+    timeline.undo()
+    undo_us = (time.perf_counter() - start) * 1e6
+    start = time.perf_counter()
+    timeline.to_store()
+    build_ms = (time.perf_counter() - start) * 1000
+    return edit_us, undo_us, build_ms
+
+
+def run_suite(sizes):
+    results = {}
+    for count in sizes:
+        edit_us, undo_us, build_ms = bench_edits(count)
+        print(f"  {count:>9,} событий: правка {edit_us:7.1f} мкс, отмена {undo_us:7.1f} мкс, "
+              f"сборка {build_ms:8.1f} мс")
+        results[f'edit_us_{count}'] = edit_us
+        results[f'undo_us_{count}'] = undo_us
+        results[f'build_ms_{count}'] = build_ms
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк редактора макросов")
+    parser.add_argument('--quick', action='store_true', help="без записи на 3M событий")
+    add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for number in range(args.runs):
+        print(f"=== Прогон {number + 1}/{args.runs}")
+        runs.append(run_suite(QUICK_SIZES if args.quick else SIZES))
+    results = best_of(runs)
+    return check_baseline(args, 'timeline', results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Движок Macro Recorder: подготовка и воспроизведение макросов без GUI"""
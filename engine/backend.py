@@ -0,0 +1,67 @@
+"""Устройства вывода для воспроизведения: pynput или записывающая заглушка"""
+import time
+
+
+class PynputBackend:
+    """Настоящие мышь и клавиатура через pynput"""
+
+    def controllers(self):
+        # pynput импортируется только при воспроизведении: ему нужен дисплей
+        from pynput import mouse, keyboard
+        return mouse.Controller(), keyboard.Controller()
+
+
+class _RecordingMouse:
+    def __init__(self, backend):
+        self._backend = backend
+        self._position = (0, 0)
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        self._position = value
+        self._backend.record('move', value)
+
+    def click(self, button, count=1):
+        self._backend.record('click', button)
+
+
+class _RecordingKeyboard:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def press(self, key):
+        self._backend.record('press', key)
+
+    def release(self, key):
+        self._backend.record('release', key)
+
+    def type(self, text):
+        self._backend.record('type', text)
+
+
+class RecordingBackend:
+    """Ничего не нажимает, только запоминает вызовы со временем perf_counter_ns.
+
+    Нужен для бенчмарков и проверки воспроизведения без дисплея. При
+    keep_calls=False считает вызовы, не храня их (для миллионов событий).
+    """
+
+    def __init__(self, keep_calls=True):
+        self.keep_calls = keep_calls
+        self.calls = []  # (perf_counter_ns, операция, аргумент)
+        self.count = 0
+        self.last_ns = 0
+
+    def controllers(self):
+        return _RecordingMouse(self), _RecordingKeyboard(self)
+
+    def record(self, op, arg):
+        now = time.perf_counter_ns()
+        self.count += 1
+        self.last_ns = now
+        if self.keep_calls:
+            self.calls.append((now, op, arg))
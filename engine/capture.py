@@ -0,0 +1,63 @@
+"""Быстрый путь захвата событий из потоков слушателей pynput"""
+import threading
+
+CAPTURE_CAPACITY = 65536
+
+
+class CaptureBuffer:
+    """Предвыделенный кольцевой буфер.
+
+    Колбэки слушателей только кладут кортеж в буфер (O(1), без Tk),
+    а GUI-поток периодически забирает накопившееся пачкой.
+    """
+
+    def __init__(self, capacity=CAPTURE_CAPACITY):
+        self._slots = [None] * capacity
+        self._capacity = capacity
+        self._head = 0  # сколько записано всего
+        self._tail = 0  # сколько прочитано всего
+        self._lock = threading.Lock()  # пишут два слушателя: мышь и клавиатура
+        self.dropped = 0
+
+    def __len__(self):
+        return self._head - self._tail
+
+    def push(self, item):
+        """Кладет запись; при переполнении отбрасывает ее и считает потерю"""
+        with self._lock:
+            head = self._head
+            if head - self._tail >= self._capacity:
+                self.dropped += 1
+                return False
+            self._slots[head % self._capacity] = item
+            self._head = head + 1
+        return True
+
+    def drain(self, max_items=None):
+        """Забирает до max_items записей. Вызывать только из одного потока"""
+        tail = self._tail
+        count = self._head - tail
+        if max_items is not None and count > max_items:
+            count = max_items
+        if count <= 0:
+            return []
+
+        capacity = self._capacity
+        start = tail % capacity
+        end = start + count
+        slots = self._slots
+        if end <= capacity:
+            items = slots[start:end]
+            slots[start:end] = [None] * count
+        else:
+            items = slots[start:] + slots[:end - capacity]
+            slots[start:] = [None] * (capacity - start)
+            slots[:end - capacity] = [None] * (end - capacity)
+        self._tail = tail + count
+        return items
+
+    def clear(self):
+        with self._lock:
+            self._slots = [None] * self._capacity
+            self._head = self._tail = 0
+            self.dropped = 0
@@ -0,0 +1,330 @@
+"""Командная строка: запись, воспроизведение и конвертация макросов без GUI"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from engine.event_store import parse_resolution
+from engine.macro_file import load_macro_file, save_macro_file, read_header, is_binary
+from engine.metrics import Metrics, trace_path_for
+from engine.normalize import normalize_events
+from engine.plugins import DEFAULT_GAME, PluginRegistry
+
+# Служебные поля заголовка, которые info выводит отдельно
+_HEADER_FIELDS = ('events_count', 'duration', 'type_counts', 'types', 'strings')
+
+
+def _plugin(game_name):
+    if not game_name:
+        return None
+    plugin, _ = PluginRegistry().get(game_name)
+    return plugin
+
+
+def _metrics(args, name):
+    return Metrics(name, trace=True) if args.metrics else None
+
+
+def _export_metrics(metrics, path):
+    """Снимок метрик в path и трасса рядом"""
+    if metrics is None:
+        return
+    print(metrics.summary())
+    trace_path = trace_path_for(path)
+    metrics.export_json(path)
+    metrics.export_trace(trace_path)
+    print(f"Метрики сохранены в {path}, трасса - в {trace_path}")
+
+
+def cmd_play(args):
+    # pynput импортируется только здесь: info/convert работают и без него
+    from engine.screen import screen_size
+
+    plugin = _plugin(args.game)
+    metrics = _metrics(args, 'playback')
+    target = parse_resolution(args.screen) or screen_size()
+    plans = []
+    for path in args.files:
+        plan = _load_plan(path, plugin, target, args.aspect)
+        if plan is None:
+            print(f"В макросе нет событий: {path}", file=sys.stderr)
+            for plan in plans:
+                plan.close()
+            return 1
+        plans.append(plan)
+    try:
+        errors = asyncio.run(_play_tracks(args, plans, metrics))
+    except KeyboardInterrupt:
+        # Задачи уже отменены: дорожки остановлены и отпустили клавиши
+        errors = []
+        print("Воспроизведение остановлено пользователем")
+    for path, error in errors:
+        print(f"Ошибка при воспроизведении {path}: {str(error) or type(error).__name__}", file=sys.stderr)
+    _export_metrics(metrics, args.metrics)
+    return 1 if errors else 0
+
+
+def _load_plan(path, plugin, target, aspect):
+    """План воспроизведения для файла под экран target; None - в макросе нет событий"""
+    from engine.plan import compile_plan
+    from engine.program import ProgramCompiler, is_program_file
+    from engine.streaming import StreamingPlan, should_stream
+    from engine.screen import mapping_for, remap_store
+
+    if is_program_file(path):
+        # Пресеты программы берутся из реестра плагинов
+        registry = PluginRegistry() if plugin is not None else None
+        plan = ProgramCompiler(plugin, registry, target, aspect).compile_file(path)
+        return plan if len(plan) else None
+    if should_stream(path):
+        mapping = mapping_for(read_header(path).get('resolution'), target, aspect)
+        plan = StreamingPlan(path, plugin, mapping)
+    else:
+        _, events = load_macro_file(path)
+        events, _ = normalize_events(events)
+        if not events:
+            return None
+        mapping = mapping_for(events.resolution, target, aspect)
+        remap_store(events, mapping)
+        plan = compile_plan(events, plugin)
+    if mapping:
+        print(f"{path}: координаты пересчитаны: {mapping}")
+    return plan
+
+
+async def _play_tracks(args, plans, metrics):
+    """Каждый файл - дорожка общего планировщика и задача asyncio; Ctrl+C отменяет
+    все задачи сразу -> [(путь, ошибка)]"""
+    from engine.runtime import play
+    from engine.tracks import TrackScheduler
+
+    scheduler = TrackScheduler(metrics=metrics)
+    tasks = []
+    for path, plan in zip(args.files, plans):
+        # У нескольких дорожек сообщения помечаются файлом
+        say = (lambda text, path=path: print(f"{path}: {text}")) if len(plans) > 1 else print
+        tasks.append(asyncio.create_task(play(
+            scheduler, plan, name=path, loop=args.loops != 1, loops=args.loops or None, speed=args.speed,
+            max_gap=args.max_gap, max_rate=args.max_rate,
+            on_step=(lambda label, say=say: say(f"Воспроизведение: {label}")) if args.verbose else None,
+            on_loop=lambda n, say=say: say(f"Повтор макроса (цикл {n})"),
+            on_finished=lambda stopped, report, say=say: say(report.summary()))))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return [(path, result) for path, result in zip(args.files, results) if isinstance(result, Exception)]
+
+
+def cmd_record(args):
+    from engine.recording import RecordingSession, finish_recording
+    from engine.runtime import record
+
+    metrics = _metrics(args, 'record')
+    session = RecordingSession(_plugin(args.game), record_moves=args.moves, metrics=metrics)
+    session.start()
+    if session.journal_error:
+        print(f"Журнал записи недоступен: {session.journal_error}", file=sys.stderr)
+    def show(batch, messages):
+        for message in messages:
+            print(message)
+
+    print("Запись... Нажмите 'Esc' или 'q' для остановки")
+    try:
+        asyncio.run(record(session, on_batch=show))
+    except KeyboardInterrupt:
+        pass
+    _, messages = session.stop()
+    for message in messages:
+        print(message)
+
+    metadata = {
+        'name': os.path.basename(args.out),
+        'game': args.game or DEFAULT_GAME,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    _, report = finish_recording(session.events, session.journal, args.out, metadata)
+    print(report.summary())
+    print(f"События сохранены в {args.out}")
+    _export_metrics(metrics, args.metrics)
+    return 0
+
+
+def cmd_hotkeys(args):
+    from engine.hotkeys import HotkeyManager, load_bindings
+    from engine.screen import screen_size
+    from engine.tracks import TrackScheduler
+
+    bindings = load_bindings(args.file)
+    if not bindings:
+        print(f"Привязок нет: {args.file}", file=sys.stderr)
+        return 1
+    metrics = _metrics(args, 'hotkeys')
+    scheduler = TrackScheduler(metrics=metrics, keep_alive=True)
+    manager = HotkeyManager(
+        scheduler, bindings, metrics,
+        on_trigger=lambda b, action: print(f"{b.hotkey}: {action} {b.macro}"),
+        on_error=lambda b, e: print(f"Ошибка макроса {b.hotkey}: {str(e) or type(e).__name__}",
+                                    file=sys.stderr))
+    failed = manager.prepare(_plugin(args.game), parse_resolution(args.screen) or screen_size(), args.aspect)
+    for binding, error in failed:
+        print(f"Макрос для {binding.hotkey} не загружен: {error}", file=sys.stderr)
+    manager.start()
+    print(f"Горячие клавиши: {len(bindings) - len(failed)}. Ctrl+C - выход")
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    manager.stop()
+    scheduler.stop()
+    scheduler.close()
+    scheduler.join()
+    print(manager.latency_summary())
+    _export_metrics(metrics, args.metrics)
+    return 0
+
+
+def cmd_info(args):
+    from engine.program import ProgramCompiler, is_program_file
+
+    if is_program_file(args.file):
+        plugin = _plugin(args.game)
+        plan = ProgramCompiler(plugin, PluginRegistry() if plugin else None).compile_file(args.file)
+        print(f"Программа: инструкций {len(plan.code)}, сегментов {len(plan.segments)}, "
+              f"подпрограмм {len(plan.routines)}")
+        print(f"Шагов при воспроизведении: {len(plan)}")
+        print(f"Длительность: {plan.duration_ns / 1e9:.1f} сек")
+        return 0
+    if is_binary(args.file):
+        # Для бинарного файла хватает заголовка, события не читаются
+        metadata = read_header(args.file)
+        count = metadata.get('events_count', 0)
+        duration = metadata.get('duration', 0.0)
+        type_counts = metadata.get('type_counts', {})
+    else:
+        metadata, events = load_macro_file(args.file)
+        count, duration, type_counts = len(events), events.duration, events.type_counts
+    for name, value in metadata.items():
+        if name not in _HEADER_FIELDS:
+            print(f"{name}: {value}")
+    print(f"Событий: {count}")
+    print(f"Длительность: {duration:.1f} сек")
+    for name, value in type_counts.items():
+        print(f"  {name}: {value}")
+    return 0
+
+
+def cmd_convert(args):
+    metadata, events = load_macro_file(args.src)
+    if args.normalize:
+        events, report = normalize_events(events, fold_text=True)
+        print(report.summary())
+    save_macro_file(args.dst, events, metadata)
+    print(f"Макрос сохранен в {args.dst}")
+    return 0
+
+
+def cmd_library(args):
+    import sqlite3
+    from engine.library import MacroLibrary
+
+    try:
+        with MacroLibrary(args.dir) as library:
+            added, updated, removed = library.scan()
+            if added or updated or removed:
+                print(f"Индекс обновлен: новых {added}, измененных {updated}, удаленных {removed}")
+            if args.duplicates:
+                for paths in library.duplicates():
+                    print("Одинаковые: " + ", ".join(paths))
+                return 0
+            rows = library.search(args.query, args.game, args.tag)
+            for row in rows:
+                if row['error']:
+                    print(f"{row['path']}: не читается: {row['error']}")
+                    continue
+                details = [row['game'] or "-"]
+                if row['duration'] is not None:
+                    details.append(f"{row['duration']:.1f} сек")
+                if row['events_count'] is not None:
+                    details.append(f"событий {row['events_count']}")
+                if row['kind'] != 'macro':
+                    details.append("составной")
+                if row['tags']:
+                    details.append("теги: " + row['tags'])
+                print(f"{row['path']}  {row['name']}  ({', '.join(details)})")
+            print(f"Найдено: {len(rows)}")
+    except sqlite3.Error as e:
+        print(f"Ошибка индекса библиотеки: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="recorder.py",
+                                     description="Macro Recorder без графического интерфейса")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    play = commands.add_parser('play', help="воспроизвести макрос (несколько файлов - одновременно)")
+    play.add_argument('files', nargs='+', metavar='file')
+    play.add_argument('--loops', type=int, default=1, help="число повторов (0 - бесконечно)")
+    play.add_argument('--speed', type=float, default=1.0, help="множитель скорости")
+    play.add_argument('--max-gap', type=float, metavar='SEC', help="сжимать паузы длиннее SEC секунд до SEC")
+    play.add_argument('--max-rate', action='store_true', help="без пауз: так быстро, как принимает система")
+    play.add_argument('--game', help="плагин игры")
+    play.add_argument('--screen', help="разрешение экрана WxH (по умолчанию - текущее)")
+    play.add_argument('--aspect', choices=('stretch', 'fit', 'fill'), default='fit',
+                      help="как вписывать макрос с другим соотношением сторон")
+    play.add_argument('-v', '--verbose', action='store_true', help="печатать каждый шаг")
+    play.add_argument('--metrics', metavar='FILE', help="сохранить метрики (JSON) и трассу для Perfetto")
+    play.set_defaults(func=cmd_play)
+
+    record = commands.add_parser('record', help="записать макрос")
+    record.add_argument('out')
+    record.add_argument('--moves', action='store_true', help="записывать движение мыши")
+    record.add_argument('--game', help="плагин игры")
+    record.add_argument('--metrics', metavar='FILE', help="сохранить метрики (JSON) и трассу для Perfetto")
+    record.set_defaults(func=cmd_record)
+
+    hotkeys = commands.add_parser('hotkeys', help="запускать макросы по глобальным горячим клавишам")
+    hotkeys.add_argument('--file', default='hotkeys.json', help="файл привязок")
+    hotkeys.add_argument('--game', help="плагин игры")
+    hotkeys.add_argument('--screen', help="разрешение экрана WxH (по умолчанию - текущее)")
+    hotkeys.add_argument('--aspect', choices=('stretch', 'fit', 'fill'), default='fit',
+                         help="как вписывать макрос с другим соотношением сторон")
+    hotkeys.add_argument('--metrics', metavar='FILE', help="сохранить метрики (JSON) и трассу для Perfetto")
+    hotkeys.set_defaults(func=cmd_hotkeys)
+
+    info = commands.add_parser('info', help="сведения о файле макроса")
+    info.add_argument('file')
+    info.add_argument('--game', help="плагин игры (для пресетов в составном макросе)")
+    info.set_defaults(func=cmd_info)
+
+    convert = commands.add_parser('convert', help="конвертировать .json <-> .mrec")
+    convert.add_argument('src')
+    convert.add_argument('dst')
+    convert.add_argument('--normalize', action='store_true', help="нормализовать события и склеить набранный текст")
+    convert.set_defaults(func=cmd_convert)
+
+    library = commands.add_parser('library', help="поиск в библиотеке макросов (по индексу)")
+    library.add_argument('query', nargs='?', default="", help="часть имени или пути")
+    library.add_argument('--dir', default='macros', help="папка библиотеки")
+    library.add_argument('--game', help="только макросы этой игры")
+    library.add_argument('--tag', help="только макросы с этим тегом")
+    library.add_argument('--duplicates', action='store_true', help="файлы с одинаковым содержимым")
+    library.set_defaults(func=cmd_library)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'speed', 1.0) <= 0:
+        parser.error("скорость должна быть больше нуля")
+    if getattr(args, 'loops', 1) < 0:
+        parser.error("число повторов не может быть отрицательным")
+    if (getattr(args, 'max_gap', None) or 0) < 0:
+        parser.error("пауза не может быть отрицательной")
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
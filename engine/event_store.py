@@ -0,0 +1,312 @@
+"""Колоночное хранилище событий макроса"""
+import math
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+# Отсутствующая координата
+NO_COORD = -2 ** 31
+_INT_MIN, _INT_MAX = -2 ** 31 + 1, 2 ** 31 - 1
+
+# Поля, которые хранятся в колонках; все прочее уходит в extras
+_COLUMN_FIELDS = ('type', 'x', 'y', 'button', 'key', 'time', 'duration')
+
+
+def _is_int_coord(value):
+    return type(value) is int and _INT_MIN <= value <= _INT_MAX
+
+
+def parse_resolution(value):
+    """[w, h] / (w, h) / 'WxH' -> (w, h) или None"""
+    if isinstance(value, str):
+        value = value.lower().split('x')
+    try:
+        width, height = (int(v) for v in value)
+    except (TypeError, ValueError):
+        return None
+    if width <= 0 or height <= 0:
+        return None
+    return width, height
+
+
+class EventRecord(Mapping):
+    """Легкое представление одного события, совместимое с dict на чтение"""
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, name):
+        value = self._store._field(self._index, name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        store, i = self._store, self._index
+        for name in _COLUMN_FIELDS:
+            if store._field(i, name) is not None:
+                yield name
+        extra = store._extras.get(i)
+        if extra:
+            yield from extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        return {name: self[name] for name in self}
+
+
+class EventStore:
+    """Хранит события в типизированных массивах вместо списка dict.
+
+    Строки (типы, клавиши, кнопки) интернируются. Количество событий,
+    длительность и счетчики по типам обновляются при добавлении, поэтому
+    читаются за O(1). Итерация и индексация отдают EventRecord, так что
+    код, ожидающий dict, продолжает работать.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    @classmethod
+    def from_dicts(cls, events):
+        store = cls()
+        store.extend(events)
+        return store
+
+    def clear(self):
+        self._types = array('B')
+        self._times = array('d')
+        self._x = array('i')
+        self._y = array('i')
+        self._keys = array('I')
+        self._buttons = array('I')
+        self._durations = array('d')
+        self._extras = {}
+        self._strings = [None]
+        self._string_ids = {None: 0}
+        self._type_names = []
+        self._type_ids = {}
+
+        self.type_counts = {}
+        self.min_time = None
+        self.max_time = None
+        self._last_time = None
+        self._sorted = True
+        self._untimed = 0
+        # Разрешение экрана при записи (ширина, высота) или None
+        self.resolution = None
+        # Растет при каждом изменении; по нему кешируют производные данные
+        self.version = getattr(self, 'version', 0) + 1
+
+    # --- Запись ---
+
+    def _intern(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def append(self, event):
+        """Добавляет событие (dict или EventRecord)"""
+        index = len(self._types)
+        extra = None
+
+        event_type = event.get('type')
+        type_id = self._type_ids.get(event_type)
+        if type_id is None:
+            type_id = len(self._type_names)
+            if type_id > 255:
+                raise ValueError("Слишком много разных типов событий")
+            self._type_names.append(event_type)
+            self._type_ids[event_type] = type_id
+        self._types.append(type_id)
+        self.type_counts[event_type] = self.type_counts.get(event_type, 0) + 1
+
+        event_time = event.get('time')
+        if event_time is None or isinstance(event_time, bool) or not isinstance(event_time, (int, float)):
+            if event_time is not None:
+                extra = {'time': event_time}
+            self._times.append(math.nan)
+            self._untimed += 1
+        else:
+            event_time = float(event_time)
+            self._times.append(event_time)
+            if self._last_time is not None and event_time < self._last_time:
+                self._sorted = False
+            self._last_time = event_time
+            if self.min_time is None or event_time < self.min_time:
+                self.min_time = event_time
+            if self.max_time is None or event_time > self.max_time:
+                self.max_time = event_time
+
+        for name, column in (('x', self._x), ('y', self._y)):
+            value = event.get(name)
+            if _is_int_coord(value):
+                column.append(value)
+            else:
+                column.append(NO_COORD)
+                if value is not None:
+                    extra = extra or {}
+                    extra[name] = value
+
+        for name, column in (('key', self._keys), ('button', self._buttons)):
+            value = event.get(name)
+            if value is None or isinstance(value, str):
+                column.append(self._intern(value))
+            else:
+                column.append(0)
+                extra = extra or {}
+                extra[name] = value
+
+        duration = event.get('duration')
+        if type(duration) in (int, float):
+            self._durations.append(float(duration))
+        else:
+            self._durations.append(math.nan)
+            if duration is not None:
+                extra = extra or {}
+                extra['duration'] = duration
+
+        for name in event:
+            if name not in _COLUMN_FIELDS:
+                extra = extra or {}
+                extra[name] = event[name]
+        if extra:
+            self._extras[index] = extra
+
+        self.version += 1
+
+    def extend(self, events):
+        for event in events:
+            self.append(event)
+
+    def extend_columns(self, type_names, strings, types, times, xs, ys, keys, buttons, durations,
+                       extras=None):
+        """Пакетное добавление уже разложенных по колонкам событий.
+
+        types/keys/buttons - номера в переданных таблицах type_names/strings
+        (strings[0] должен быть None), extras - {номер в пачке: dict}.
+        """
+        type_map = []
+        for name in type_names:
+            type_id = self._type_ids.get(name)
+            if type_id is None:
+                type_id = len(self._type_names)
+                if type_id > 255:
+                    raise ValueError("Слишком много разных типов событий")
+                self._type_names.append(name)
+                self._type_ids[name] = type_id
+            type_map.append(type_id)
+        string_map = [self._intern(value) for value in strings]
+
+        base = len(self._types)
+        self._types.extend(type_map[t] for t in types)
+        self._times.extend(times)
+        self._x.extend(xs)
+        self._y.extend(ys)
+        self._keys.extend(string_map[k] for k in keys)
+        self._buttons.extend(string_map[b] for b in buttons)
+        self._durations.extend(durations)
+        if extras:
+            for i, extra in extras.items():
+                self._extras[base + i] = extra
+
+        for t in set(types):
+            name = type_names[t]
+            self.type_counts[name] = self.type_counts.get(name, 0) + types.count(t)
+
+        timed = [t for t in times if t == t]
+        self._untimed += len(times) - len(timed)
+        if timed:
+            if self._last_time is not None and timed[0] < self._last_time:
+                self._sorted = False
+            if self._sorted and any(b < a for a, b in zip(timed, timed[1:])):
+                self._sorted = False
+            self._last_time = timed[-1]
+            low, high = min(timed), max(timed)
+            if self.min_time is None or low < self.min_time:
+                self.min_time = low
+            if self.max_time is None or high > self.max_time:
+                self.max_time = high
+
+        self.version += 1
+
+    # --- Чтение ---
+
+    def _field(self, i, name):
+        if name == 'type':
+            return self._type_names[self._types[i]]
+        if name == 'time':
+            value = self._times[i]
+            if value == value:  # не NaN
+                return value
+        elif name == 'x' or name == 'y':
+            value = (self._x if name == 'x' else self._y)[i]
+            if value != NO_COORD:
+                return value
+        elif name == 'key':
+            value = self._strings[self._keys[i]]
+            if value is not None:
+                return value
+        elif name == 'button':
+            value = self._strings[self._buttons[i]]
+            if value is not None:
+                return value
+        elif name == 'duration':
+            value = self._durations[i]
+            if value == value:
+                return value
+        extra = self._extras.get(i)
+        if extra:
+            return extra.get(name)
+        return None
+
+    def __len__(self):
+        return len(self._types)
+
+    def __bool__(self):
+        return len(self._types) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [EventRecord(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        return EventRecord(self, index)
+
+    def __iter__(self):
+        for i in range(len(self._types)):
+            yield EventRecord(self, i)
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+    # --- Статистика ---
+
+    @property
+    def duration(self):
+        """Длительность макроса в секундах"""
+        if self.min_time is not None:
+            return self.max_time - self.min_time
+        # Для пресетов без времени - фиксированная задержка 0.5 сек
+        return max(len(self) - 1, 0) * 0.5
+
+    def index_at_time(self, t):
+        """Индекс первого события со временем >= t"""
+        if self._sorted and not self._untimed:
+            return bisect_left(self._times, t)
+        for i, value in enumerate(self._times):
+            if value == value and value >= t:
+                return i
+        return len(self)
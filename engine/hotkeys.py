@@ -0,0 +1,253 @@
+"""Глобальные горячие клавиши: запуск заранее скомпилированных макросов"""
+import json
+import os
+import threading
+import time
+
+from engine.input_hub import InputHub
+from engine.macro_file import load_macro_file
+from engine.metrics import Histogram
+from engine.normalize import normalize_events
+from engine.plugins import PluginRegistry
+from engine.plan import compile_plan
+from engine.program import ProgramCompiler, is_program_file
+from engine.screen import ASPECT_FIT, mapping_for, remap_store
+from engine.tracks import Track
+
+HOTKEYS_FILE = 'hotkeys.json'
+
+# Что делать, если макрос клавиши еще играет
+POLICY_RESTART = 'restart'  # остановить и начать заново
+POLICY_TOGGLE = 'toggle'    # повторное нажатие останавливает
+POLICY_QUEUE = 'queue'      # запустить еще раз, когда доиграет
+HOTKEY_POLICIES = (POLICY_RESTART, POLICY_TOGGLE, POLICY_QUEUE)
+# Запуск от нажатия до первого ввода должен укладываться в этот бюджет
+TRIGGER_BUDGET_US = 1000
+
+
+class Binding:
+    """Привязка: горячая клавиша pynput ('<ctrl>+1') -> файл макроса"""
+
+    def __init__(self, hotkey, macro, policy=POLICY_RESTART, loop=False, speed=1.0,
+                 max_gap=None, max_rate=False):
+        if policy not in HOTKEY_POLICIES:
+            raise ValueError(f"Неизвестная политика горячей клавиши: {policy}")
+        if speed <= 0:
+            raise ValueError("Скорость должна быть больше нуля")
+        self.hotkey = hotkey
+        self.macro = macro
+        self.policy = policy
+        self.loop = loop
+        self.speed = speed
+        self.max_gap = max_gap
+        self.max_rate = max_rate
+        self.plan = None
+        self.track = None
+        self.queued = 0
+
+    def to_dict(self):
+        return {'hotkey': self.hotkey, 'macro': self.macro, 'policy': self.policy,
+                'loop': self.loop, 'speed': self.speed, 'max_gap': self.max_gap,
+                'max_rate': self.max_rate}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['hotkey'], data['macro'], data.get('policy', POLICY_RESTART),
+                   data.get('loop', False), data.get('speed', 1.0),
+                   data.get('max_gap'), data.get('max_rate', False))
+
+
+def load_bindings(path=HOTKEYS_FILE):
+    """Привязки из hotkeys.json; нет файла - пустой список"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    try:
+        return [Binding.from_dict(item) for item in data.get('bindings', [])]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Неверный формат {path}: {e}")
+
+
+def save_bindings(bindings, path=HOTKEYS_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'bindings': [b.to_dict() for b in bindings]}, f, indent=2, ensure_ascii=False)
+
+
+def compile_macro_file(path, plugin=None, target=None, aspect=ASPECT_FIT, registry=None):
+    """Загружает, пересчитывает под экран и компилирует макрос целиком -> PlaybackPlan.
+    registry - реестр плагинов для блоков preset (по умолчанию новый)"""
+    if is_program_file(path):
+        if registry is None and plugin is not None:
+            registry = PluginRegistry()
+        plan = ProgramCompiler(plugin, registry, target, aspect).compile_file(path)
+        if not len(plan):
+            raise ValueError(f"В макросе нет событий: {path}")
+        return plan
+    _, events = load_macro_file(path)
+    events, _ = normalize_events(events)
+    if not events:
+        raise ValueError(f"В макросе нет событий: {path}")
+    if target is not None:
+        remap_store(events, mapping_for(events.resolution, target, aspect))
+    return compile_plan(events, plugin)
+
+
+class HotkeyManager:
+    """Таблица привязок поверх TrackScheduler.
+
+    prepare() заранее загружает и компилирует макросы всех привязок,
+    поэтому по нажатию остается только положить готовый план дорожкой в
+    планировщик. Нажатия клавиш приходят подпиской на общий InputHub
+    (hub; без него менеджер запускает свой) и разбираются pynput.HotKey
+    каждой привязки. Задержка от колбэка нажатия до первого выполненного
+    шага копится в гистограмме latency (и в метрике 'hotkey.latency').
+    enabled=False временно глушит клавиши (например, во время записи).
+    """
+
+    def __init__(self, scheduler, bindings=(), metrics=None,
+                 on_trigger=None, on_finished=None, on_error=None, hub=None):
+        self.scheduler = scheduler
+        self.hub = hub
+        self.bindings = list(bindings)
+        self.metrics = metrics
+        # Колбэки вызываются из потоков слушателя и планировщика
+        self.on_trigger = on_trigger
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.enabled = True
+        self.latency = Histogram()
+        self._lock = threading.Lock()
+        self._own_hub = None
+        self._subscription = None
+        self._canonical = None
+        self._hotkeys = []
+        self._pressed_ns = 0
+
+    def prepare(self, plugin=None, target=None, aspect=ASPECT_FIT, registry=None):
+        """Компилирует макросы привязок -> [(привязка, ошибка)] для тех, что не загрузились"""
+        if registry is None and plugin is not None:
+            registry = PluginRegistry()
+        failed = []
+        for binding in self.bindings:
+            try:
+                binding.plan = compile_macro_file(binding.macro, plugin, target, aspect, registry)
+            except (OSError, ValueError) as e:
+                binding.plan = None
+                failed.append((binding, e))
+        self.scheduler.prepare()
+        return failed
+
+    def start(self):
+        """Подписывается на нажатия (при необходимости запускает свой хаб ввода)"""
+        from pynput import keyboard
+
+        hotkeys = []
+        for binding in self.bindings:
+            if binding.plan is not None:
+                hotkeys.append(keyboard.HotKey(keyboard.HotKey.parse(binding.hotkey),
+                                               lambda b=binding: self.trigger(b, self._pressed_ns)))
+        self._hotkeys = hotkeys
+        hub = self.hub
+        if hub is None:
+            hub = self._own_hub = InputHub()
+            hub.start()
+        self._canonical = hub.canonical
+        self._subscription = hub.subscribe(on_press=self._on_press, on_release=self._on_release)
+
+    def stop(self):
+        if self._subscription is not None:
+            self._subscription.cancel()
+            self._subscription = None
+        if self._own_hub is not None:
+            self._own_hub.stop()
+            self._own_hub = None
+
+    def _on_press(self, key):
+        # Метка времени до разбора сочетаний: в задержку входит и он
+        self._pressed_ns = time.perf_counter_ns()
+        canonical = self._canonical(key)
+        for hotkey in self._hotkeys:
+            hotkey.press(canonical)
+
+    def _on_release(self, key):
+        canonical = self._canonical(key)
+        for hotkey in self._hotkeys:
+            hotkey.release(canonical)
+
+    def trigger(self, binding, pressed_ns=0):
+        """Срабатывание привязки с учетом политики -> запущенная дорожка или None"""
+        pressed_ns = pressed_ns or time.perf_counter_ns()
+        if not self.enabled or binding.plan is None:
+            return None
+        with self._lock:
+            track = binding.track
+            if track is not None and track.running:
+                if binding.policy == POLICY_TOGGLE:
+                    binding.queued = 0
+                    track.stop()
+                    self._notify_trigger(binding, 'stop')
+                    return None
+                if binding.policy == POLICY_QUEUE:
+                    binding.queued += 1
+                    self._notify_trigger(binding, 'queue')
+                    return None
+                track.stop()
+            track = binding.track = self._track(binding, pressed_ns)
+        # Без блокировки: пустой план завершается прямо в add() и зовет _finished
+        self.scheduler.add(track)
+        self._notify_trigger(binding, 'start')
+        return track
+
+    def _notify_trigger(self, binding, action):
+        if self.on_trigger:
+            self.on_trigger(binding, action)
+
+    def _track(self, binding, pressed_ns):
+        track = Track(binding.plan, name=binding.hotkey, loop=binding.loop, speed=binding.speed,
+                      max_gap=binding.max_gap, max_rate=binding.max_rate)
+        track.on_finished = lambda stopped, report: self._finished(binding, track, pressed_ns, stopped, report)
+        track.on_error = lambda e: self._error(binding, e)
+        return track
+
+    def _record_latency(self, track, pressed_ns):
+        if not track.first_step_ns:
+            return
+        latency_ns = track.first_step_ns - pressed_ns
+        self.latency.add(latency_ns)
+        if self.metrics is not None:
+            self.metrics.observe('hotkey.latency', latency_ns)
+
+    def _finished(self, binding, track, pressed_ns, stopped, report):
+        """Поток планировщика: дорожка привязки доиграла"""
+        with self._lock:
+            self._record_latency(track, pressed_ns)
+            # Очередь: следующий запуск сразу, без ожидания нового нажатия
+            if binding.queued and not stopped and self.enabled:
+                binding.queued -= 1
+                queued = binding.track = self._track(binding, time.perf_counter_ns())
+            else:
+                binding.queued = 0
+                queued = None
+        if queued is not None:
+            self.scheduler.add(queued)
+        if self.on_finished:
+            self.on_finished(binding, stopped, report)
+        if queued is not None:
+            self._notify_trigger(binding, 'start')
+
+    def _error(self, binding, error):
+        with self._lock:
+            binding.queued = 0
+        if self.on_error:
+            self.on_error(binding, error)
+
+    def latency_summary(self):
+        latency = self.latency
+        if not latency.count:
+            return "Горячие клавиши: запусков еще не было"
+        text = (f"Горячие клавиши: запусков {latency.count}, задержка до ввода p50 "
+                f"{latency.percentile_us(50):.0f} мкс, p99 {latency.percentile_us(99):.0f} мкс")
+        if latency.percentile_us(99) > TRIGGER_BUDGET_US:
+            text += f" (больше бюджета {TRIGGER_BUDGET_US} мкс)"
+        return text
@@ -0,0 +1,149 @@
+"""Общие слушатели ввода: один набор хуков pynput на все приложение.
+
+InputHub держит один mouse.Listener и один keyboard.Listener и раздает
+события подписчикам (строка состояния, запись, горячие клавиши).
+Подписка - набор колбэков с сигнатурами pynput: подписчик получает
+только те виды событий, на которые дал колбэк, а движения мыши можно
+проредить (move_interval). Хуки запускаются один раз и ждут готовности,
+поэтому новая подписка получает события сразу, без старта потоков.
+
+Колбэки вызываются из потоков слушателей и должны быть короткими: пока
+они работают, ОС ждет хук. Возвращаемое значение игнорируется (слушатель
+общий и по False не останавливается), исключение подписчика
+запоминается в Subscription.error и не роняет слушатель.
+"""
+import threading
+import time
+
+
+class Subscription:
+    """Подписка на события хаба; cancel() отписывает"""
+
+    def __init__(self, hub, on_move=None, on_click=None, on_press=None, on_release=None,
+                 move_interval=None):
+        self.hub = hub
+        self.on_move = on_move
+        self.on_click = on_click
+        self.on_press = on_press
+        self.on_release = on_release
+        # Не чаще одного движения за move_interval секунд (например, для строки состояния)
+        self.move_interval_ns = round(move_interval * 1e9) if move_interval else 0
+        self.last_move_ns = 0
+        self.error = None
+
+    def cancel(self):
+        self.hub.unsubscribe(self)
+
+
+class InputHub:
+    """Один набор хуков ввода, события раздаются подписчикам.
+
+    Списки подписчиков по видам событий - кортежи (подписка, колбэк),
+    которые пересобираются при подписке и отписке; колбэки слушателей
+    читают их без блокировки. metrics (engine.metrics.Metrics) - время
+    подписчиков на одно событие ('input.dispatch'), меняется на ходу.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._subscriptions = ()
+        self._move = self._click = self._press = self._release = ()
+        self._mouse = None
+        self._keyboard = None
+
+    @property
+    def running(self):
+        return self._mouse is not None
+
+    def start(self):
+        """Запускает хуки и ждет их готовности (повторный вызов ничего не делает)"""
+        # pynput импортируется только здесь: ему нужен дисплей
+        from pynput import mouse, keyboard
+
+        with self._lock:
+            if self._mouse is not None:
+                return
+            self._mouse = mouse.Listener(on_move=self.on_move, on_click=self.on_click)
+            self._keyboard = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+            self._mouse.start()
+            self._keyboard.start()
+            self._mouse.wait()
+            self._keyboard.wait()
+
+    def stop(self):
+        with self._lock:
+            listeners = (self._mouse, self._keyboard)
+            self._mouse = self._keyboard = None
+        for listener in listeners:
+            if listener is not None and listener.is_alive():
+                listener.stop()
+
+    def subscribe(self, on_move=None, on_click=None, on_press=None, on_release=None,
+                  move_interval=None):
+        """Подписывает колбэки -> Subscription (параметры - как у Subscription)"""
+        subscription = Subscription(self, on_move, on_click, on_press, on_release, move_interval)
+        with self._lock:
+            self._subscriptions += (subscription,)
+            self._rebuild()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+            self._rebuild()
+
+    def _rebuild(self):
+        subscriptions = self._subscriptions
+        self._move = tuple((s, s.on_move) for s in subscriptions if s.on_move)
+        self._click = tuple((s, s.on_click) for s in subscriptions if s.on_click)
+        self._press = tuple((s, s.on_press) for s in subscriptions if s.on_press)
+        self._release = tuple((s, s.on_release) for s in subscriptions if s.on_release)
+
+    def canonical(self, key):
+        """Клавиша без модификаторов - для pynput.HotKey"""
+        listener = self._keyboard
+        return listener.canonical(key) if listener is not None else key
+
+    def _dispatch(self, targets, args):
+        if not targets:
+            return
+        metrics = self.metrics
+        started = time.perf_counter_ns() if metrics is not None else 0
+        for subscription, callback in targets:
+            try:
+                callback(*args)
+            except Exception as e:
+                subscription.error = e
+        if metrics is not None:
+            metrics.observe('input.dispatch', time.perf_counter_ns() - started)
+
+    # Колбэки слушателей pynput; без дисплея их вызывает генератор ввода (бенчмарки)
+
+    def on_move(self, x, y):
+        targets = self._move
+        if not targets:
+            return
+        now = time.perf_counter_ns()
+        for subscription, callback in targets:
+            interval = subscription.move_interval_ns
+            if interval:
+                if now - subscription.last_move_ns < interval:
+                    continue
+                subscription.last_move_ns = now
+            try:
+                callback(x, y)
+            except Exception as e:
+                subscription.error = e
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe('input.dispatch', time.perf_counter_ns() - now)
+
+    def on_click(self, x, y, button, pressed):
+        self._dispatch(self._click, (x, y, button, pressed))
+
+    def on_press(self, key):
+        self._dispatch(self._press, (key,))
+
+    def on_release(self, key):
+        self._dispatch(self._release, (key,))
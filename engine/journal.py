@@ -0,0 +1,188 @@
+"""Журнал записи: события дописываются на диск по мере захвата.
+
+Каждая сессия записи пишет в свою папку journal/session-.../, поэтому
+удаление журнала одной сессии (после сохранения в фоне) не задевает ни
+идущую следующую запись, ни журнал, оставленный для восстановления.
+Журнал сессии - набор сегментов segment-NNNNNN.mrj. Каждый сегмент состоит из
+кадров: b'MRJF' | длина u32 | crc32 u32 | JSON-массив событий. Кадр
+дописывается и синхронизируется (fsync) фоновым потоком, поэтому после
+падения или kill теряется не больше последней пачки, а оборванный
+хвостовой кадр просто отбрасывается при восстановлении.
+"""
+import json
+import os
+import queue
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+from engine.event_store import EventStore
+
+JOURNAL_DIR = 'journal'
+SEGMENT_BYTES = 8 * 1024 * 1024
+FLUSH_INTERVAL = 0.2
+MAX_PENDING_BATCHES = 256
+
+_FRAME_MAGIC = b'MRJF'
+_FRAME = struct.Struct('<4sII')
+_SEGMENT_PREFIX = 'segment-'
+_SEGMENT_SUFFIX = '.mrj'
+_SESSION_PREFIX = 'session-'
+_STOP = object()
+
+
+def _segment_paths(directory):
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def list_journals(directory=JOURNAL_DIR):
+    """Папки сессий с непустым журналом, от старых к новым"""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+             if name.startswith(_SESSION_PREFIX)]
+    # Сегменты прямо в папке - журнал старой версии без папок сессий
+    paths.insert(0, directory)
+    return [path for path in paths if any(os.path.getsize(p) for p in _segment_paths(path))]
+
+
+class RecordingJournal:
+    """Журнал с фоновым писателем: пачки копятся в ограниченной очереди,
+    поток пишет их кадрами, делает fsync и переходит на новый сегмент,
+    когда текущий вырастает больше segment_bytes."""
+
+    def __init__(self, directory=JOURNAL_DIR, segment_bytes=SEGMENT_BYTES,
+                 flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING_BATCHES):
+        self.directory = directory
+        # Папка этой сессии, создается в start()
+        self.path = None
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        # Ограниченная очередь держит память под контролем, даже если диск тормозит
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._file = None
+        self._segment_number = 0
+        self.events_written = 0
+        self.error = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # Своя папка: журналы других сессий не трогаем
+        self.path = tempfile.mkdtemp(prefix=time.strftime(f"{_SESSION_PREFIX}%Y%m%d-%H%M%S-"),
+                                     dir=self.directory)
+        self._open_segment()
+        self._thread = threading.Thread(target=self._writer, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, events):
+        """Передает пачку событий (список dict) писателю"""
+        if events and self.error is None:
+            self._queue.put(events)
+
+    def close(self):
+        """Дописывает все, что осталось в очереди, и закрывает сегмент"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def discard(self):
+        """Удаляет журнал этой сессии (после успешного сохранения записи)"""
+        self.close()
+        if self.path is not None:
+            discard_journal(self.path)
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._segment_number += 1
+        path = os.path.join(self.path, f"{_SEGMENT_PREFIX}{self._segment_number:06d}{_SEGMENT_SUFFIX}")
+        self._file = open(path, 'ab')
+
+    def _writer(self):
+        stop = False
+        while not stop:
+            try:
+                batch = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Собираем все, что успело накопиться, в один кадр
+            events = []
+            while True:
+                if batch is _STOP:
+                    stop = True
+                    break
+                events.extend(batch)
+                try:
+                    batch = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if events and self.error is None:
+                try:
+                    self._write_frame(events)
+                except OSError as e:
+                    self.error = e
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_frame(self, events):
+        payload = json.dumps(events, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self._file.write(_FRAME.pack(_FRAME_MAGIC, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.events_written += len(events)
+        if self._file.tell() >= self.segment_bytes:
+            self._open_segment()
+
+
+def has_journal(directory=JOURNAL_DIR):
+    return bool(list_journals(directory))
+
+
+def discard_journal(path):
+    """Удаляет журнал одной сессии (папку из list_journals())"""
+    for segment in _segment_paths(path):
+        os.remove(segment)
+    try:
+        os.rmdir(path)
+    except OSError:
+        # Общая папка с журналами других сессий остается
+        pass
+
+
+def recover_journal(path):
+    """Собирает макрос из (возможно оборванного) журнала сессии path.
+
+    Кадры читаются по порядку, пока они целы: битый или недописанный
+    кадр завершает сегмент. Возвращает EventStore (пустой, если журнала нет).
+    """
+    store = EventStore()
+    for segment in _segment_paths(path):
+        with open(segment, 'rb') as f:
+            while True:
+                head = f.read(_FRAME.size)
+                if len(head) < _FRAME.size:
+                    break
+                magic, length, crc = _FRAME.unpack(head)
+                if magic != _FRAME_MAGIC:
+                    break
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                try:
+                    store.extend(json.loads(payload.decode('utf-8')))
+                except (UnicodeDecodeError, ValueError):
+                    break
+    return store
@@ -0,0 +1,223 @@
+"""Библиотека макросов: папка с файлами и индекс метаданных в SQLite.
+
+Индекс хранит для каждого файла игру, длительность, число событий,
+хеш содержимого и время изменения. scan() обходит папку и перечитывает
+только новые и измененные файлы (по mtime и размеру), причем у бинарных
+и сохраненных программой JSON-файлов - только заголовок. Поиск и
+фильтры работают по индексу и не открывают сами макросы. Теги
+назначаются в библиотеке и хранятся только в индексе.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+
+from engine.event_store import EventStore
+from engine.macro_file import (BINARY_EXTENSION, MacroFormatError, has_blocks, is_binary,
+                               read_header, read_json_header)
+
+LIBRARY_DIR = 'macros'
+# Файл индекса внутри папки библиотеки
+LIBRARY_DB = '.library.sqlite'
+MACRO_EXTENSIONS = (BINARY_EXTENSION, '.json')
+KIND_MACRO = 'macro'
+KIND_PROGRAM = 'program'  # составной макрос (engine/program.py)
+KIND_BROKEN = 'broken'    # не читается; перечитывается, когда файл изменится
+HASH_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS macros (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    game TEXT,
+    created TEXT,
+    kind TEXT NOT NULL,
+    events_count INTEGER,
+    duration REAL,
+    type_counts TEXT,
+    hash TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS macros_game ON macros (game);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (path, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+"""
+
+
+def file_hash(path):
+    """SHA-256 содержимого файла (читается кусками)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_metadata(path):
+    """Метаданные для индекса -> (вид, dict). Тело макроса разбирается,
+    только если у JSON-файла нет заголовка (старые и написанные вручную файлы)"""
+    if is_binary(path):
+        return KIND_MACRO, read_header(path)
+    header = read_json_header(path)
+    if header is not None and 'duration' in header:
+        return KIND_MACRO, header
+    with open(path, 'r', encoding='utf-8') as f:
+        macro_data = json.load(f)
+    if isinstance(macro_data, list):
+        metadata, actions = {}, macro_data
+    elif isinstance(macro_data, dict) and isinstance(macro_data.get('actions'), list):
+        metadata = {k: v for k, v in macro_data.items() if k != 'actions'}
+        actions = macro_data['actions']
+        if has_blocks(actions):
+            # Длительность программы зависит от вызываемых файлов и плагина
+            return KIND_PROGRAM, metadata
+    else:
+        raise MacroFormatError("Неверный формат файла макроса")
+    store = EventStore.from_dicts(actions)
+    metadata['events_count'] = len(store)
+    metadata['duration'] = store.duration
+    metadata['type_counts'] = dict(store.type_counts)
+    return KIND_MACRO, metadata
+
+
+def _fold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+class MacroLibrary:
+    """Папка макросов с индексом; один объект - одно соединение SQLite (один поток)"""
+
+    def __init__(self, directory=LIBRARY_DIR, db_path=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path or os.path.join(directory, LIBRARY_DB)
+        self._db = sqlite3.connect(self.db_path)
+        self._db.row_factory = sqlite3.Row
+        # LIKE в SQLite не различает регистр только у латиницы
+        self._db.create_function('fold', 1, _fold, deterministic=True)
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def full_path(self, path):
+        """Путь файла по пути из индекса (он хранится относительно папки)"""
+        return os.path.join(self.directory, path)
+
+    def _files(self):
+        """Файлы макросов в папке (с подпапками) -> {относительный путь: stat}"""
+        files = {}
+        for root, dirs, names in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in names:
+                if os.path.splitext(name)[1].lower() not in MACRO_EXTENSIONS:
+                    continue
+                full = os.path.join(root, name)
+                try:
+                    stat = os.stat(full)
+                except OSError:
+                    continue
+                files[os.path.relpath(full, self.directory).replace(os.sep, '/')] = stat
+        return files
+
+    def scan(self):
+        """Приводит индекс в соответствие с папкой -> (добавлено, обновлено, удалено)"""
+        files = self._files()
+        known = {row['path']: (row['mtime_ns'], row['size'])
+                 for row in self._db.execute("SELECT path, mtime_ns, size FROM macros")}
+        added = updated = 0
+        with self._db:
+            for path, stat in files.items():
+                previous = known.get(path)
+                if previous == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                self._index(path, stat)
+                if previous is None:
+                    added += 1
+                else:
+                    updated += 1
+            removed = [path for path in known if path not in files]
+            for path in removed:
+                self._db.execute("DELETE FROM macros WHERE path = ?", (path,))
+                self._db.execute("DELETE FROM tags WHERE path = ?", (path,))
+        return added, updated, len(removed)
+
+    def _index(self, path, stat):
+        full = self.full_path(path)
+        error = digest = None
+        try:
+            kind, metadata = read_metadata(full)
+            digest = file_hash(full)
+        except (OSError, ValueError) as e:
+            kind, metadata, error = KIND_BROKEN, {}, str(e) or type(e).__name__
+        type_counts = metadata.get('type_counts')
+        self._db.execute(
+            "INSERT OR REPLACE INTO macros (path, name, game, created, kind, events_count, duration,"
+            " type_counts, hash, mtime_ns, size, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, metadata.get('name') or os.path.basename(path), metadata.get('game'),
+             metadata.get('created'), kind, metadata.get('events_count'), metadata.get('duration'),
+             json.dumps(type_counts, ensure_ascii=False) if type_counts else None,
+             digest, stat.st_mtime_ns, stat.st_size, error))
+
+    def search(self, text="", game=None, tag=None, kind=None):
+        """Поиск по индексу: text - подстрока имени или пути, остальное - точные фильтры.
+        У строк есть колонка tags - теги через запятую"""
+        query = ("SELECT *, (SELECT group_concat(tag, ', ') FROM tags WHERE tags.path = macros.path)"
+                 " AS tags FROM macros WHERE 1")
+        params = []
+        if text:
+            query += " AND (fold(name) LIKE ? ESCAPE '\\' OR fold(path) LIKE ? ESCAPE '\\')"
+            pattern = '%' + _fold(text).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params += [pattern, pattern]
+        if game:
+            query += " AND game = ?"
+            params.append(game)
+        if tag:
+            query += " AND path IN (SELECT path FROM tags WHERE tag = ?)"
+            params.append(tag)
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return self._db.execute(query + " ORDER BY name COLLATE NOCASE, path", params).fetchall()
+
+    def get(self, path):
+        return self._db.execute("SELECT * FROM macros WHERE path = ?", (path,)).fetchone()
+
+    def duplicates(self):
+        """Группы файлов с одинаковым содержимым -> [[путь, ...]]"""
+        rows = self._db.execute(
+            "SELECT hash, path FROM macros WHERE hash IN "
+            "(SELECT hash FROM macros WHERE hash IS NOT NULL GROUP BY hash HAVING COUNT(*) > 1) "
+            "ORDER BY hash, path").fetchall()
+        groups = {}
+        for row in rows:
+            groups.setdefault(row['hash'], []).append(row['path'])
+        return list(groups.values())
+
+    def tags(self, path=None):
+        """Теги файла или все теги библиотеки"""
+        if path is None:
+            rows = self._db.execute("SELECT DISTINCT tag FROM tags ORDER BY tag")
+        else:
+            rows = self._db.execute("SELECT tag FROM tags WHERE path = ? ORDER BY tag", (path,))
+        return [row['tag'] for row in rows]
+
+    def set_tags(self, path, tags):
+        tags = sorted({tag.strip() for tag in tags if tag.strip()})
+        with self._db:
+            self._db.execute("DELETE FROM tags WHERE path = ?", (path,))
+            self._db.executemany("INSERT INTO tags (path, tag) VALUES (?, ?)",
+                                 [(path, tag) for tag in tags])
+        return tags
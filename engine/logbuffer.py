@@ -0,0 +1,85 @@
+"""Буфер лога: кольцо сообщений, уровни и ограничение частоты"""
+import threading
+import time
+from collections import deque
+
+DEBUG, INFO, WARNING, ERROR = 'debug', 'info', 'warning', 'error'
+LOG_LEVELS = (DEBUG, INFO, WARNING, ERROR)
+# Сколько сообщений ждут отрисовки (старые вытесняются)
+LOG_CAPACITY = 2000
+# Сколько сообщений одного вида пропускать в секунду, остальные только считать
+LOG_RATE_PER_SEC = 20
+
+
+class LogBuffer:
+    """Сообщения из любых потоков копятся здесь, окно забирает их пачкой.
+
+    add() не трогает Tk и стоит O(1). Повторяющиеся сообщения (шаги
+    воспроизведения) помечаются ключом: сверх LOG_RATE_PER_SEC в секунду
+    они не хранятся, а в конце секунды добавляется одна строка с числом
+    пропущенных.
+    """
+
+    def __init__(self, capacity=LOG_CAPACITY, rate_per_sec=LOG_RATE_PER_SEC):
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.rate_per_sec = rate_per_sec
+        # ключ -> [начало окна, пропущено в окне, показано в окне]
+        self._rates = {}
+        self.overflowed = 0
+        self.suppressed = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def add(self, message, level=INFO, key=None):
+        """Добавляет сообщение; key - вид сообщения для ограничения частоты"""
+        now = time.time()
+        with self._lock:
+            if key is not None and not self._allow(key, now):
+                return False
+            self._append(now, level, message)
+        return True
+
+    def add_many(self, messages, level=INFO):
+        now = time.time()
+        with self._lock:
+            for message in messages:
+                self._append(now, level, message)
+
+    def _append(self, now, level, message):
+        lines = self._lines
+        if len(lines) == lines.maxlen:
+            self.overflowed += 1
+        lines.append((now, level, message))
+
+    def _allow(self, key, now):
+        rate = self._rates.get(key)
+        if rate is None or now - rate[0] >= 1.0:
+            if rate is not None and rate[1]:
+                self._append(now, DEBUG, f"{key}: пропущено сообщений: {rate[1]}")
+            self._rates[key] = [now, 0, 1]
+            return True
+        if rate[2] < self.rate_per_sec:
+            rate[2] += 1
+            return True
+        rate[1] += 1
+        self.suppressed += 1
+        return False
+
+    def flush_rates(self):
+        """Дописывает итог по пропущенным сообщениям (в конце воспроизведения)"""
+        now = time.time()
+        with self._lock:
+            for key, rate in self._rates.items():
+                if rate[1]:
+                    self._append(now, DEBUG, f"{key}: пропущено сообщений: {rate[1]}")
+            self._rates.clear()
+
+    def drain(self):
+        """Забирает накопленное -> (список (время, уровень, текст), вытеснено строк)"""
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            overflowed, self.overflowed = self.overflowed, 0
+        return lines, overflowed
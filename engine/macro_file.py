@@ -0,0 +1,435 @@
+"""Файлы макросов: компактный бинарный формат и совместимость с JSON.
+
+Бинарный файл (.mrec), все числа little-endian:
+
+    b'MRMB' | version u8 | flags u8 | header_len u32 | header (JSON)
+    блоки событий (каждый может быть сжат zlib)
+    индекс блоков: (offset u64, length u32, count u32, first_time f64) * N
+    footer: index_offset u64 | block_count u32 | b'MRIX'
+
+В заголовке лежат метаданные, которые раньше писал save_macro, таблица
+строк (клавиши, кнопки) и типов событий. Внутри блока событие кодируется
+как varint-тег (тип и набор полей), затем дельты времени в микросекундах
+и координат (zigzag varint), номера строк и длительность удержания (мкс). Каждый блок начинается
+с нулевых "предыдущих" значений, поэтому читается независимо: файл можно
+открыть через mmap и читать блоки по требованию, не разбирая весь файл.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_right
+
+from engine.event_store import EventStore, NO_COORD, parse_resolution
+
+MAGIC = b'MRMB'
+FOOTER_MAGIC = b'MRIX'
+VERSION = 2
+FLAG_ZLIB = 1
+BLOCK_SIZE = 4096
+BINARY_EXTENSION = '.mrec'
+# Блоки составных макросов (engine/program.py): такой JSON - программа, а не запись
+BLOCK_TYPES = ('repeat', 'call', 'preset', 'label', 'wait')
+# Сколько байт JSON-файла просматривать в поисках метаданных перед 'actions'
+JSON_HEADER_SCAN = 64 * 1024
+
+_PREAMBLE = struct.Struct('<4sBBI')
+_INDEX_ENTRY = struct.Struct('<QIId')
+_FOOTER = struct.Struct('<QI4s')
+
+# Флаги полей в теге события
+_F_TIME = 1
+_F_XY = 2
+_F_KEY = 4
+_F_BUTTON = 8
+_F_EXTRA = 16
+_F_DURATION = 32
+_TAG_SHIFT = 6
+# В версии 1 не было длительности, и флаги занимали 5 бит
+_V1_TAG_SHIFT = 5
+
+
+class MacroFormatError(ValueError):
+    """Файл не является макросом поддерживаемого формата"""
+
+
+def _put_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_signed(out, value):
+    # zigzag: маленькие по модулю отрицательные числа тоже занимают мало байт
+    _put_varint(out, (-value << 1) - 1 if value < 0 else value << 1)
+
+
+def _encode_block(store, start, end, string_map):
+    out = bytearray()
+    prev_us = prev_x = prev_y = 0
+    times, xs, ys = store._times, store._x, store._y
+    keys, buttons, types = store._keys, store._buttons, store._types
+    durations = store._durations
+    extras = store._extras
+
+    for i in range(start, end):
+        t = times[i]
+        x = xs[i]
+        extra = extras.get(i)
+        flags = 0
+        if t == t:
+            flags |= _F_TIME
+        if x != NO_COORD:
+            flags |= _F_XY
+        if keys[i]:
+            flags |= _F_KEY
+        if buttons[i]:
+            flags |= _F_BUTTON
+        if extra:
+            flags |= _F_EXTRA
+        duration = durations[i]
+        if duration == duration:
+            flags |= _F_DURATION
+        _put_varint(out, types[i] << _TAG_SHIFT | flags)
+
+        if flags & _F_TIME:
+            t_us = round(t * 1e6)
+            _put_signed(out, t_us - prev_us)
+            prev_us = t_us
+        if flags & _F_XY:
+            y = ys[i]
+            _put_signed(out, x - prev_x)
+            _put_signed(out, y - prev_y)
+            prev_x, prev_y = x, y
+        if flags & _F_KEY:
+            _put_varint(out, string_map[keys[i]])
+        if flags & _F_BUTTON:
+            _put_varint(out, string_map[buttons[i]])
+        if flags & _F_DURATION:
+            _put_signed(out, round(duration * 1e6))
+        if flags & _F_EXTRA:
+            blob = json.dumps(extra, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            _put_varint(out, len(blob))
+            out += blob
+    return out
+
+
+def write_binary(path, store, metadata=None, compress=True, block_size=BLOCK_SIZE):
+    """Пишет макрос в бинарный формат (через временный файл, атомарно)"""
+    # В таблицу строк попадают только реально используемые строки
+    string_ids = sorted((set(store._keys) | set(store._buttons)) - {0})
+    string_map = {old: new for new, old in enumerate(string_ids, 1)}
+    strings = [store._strings[i] for i in string_ids]
+
+    header = dict(metadata or {})
+    header['events_count'] = len(store)
+    header['duration'] = store.duration
+    header['type_counts'] = dict(store.type_counts)
+    header['types'] = list(store._type_names)
+    if store.resolution:
+        header['resolution'] = list(store.resolution)
+    header['strings'] = strings
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    flags = FLAG_ZLIB if compress else 0
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, flags, len(header_bytes)))
+            f.write(header_bytes)
+
+            index = []
+            for start in range(0, len(store), block_size):
+                end = min(start + block_size, len(store))
+                body = _encode_block(store, start, end, string_map)
+                if compress:
+                    body = zlib.compress(body, 6)
+                first_time = math.nan
+                for t in store._times[start:end]:
+                    if t == t:
+                        first_time = t
+                        break
+                index.append((f.tell(), len(body), end - start, first_time))
+                f.write(body)
+
+            index_offset = f.tell()
+            for entry in index:
+                f.write(_INDEX_ENTRY.pack(*entry))
+            f.write(_FOOTER.pack(index_offset, len(index), FOOTER_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Недописанный файл не оставляем рядом с макросом
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_header(path):
+    """Читает только метаданные бинарного файла, не трогая события"""
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size or preamble[:4] != MAGIC:
+            raise MacroFormatError("Неверный формат файла макроса")
+        _, version, _, header_len = _PREAMBLE.unpack(preamble)
+        if version > VERSION:
+            raise MacroFormatError(f"Неподдерживаемая версия формата: {version}")
+        return json.loads(f.read(header_len).decode('utf-8'))
+
+
+class MacroFile:
+    """Бинарный макрос, открытый через mmap; блоки декодируются по требованию"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self._file.close()
+            raise MacroFormatError("Неверный формат файла макроса")
+
+        try:
+            magic, version, self.flags, header_len = _PREAMBLE.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise MacroFormatError("Неверный формат файла макроса")
+            if version > VERSION:
+                raise MacroFormatError(f"Неподдерживаемая версия формата: {version}")
+            start = _PREAMBLE.size
+            self.header = json.loads(self._map[start:start + header_len].decode('utf-8'))
+
+            index_offset, block_count, footer_magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+            if footer_magic != FOOTER_MAGIC:
+                raise MacroFormatError("Файл макроса поврежден: нет индекса блоков")
+            self.blocks = [_INDEX_ENTRY.unpack_from(self._map, index_offset + i * _INDEX_ENTRY.size)
+                           for i in range(block_count)]
+        except (struct.error, UnicodeDecodeError, json.JSONDecodeError):
+            self.close()
+            raise MacroFormatError("Файл макроса поврежден")
+        except MacroFormatError:
+            self.close()
+            raise
+
+        self._tag_shift = _V1_TAG_SHIFT if version == 1 else _TAG_SHIFT
+        self._types = self.header.get('types', [])
+        self._strings = [None] + self.header.get('strings', [])
+        self._block_times = [entry[3] for entry in self.blocks]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.header.get('events_count', 0)
+
+    @property
+    def metadata(self):
+        """Метаданные без служебных таблиц"""
+        return {k: v for k, v in self.header.items() if k not in ('types', 'strings')}
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def block_for_time(self, t):
+        """Номер блока, в котором лежит момент t (по индексу, без декодирования)"""
+        return max(bisect_right(self._block_times, t) - 1, 0)
+
+    def read_block(self, number):
+        """Декодирует один блок в список dict"""
+        types, times, xs, ys, keys, buttons, durations, extras = self._read_columns(number)
+        type_names, strings = self._types, self._strings
+        events = []
+        for i, type_id in enumerate(types):
+            event = {'type': type_names[type_id]}
+            if xs[i] != NO_COORD:
+                event['x'] = xs[i]
+                event['y'] = ys[i]
+            if buttons[i]:
+                event['button'] = strings[buttons[i]]
+            if keys[i]:
+                event['key'] = strings[keys[i]]
+            if times[i] == times[i]:
+                event['time'] = times[i]
+            if durations[i] == durations[i]:
+                event['duration'] = durations[i]
+            if i in extras:
+                event.update(extras[i])
+            events.append(event)
+        return events
+
+    def iter_events(self, start_block=0):
+        for number in range(start_block, len(self.blocks)):
+            yield from self.read_block(number)
+
+    def to_store(self):
+        """Читает весь файл сразу в колонки хранилища, минуя dict"""
+        store = EventStore()
+        for number in range(len(self.blocks)):
+            store.extend_columns(self._types, self._strings, *self._read_columns(number))
+        return store
+
+    def _read_columns(self, number):
+        offset, length, count, _ = self.blocks[number]
+        data = self._map[offset:offset + length]
+        if self.flags & FLAG_ZLIB:
+            data = zlib.decompress(data)
+
+        types, keys, buttons = [], [], []
+        times, xs, ys, durations = [], [], [], []
+        extras = {}
+        nan = math.nan
+        pos = 0
+        prev_us = prev_x = prev_y = 0
+        tag_shift = self._tag_shift
+        flag_mask = (1 << tag_shift) - 1
+
+        def varint():
+            nonlocal pos
+            result = shift = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                result |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    return result
+                shift += 7
+
+        for i in range(count):
+            tag = data[pos]
+            if tag < 0x80:
+                pos += 1
+            else:
+                tag = varint()
+            flags = tag & flag_mask
+            types.append(tag >> tag_shift)
+
+            if flags & _F_TIME:
+                value = varint()
+                prev_us += (value >> 1) ^ -(value & 1)
+                times.append(prev_us / 1e6)
+            else:
+                times.append(nan)
+            if flags & _F_XY:
+                value = varint()
+                prev_x += (value >> 1) ^ -(value & 1)
+                value = varint()
+                prev_y += (value >> 1) ^ -(value & 1)
+                xs.append(prev_x)
+                ys.append(prev_y)
+            else:
+                xs.append(NO_COORD)
+                ys.append(NO_COORD)
+            keys.append(varint() if flags & _F_KEY else 0)
+            buttons.append(varint() if flags & _F_BUTTON else 0)
+            if flags & _F_DURATION:
+                value = varint()
+                durations.append(((value >> 1) ^ -(value & 1)) / 1e6)
+            else:
+                durations.append(nan)
+            if flags & _F_EXTRA:
+                size = varint()
+                extras[i] = json.loads(bytes(data[pos:pos + size]).decode('utf-8'))
+                pos += size
+
+        return types, times, xs, ys, keys, buttons, durations, extras
+
+
+def read_json_header(path, limit=JSON_HEADER_SCAN):
+    """Метаданные JSON-макроса без разбора событий -> dict или None.
+
+    save_macro_file пишет 'actions' последним ключом, поэтому метаданные
+    разбираются по парам ключ-значение из начала файла до 'actions'.
+    None - файл в другом порядке, сырая запись или метаданные не влезли в limit.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read(limit)
+    decoder = json.JSONDecoder()
+    pos = _skip_ws(text, 0)
+    if not text.startswith('{', pos):
+        return None
+    metadata = {}
+    pos += 1
+    try:
+        while True:
+            pos = _skip_ws(text, pos)
+            key, pos = decoder.raw_decode(text, pos)
+            pos = _skip_ws(text, pos)
+            if not text.startswith(':', pos):
+                return None
+            if key == 'actions':
+                return metadata
+            metadata[key], pos = decoder.raw_decode(text, _skip_ws(text, pos + 1))
+            pos = _skip_ws(text, pos)
+            if not text.startswith(',', pos):
+                return None
+            pos += 1
+    except ValueError:
+        return None
+
+
+def _skip_ws(text, pos):
+    while pos < len(text) and text[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+def has_blocks(actions):
+    """Есть ли среди действий блоки составного макроса"""
+    return any(isinstance(a, dict) and a.get('type') in BLOCK_TYPES for a in actions)
+
+
+def is_binary(path):
+    with open(path, 'rb') as f:
+        return f.read(4) == MAGIC
+
+
+def load_macro_file(path):
+    """Загружает макрос любого поддерживаемого формата -> (metadata, EventStore)"""
+    if is_binary(path):
+        with MacroFile(path) as macro:
+            metadata, store = macro.metadata, macro.to_store()
+        store.resolution = parse_resolution(metadata.get('resolution'))
+        return metadata, store
+
+    with open(path, 'r', encoding='utf-8') as f:
+        macro_data = json.load(f)
+    if isinstance(macro_data, list):
+        # Сырая запись (recording.json)
+        return {}, EventStore.from_dicts(macro_data)
+    if isinstance(macro_data, dict) and 'actions' in macro_data:
+        if has_blocks(macro_data['actions']):
+            raise MacroFormatError("Макрос с блоками (repeat, call...) - это программа, "
+                                   "его можно только скомпилировать и проиграть")
+        metadata = {k: v for k, v in macro_data.items() if k != 'actions'}
+        store = EventStore.from_dicts(macro_data['actions'])
+        store.resolution = parse_resolution(metadata.get('resolution'))
+        return metadata, store
+    raise MacroFormatError("Неверный формат файла макроса")
+
+
+def save_macro_file(path, store, metadata=None):
+    """Сохраняет макрос; формат выбирается по расширению (.json - JSON, иначе бинарный)"""
+    if os.path.splitext(path)[1].lower() == '.json':
+        macro_data = dict(metadata or {})
+        macro_data['events_count'] = len(store)
+        # Как в заголовке бинарного файла: библиотека читает их, не разбирая события
+        macro_data['duration'] = store.duration
+        macro_data['type_counts'] = dict(store.type_counts)
+        if store.resolution:
+            macro_data['resolution'] = list(store.resolution)
+        macro_data['actions'] = store.to_dicts()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(macro_data, f, indent=2, ensure_ascii=False)
+    else:
+        write_binary(path, store, metadata)
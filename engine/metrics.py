@@ -0,0 +1,197 @@
+"""Метрики сессий записи и воспроизведения: счетчики, гистограммы, трасса"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Сколько событий трассы хранить (старые вытесняются)
+TRACE_CAPACITY = 200_000
+# Гистограммы считают микросекунды в корзинах по степеням двойки: [0, 1), [1, 2), [2, 4) ...
+HISTOGRAM_BUCKETS = 40
+# Ниже этого p99 (мкс) задержки воспроизведения не считаются проблемой
+BOTTLENECK_US = 1000
+
+
+class Histogram:
+    """Логарифмическая гистограмма задержек (значения в наносекундах)"""
+    __slots__ = ('count', 'total_ns', 'min_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, value_ns):
+        self.count += 1
+        self.total_ns += value_ns
+        if self.min_ns is None or value_ns < self.min_ns:
+            self.min_ns = value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+        # Отрицательные (раньше срока) попадают в нулевую корзину
+        index = max(int(value_ns) // 1000, 0).bit_length()
+        self.buckets[min(index, HISTOGRAM_BUCKETS - 1)] += 1
+
+    def mean_us(self):
+        return self.total_ns / self.count / 1000 if self.count else 0.0
+
+    def percentile_us(self, percent):
+        """Верхняя граница корзины, в которую попадает перцентиль"""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(float(1 << index), self.max_ns / 1000)
+        return self.max_ns / 1000
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_us': round(self.mean_us(), 3),
+            'min_us': (self.min_ns or 0) / 1000,
+            'max_us': self.max_ns / 1000,
+            'p50_us': self.percentile_us(50),
+            'p99_us': self.percentile_us(99),
+            # Нижняя граница корзины -> число замеров
+            'buckets_us': {(1 << (i - 1)) if i else 0: n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Metrics:
+    """Метрики одной сессии.
+
+    Пишут в нее потоки слушателей, воспроизведения и GUI, поэтому
+    изменения идут под блокировкой. Трасса (формат Chrome/Perfetto)
+    ведется только при trace=True и ограничена TRACE_CAPACITY событиями.
+    """
+
+    def __init__(self, name, trace=False):
+        self.name = name
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}  # имя -> (текущее, максимум)
+        self.histograms = {}
+        self.trace_enabled = trace
+        self.trace = deque(maxlen=TRACE_CAPACITY)
+        self._origin_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self._lock:
+            _, peak = self.gauges.get(name, (0, value))
+            self.gauges[name] = (value, max(peak, value))
+
+    def observe(self, name, value_ns):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(value_ns)
+
+    def observe_many(self, name, values_ns):
+        """Пачка замеров под одной блокировкой"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            for value in values_ns:
+                histogram.add(value)
+
+    # --- Трасса ---
+
+    def span(self, name, start_ns, end_ns, category='', args=None):
+        """Отрезок времени (perf_counter_ns) в трассе"""
+        if self.trace_enabled:
+            self.trace.append(('X', name, category, start_ns, end_ns - start_ns,
+                               threading.get_ident(), args))
+
+    def instant(self, name, category='', args=None):
+        if self.trace_enabled:
+            self.trace.append(('i', name, category, time.perf_counter_ns(), 0,
+                               threading.get_ident(), args))
+
+    # --- Вывод ---
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'session': self.name,
+                'started': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                'duration_s': round(time.time() - self.started, 3),
+                'counters': dict(self.counters),
+                'gauges': {name: {'current': value, 'max': peak}
+                           for name, (value, peak) in self.gauges.items()},
+                'histograms': {name: h.to_dict() for name, h in self.histograms.items()},
+            }
+
+    def summary(self):
+        """Одна строка для панели статуса"""
+        parts = []
+        with self._lock:
+            for name, histogram in self.histograms.items():
+                if histogram.count:
+                    parts.append(f"{name}: p50 {histogram.percentile_us(50):.0f} "
+                                 f"p99 {histogram.percentile_us(99):.0f} мкс")
+            for name, (value, peak) in self.gauges.items():
+                parts.append(f"{name}: {value} (макс. {peak})")
+            for name, value in self.counters.items():
+                if name.endswith('dropped') and value:
+                    parts.append(f"{name}: {value}")
+            verdict = self._bottleneck()
+        if verdict:
+            parts.append(verdict)
+        return " | ".join(parts)
+
+    def _bottleneck(self):
+        """Кто дает задержку: опоздание планировщика (рекордер) или вызов ввода (ОС/pynput)"""
+        late = self.histograms.get('playback.late')
+        inject = self.histograms.get('playback.inject')
+        if not late or not inject or not late.count:
+            return ""
+        late_us, inject_us = late.percentile_us(99), inject.percentile_us(99)
+        if max(late_us, inject_us) < BOTTLENECK_US:
+            return ""
+        return "задержки: планировщик" if late_us >= inject_us else "задержки: ввод ОС"
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+    def export_trace(self, path):
+        """Трасса в формате Chrome Trace Event (открывается в Perfetto и chrome://tracing)"""
+        pid = os.getpid()
+        origin = self._origin_ns
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': f"Macro Recorder: {self.name}"}}]
+        with self._lock:
+            trace = list(self.trace)
+        for phase, name, category, start_ns, dur_ns, tid, args in trace:
+            event = {'name': name, 'cat': category or 'macro', 'ph': phase, 'pid': pid, 'tid': tid,
+                     'ts': (start_ns - origin) / 1000}
+            if phase == 'X':
+                event['dur'] = dur_ns / 1000
+            else:
+                event['s'] = 't'
+            if args:
+                event['args'] = args
+            events.append(event)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def trace_path_for(metrics_path):
+    """macro.metrics.json -> macro.trace.json рядом"""
+    base = metrics_path[:-5] if metrics_path.lower().endswith('.json') else metrics_path
+    if base.lower().endswith('.metrics'):
+        base = base[:-8]
+    return base + '.trace.json'
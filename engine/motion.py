@@ -0,0 +1,149 @@
+"""Запись движения мыши: сжатие пути при захвате и сглаживание при воспроизведении"""
+
+# Допустимое отклонение упрощенного пути от исходного, пиксели
+MOVE_TOLERANCE_PX = 2.0
+# Точки чаще этого интервала отбрасываются сразу (прореживание по времени), сек
+MOVE_MIN_INTERVAL = 1 / 250
+# Пауза, после которой штрих считается законченным, сек
+STROKE_GAP = 0.25
+# Длинный штрих упрощается кусками, чтобы память не росла
+MAX_STROKE_POINTS = 4096
+# Частота, с которой путь восстанавливается при воспроизведении, Гц
+MOVE_PLAYBACK_HZ = 125
+
+
+def simplify_path(points, tolerance=MOVE_TOLERANCE_PX):
+    """Упрощение Рамера-Дугласа-Пекера для точек (t, x, y).
+
+    Итеративная версия (без рекурсии); первая и последняя точки сохраняются.
+    """
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return list(points)
+
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        _, x1, y1 = points[first]
+        _, x2, y2 = points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+
+        max_dist_sq = -1.0
+        index = first
+        for i in range(first + 1, last):
+            _, px, py = points[i]
+            if length_sq:
+                # Квадрат расстояния до прямой через первую и последнюю точки
+                cross = dx * (py - y1) - dy * (px - x1)
+                dist_sq = cross * cross / length_sq
+            else:
+                dist_sq = (px - x1) ** 2 + (py - y1) ** 2
+            if dist_sq > max_dist_sq:
+                max_dist_sq = dist_sq
+                index = i
+
+        if max_dist_sq > tolerance_sq:
+            keep[index] = True
+            if index - first > 1:
+                stack.append((first, index))
+            if last - index > 1:
+                stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+class MotionCompressor:
+    """Сжимает поток движений мыши в момент записи.
+
+    Точки прореживаются по времени сразу при поступлении, а штрих
+    (движение без пауз) упрощается алгоритмом RDP, когда он закончен:
+    после паузы, перед кликом/клавишей или при остановке записи.
+    """
+
+    def __init__(self, tolerance=MOVE_TOLERANCE_PX, min_interval=MOVE_MIN_INTERVAL,
+                 stroke_gap=STROKE_GAP):
+        self.tolerance = tolerance
+        self.min_interval = min_interval
+        self.stroke_gap = stroke_gap
+        self._stroke = []
+        self._last_raw = None
+        self.raw_count = 0
+        self.kept_count = 0
+
+    def add(self, t, x, y):
+        """Добавляет сырую точку; возвращает точки завершенного штриха (или [])"""
+        self.raw_count += 1
+        finished = []
+        last = self.pending_since()
+        if last is not None and t - last > self.stroke_gap:
+            finished = self.flush()
+
+        stroke = self._stroke
+        if stroke and t - stroke[-1][0] < self.min_interval:
+            # Последнюю сырую точку помним: ей заканчивается штрих
+            self._last_raw = (t, x, y)
+            return finished
+
+        stroke.append((t, x, y))
+        self._last_raw = None
+        if len(stroke) >= MAX_STROKE_POINTS:
+            finished += self.flush(keep_tail=True)
+        return finished
+
+    def flush(self, keep_tail=False):
+        """Завершает текущий штрих и возвращает его упрощенные точки"""
+        stroke = self._stroke
+        if self._last_raw is not None:
+            stroke.append(self._last_raw)
+            self._last_raw = None
+        if not stroke:
+            return []
+
+        points = simplify_path(stroke, self.tolerance)
+        # При разбиении длинного штриха последняя точка начинает следующий кусок
+        self._stroke = [stroke[-1]] if keep_tail else []
+        if keep_tail:
+            points = points[:-1]
+        self.kept_count += len(points)
+        return points
+
+    def pending_since(self):
+        """Время последней точки незавершенного штриха (или None)"""
+        if self._last_raw is not None:
+            return self._last_raw[0]
+        return self._stroke[-1][0] if self._stroke else None
+
+
+def interpolate_segment(p0, p1, p2, p3, t1_ns, t2_ns, rate_hz=MOVE_PLAYBACK_HZ):
+    """Точки сплайна Катмулла-Рома между p1 и p2 (не включая p1, включая p2).
+
+    Возвращает список (offset_ns, x, y) с шагом около 1/rate_hz.
+    """
+    span = t2_ns - t1_ns
+    interval = 1e9 / rate_hz
+    steps = int(span // interval) if span > 0 else 0
+    if steps <= 1:
+        return [(t2_ns, p2[0], p2[1])]
+
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = p0, p1, p2, p3
+    # Касательные в p1 и p2
+    mx1, my1 = (x2 - x0) / 2, (y2 - y0) / 2
+    mx2, my2 = (x3 - x1) / 2, (y3 - y1) / 2
+    points = []
+    for k in range(1, steps):
+        u = k / steps
+        u2 = u * u
+        u3 = u2 * u
+        h00 = 2 * u3 - 3 * u2 + 1
+        h10 = u3 - 2 * u2 + u
+        h01 = -2 * u3 + 3 * u2
+        h11 = u3 - u2
+        x = h00 * x1 + h10 * mx1 + h01 * x2 + h11 * mx2
+        y = h00 * y1 + h10 * my1 + h01 * y2 + h11 * my2
+        points.append((t1_ns + span * k // steps, round(x), round(y)))
+    points.append((t2_ns, x2, y2))
+    return points
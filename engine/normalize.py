@@ -0,0 +1,198 @@
+"""Нормализация записанного макроса: убираем избыточный ввод.
+
+Эвристики по времени (автоповтор, удержание, дубли кликов, склейка
+текста) применяются только к событиям с меткой time: у событий без
+времени интервал неизвестен, и они остаются как есть.
+"""
+from engine.event_store import EventStore
+
+# Повтор той же клавиши быстрее этого без отпускания - автоповтор ОС, сек
+REPEAT_MAX_GAP = 0.04
+# Нажатие короче этого считается обычным тапом, длиннее - удержанием, сек
+HOLD_MIN_DURATION = 0.15
+# Символы с паузами не длиннее этой склеиваются в одну строку текста, сек
+TEXT_MAX_GAP = 0.15
+# Повторный клик ближе этого по времени и расстоянию - дубль
+CLICK_DUP_GAP = 0.02
+CLICK_DUP_PX = 2
+
+
+class NormalizationReport:
+    """Что было убрано или свернуто при нормализации"""
+
+    def __init__(self):
+        self.events_before = 0
+        self.events_after = 0
+        self.repeats_merged = 0
+        self.holds = 0
+        self.releases_folded = 0
+        self.text_runs = 0
+        self.chars_folded = 0
+        self.duplicate_clicks = 0
+
+    @property
+    def removed(self):
+        return self.events_before - self.events_after
+
+    def summary(self):
+        parts = []
+        if self.repeats_merged:
+            parts.append(f"автоповторов: {self.repeats_merged}")
+        if self.holds:
+            parts.append(f"удержаний: {self.holds}")
+        if self.text_runs:
+            parts.append(f"строк текста: {self.text_runs} ({self.chars_folded} символов)")
+        if self.duplicate_clicks:
+            parts.append(f"дублей кликов: {self.duplicate_clicks}")
+        text = f"Нормализация: {self.events_before} -> {self.events_after} событий"
+        if parts:
+            text += " (" + ", ".join(parts) + ")"
+        return text
+
+
+def _is_char(key):
+    return isinstance(key, str) and len(key) == 1 and key.isprintable()
+
+
+def _time(event):
+    """Время события или None, если его нет"""
+    value = event.get('time')
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def _gap(later, earlier):
+    """Интервал между событиями или None, если у одного из них нет времени"""
+    t1, t0 = _time(later), _time(earlier)
+    if t1 is None or t0 is None:
+        return None
+    return t1 - t0
+
+
+def _pair_presses(events, report):
+    """Сворачивает автоповтор и пары нажатие/отпускание.
+
+    Возвращает список dict: тап остается key_press, долгое нажатие
+    становится key_hold с полем duration, отпускания исчезают.
+    """
+    has_releases = any(event.get('type') == 'key_release' for event in events)
+    result = []
+    held = {}  # клавиша -> индекс нажатия в result
+
+    for event in events:
+        event_type = event.get('type')
+        if event_type == 'key_press':
+            key = event.get('key')
+            index = held.get(key)
+            if index is not None:
+                previous = result[index]
+                # Без отпускания между нажатиями - это автоповтор
+                last = previous.get('_last')
+                gap = None if last is None or _time(event) is None else _time(event) - last
+                if has_releases or (gap is not None and gap < REPEAT_MAX_GAP):
+                    previous['_last'] = _time(event)
+                    report.repeats_merged += 1
+                    continue
+            event = dict(event)
+            if not has_releases:
+                event['_last'] = _time(event)
+            held[key] = len(result)
+            result.append(event)
+
+        elif event_type == 'key_release':
+            index = held.pop(event.get('key'), None)
+            if index is None:
+                # Отпускание без нажатия (нажали до начала записи)
+                report.releases_folded += 1
+                continue
+            press = result[index]
+            duration = _gap(event, press)
+            if duration is not None and duration >= HOLD_MIN_DURATION:
+                press['type'] = 'key_hold'
+                press['duration'] = duration
+                report.holds += 1
+            report.releases_folded += 1
+
+        else:
+            result.append(dict(event))
+
+    for event in result:
+        event.pop('_last', None)
+    # Нажатые и не отпущенные до конца записи клавиши остаются тапами
+    return result
+
+
+def _fold_text(events, report):
+    """Склеивает подряд идущие тапы печатных символов в одно событие text.
+
+    text печатается разом, поэтому ритм нажатий теряется: только для явной
+    очистки записи (convert --normalize), не при загрузке.
+    """
+    result = []
+    run = []
+
+    def close_run():
+        if len(run) >= 2:
+            first = dict(run[0])
+            first['type'] = 'text'
+            first['text'] = ''.join(event['key'] for event in run)
+            del first['key']
+            result.append(first)
+            report.text_runs += 1
+            report.chars_folded += len(run)
+        else:
+            result.extend(run)
+        run.clear()
+
+    for event in events:
+        if (event.get('type') == 'key_press' and _is_char(event.get('key')) and 'duration' not in event
+                and _time(event) is not None):
+            if run and _gap(event, run[-1]) > TEXT_MAX_GAP:
+                close_run()
+            run.append(event)
+            continue
+        close_run()
+        result.append(event)
+    close_run()
+    return result
+
+
+def _drop_duplicate_clicks(events, report):
+    result = []
+    last_click = None
+    for event in events:
+        if event.get('type') == 'click':
+            if (last_click is not None
+                    and event.get('button') == last_click.get('button')
+                    and abs(event.get('x', 0) - last_click.get('x', 0)) <= CLICK_DUP_PX
+                    and abs(event.get('y', 0) - last_click.get('y', 0)) <= CLICK_DUP_PX
+                    and _gap(event, last_click) is not None
+                    and _gap(event, last_click) < CLICK_DUP_GAP):
+                report.duplicate_clicks += 1
+                continue
+            last_click = event
+        elif event.get('type') != 'move':
+            last_click = None
+        result.append(event)
+    return result
+
+
+def normalize_events(events, fold_text=False):
+    """Нормализует макрос -> (EventStore, NormalizationReport).
+
+    Исходное хранилище не меняется. fold_text=True склеивает набранный
+    текст (см. _fold_text).
+    """
+    report = NormalizationReport()
+    report.events_before = len(events)
+
+    result = _pair_presses(events, report)
+    if fold_text:
+        result = _fold_text(result, report)
+    result = _drop_duplicate_clicks(result, report)
+
+    store = EventStore.from_dicts(result)
+    store.resolution = getattr(events, 'resolution', None)
+    report.events_after = len(store)
+    return store, report
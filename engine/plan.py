@@ -0,0 +1,185 @@
+"""Компиляция макроса в план воспроизведения"""
+import heapq
+
+from pynput import mouse, keyboard
+
+from engine.motion import MOVE_PLAYBACK_HZ, STROKE_GAP, interpolate_segment
+from engine.transform import plugin_pipeline
+
+# Опкоды шагов плана
+OP_NOP = 0
+OP_CLICK = 1
+OP_KEY = 2
+OP_TYPE = 3
+OP_MOVE = 4
+OP_PRESS = 5
+OP_RELEASE = 6
+
+_STROKE_GAP_NS = round(STROKE_GAP * 1e9)
+
+
+class PlaybackPlan:
+    """Скомпилированный макрос.
+
+    Каждый шаг - кортеж (offset_ns, op, arg, x, y, label), где offset_ns -
+    смещение от первого события, arg - уже разрешенный объект pynput
+    (Button/Key), символ для press/release или строка для type().
+    """
+    __slots__ = ('steps', 'duration_ns')
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.duration_ns = steps[-1][0] if steps else 0
+
+    def __len__(self):
+        return len(self.steps)
+
+    def iter_steps(self):
+        return iter(self.steps)
+
+    def close(self):
+        pass
+
+
+def _resolve_key(key):
+    """'Key.enter' -> keyboard.Key.enter, одиночный символ -> он сам, иначе None"""
+    if 'Key.' in key:
+        return getattr(keyboard.Key, key.replace('Key.', ''), None)
+    if len(key) == 1:
+        return key
+    return None
+
+
+def _compile_event(event):
+    """Возвращает (op, arg, x, y, label) для одного события"""
+    event_type = event.get('type')
+
+    if event_type == 'click':
+        x, y = event['x'], event['y']
+        return OP_CLICK, mouse.Button[event['button']], x, y, f"клик ({x}, {y})"
+
+    if event_type == 'key_press':
+        key = event['key']
+        label = f"клавиша {key}"
+        if 'Key.' in key:
+            key_obj = _resolve_key(key)
+            if key_obj is None:
+                return OP_NOP, None, 0, 0, label
+            return OP_KEY, key_obj, 0, 0, label
+        return OP_TYPE, key, 0, 0, label
+
+    if event_type == 'key_hold':
+        key = event['key']
+        key_obj = _resolve_key(key)
+        label = f"удержание {key} ({event['duration']:.2f} сек)"
+        return (OP_PRESS if key_obj is not None else OP_NOP), key_obj, 0, 0, label
+
+    if event_type == 'key_release':
+        key_obj = _resolve_key(event['key'])
+        return (OP_RELEASE if key_obj is not None else OP_NOP), key_obj, 0, 0, None
+
+    if event_type == 'text':
+        text = event['text']
+        return OP_TYPE, text, 0, 0, f"текст {text!r}"
+
+    return OP_NOP, None, 0, 0, None
+
+
+class PlanCompiler:
+    """Инкрементальный компилятор: события можно подавать пачками.
+
+    Состояние (начало шкалы, последнее смещение) переносится между
+    пачками, поэтому потоковое воспроизведение получает те же шаги,
+    что и компиляция всего макроса сразу.
+    """
+
+    def __init__(self, plugin=None, move_rate_hz=MOVE_PLAYBACK_HZ):
+        self.plugin = plugin
+        # Плагин применяется ко всей пачке сразу, а не к каждому событию
+        self.pipeline = plugin_pipeline(plugin)
+        self.move_rate_hz = move_rate_hz
+        self.start_time = None
+        self.offset_ns = 0
+        self.count = 0
+        # Опорные точки движения, сегменты между которыми еще не выданы
+        self._path = []
+        # Отложенные отпускания удержаний: (offset_ns, номер, шаг)
+        self._releases = []
+
+    def compile(self, events):
+        steps = []
+        for event in self.pipeline.run(events):
+            if 'time' in event:
+                if self.start_time is None:
+                    self.start_time = event['time']
+                # Смещения не убывают, даже если время в файле перепутано
+                self.offset_ns = max(round((event['time'] - self.start_time) * 1e9), self.offset_ns)
+            elif self.count:
+                # Для пресетов без времени - фиксированная задержка
+                self.offset_ns += 500_000_000
+
+            self.count += 1
+            if event.get('type') == 'move':
+                self._add_move(steps, self.offset_ns, event['x'], event['y'])
+                continue
+
+            self._flush_moves(steps)
+            step = (self.offset_ns,) + _compile_event(event)
+            self._append(steps, step)
+            if step[1] == OP_PRESS:
+                release_ns = self.offset_ns + round(event['duration'] * 1e9)
+                heapq.heappush(self._releases, (release_ns, self.count,
+                                                (release_ns, OP_RELEASE, step[2], 0, 0, None)))
+        return steps
+
+    def _append(self, steps, step):
+        # Отпускания, время которых уже наступило, идут раньше шага
+        releases = self._releases
+        while releases and releases[0][0] <= step[0]:
+            steps.append(heapq.heappop(releases)[2])
+        steps.append(step)
+
+    def finish(self):
+        """Выдает шаги, придержанные до конца макроса (хвост пути мыши)"""
+        steps = []
+        self._flush_moves(steps)
+        while self._releases:
+            steps.append(heapq.heappop(self._releases)[2])
+        return steps
+
+    def _add_move(self, steps, offset_ns, x, y):
+        path = self._path
+        point = (offset_ns, x, y)
+        if path and offset_ns - path[-1][0] > _STROKE_GAP_NS:
+            # После паузы новый штрих: не растягиваем движение на всю паузу
+            self._flush_moves(steps)
+        if not path:
+            self._append(steps, (offset_ns, OP_MOVE, None, x, y, None))
+            path.append(point)
+            return
+
+        path.append(point)
+        if len(path) >= 3:
+            # Сегмент path[-3] -> path[-2] можно строить: следующая точка известна
+            self._emit_segment(steps, path[-4] if len(path) >= 4 else path[-3], path[-3], path[-2], point)
+            del path[:-3]
+
+    def _flush_moves(self, steps):
+        path = self._path
+        if len(path) >= 2:
+            self._emit_segment(steps, path[-3] if len(path) >= 3 else path[-2], path[-2], path[-1], path[-1])
+        path.clear()
+
+    def _emit_segment(self, steps, p0, p1, p2, p3):
+        for offset_ns, x, y in interpolate_segment(p0[1:], p1[1:], p2[1:], p3[1:],
+                                                   p1[0], p2[0], self.move_rate_hz):
+            self._append(steps, (offset_ns, OP_MOVE, None, x, y, None))
+
+
+def compile_plan(events, plugin=None, move_rate_hz=MOVE_PLAYBACK_HZ):
+    """Компилирует события в план: плагин применяется один раз, а не на каждом цикле.
+
+    Уже преобразованный макрос (TransformCache) передается с plugin=None.
+    """
+    compiler = PlanCompiler(plugin, move_rate_hz)
+    return PlaybackPlan(compiler.compile(events) + compiler.finish())
@@ -0,0 +1,29 @@
+"""Выполнение шагов скомпилированного плана на контроллерах.
+
+Сами планы играют дорожки TrackScheduler (engine.tracks).
+"""
+from engine.plan import OP_CLICK, OP_KEY, OP_TYPE, OP_MOVE, OP_PRESS, OP_RELEASE
+
+# Имена шагов в трассе
+OP_NAMES = {OP_CLICK: 'click', OP_KEY: 'key', OP_TYPE: 'type', OP_MOVE: 'move',
+            OP_PRESS: 'press', OP_RELEASE: 'release'}
+
+
+def execute_step(mouse_ctrl, keyboard_ctrl, op, arg, x, y, held_keys):
+    """Выполняет один шаг плана; held_keys - зажатые клавиши (отпускаются при остановке)"""
+    if op == OP_MOVE:
+        mouse_ctrl.position = (x, y)
+    elif op == OP_CLICK:
+        mouse_ctrl.position = (x, y)
+        mouse_ctrl.click(arg)
+    elif op == OP_KEY:
+        keyboard_ctrl.press(arg)
+        keyboard_ctrl.release(arg)
+    elif op == OP_TYPE:
+        keyboard_ctrl.type(arg)
+    elif op == OP_PRESS:
+        keyboard_ctrl.press(arg)
+        held_keys.add(arg)
+    elif op == OP_RELEASE:
+        keyboard_ctrl.release(arg)
+        held_keys.discard(arg)
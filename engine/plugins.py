@@ -0,0 +1,351 @@
+"""Плагины игр: встроенные и внешние из папки plugins/"""
+import importlib.util
+import os
+
+DEFAULT_GAME = "Обычный режим"
+PLUGIN_DIR = "plugins"
+# Разрешение, под которое написаны координаты и пресеты плагинов
+BASE_RESOLUTION = (1920, 1080)
+
+# Система плагинов
+def _exec_plugin(name, plugin_path):
+    spec = importlib.util.spec_from_file_location(name, plugin_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_game_plugin(game_name):
+    """Загружает плагин для игры"""
+    # Пробуем разные варианты путей
+    possible_paths = [
+        f"plugins/{game_name}.py",
+        f"plugins/{game_name.lower()}.py",
+        f"{game_name}.py"
+    ]
+    
+    for plugin_path in possible_paths:
+        if os.path.exists(plugin_path):
+            try:
+                return _exec_plugin(game_name, plugin_path)
+            except Exception as e:
+                print(f"Ошибка загрузки плагина {plugin_path}: {e}")
+                return None
+    return None
+
+# Плагины (можно вынести в отдельные файлы)
+class BasePlugin:
+    """Базовый класс плагина"""
+    def get_game_specific_keys(self):
+        return {}
+    
+    def get_default_coords(self):
+        return {}
+    
+    def get_macro_presets(self):
+        return []
+    
+    def get_base_resolution(self):
+        """Экран, для которого заданы координаты плагина"""
+        return BASE_RESOLUTION
+    
+    def pre_process_event(self, event):
+        """Предобработка события перед записью"""
+        return event
+    
+    def post_process_event(self, event):
+        """Постобработка события перед воспроизведением"""
+        return event
+    
+    def process_batch(self, events):
+        """Постобработка всего макроса разом; по умолчанию - post_process_event для каждого события"""
+        post_process = self.post_process_event
+        return [post_process(event) for event in events]
+    
+    def has_batch_transform(self):
+        """Меняет ли плагин события перед воспроизведением"""
+        cls = type(self)
+        return (cls.process_batch is not BasePlugin.process_batch
+                or cls.post_process_event is not BasePlugin.post_process_event)
+
+class CS2Plugin(BasePlugin):
+    def get_game_specific_keys(self):
+        return {
+            'shoot': 'left_click',
+            'reload': 'r',
+            'jump': 'space',
+            'crouch': 'ctrl',
+            'sprint': 'shift',
+            'knife': '1',
+            'pistol': '2',
+            'primary': '3',
+            'use': 'e',
+            'inspect': 'f'
+        }
+    
+    def get_default_coords(self):
+        return {
+            'buy_menu': (960, 540),
+            'defuse_kit': (100, 100),
+            'map_center': (960, 540),
+            'radar': (1750, 150)
+        }
+    
+    def get_macro_presets(self):
+        return [
+            {
+                'name': 'Быстрая покупка AK47',
+                'actions': [
+                    {'type': 'key_press', 'key': 'b', 'time': 0.1},
+                    {'type': 'click', 'x': 800, 'y': 400, 'button': 'left', 'time': 0.2},
+                    {'type': 'click', 'x': 900, 'y': 300, 'button': 'left', 'time': 0.3}
+                ]
+            },
+            {
+                'name': 'Быстрое переключение оружия',
+                'actions': [
+                    {'type': 'key_press', 'key': '1', 'time': 0.1},
+                    {'type': 'key_press', 'key': '2', 'time': 0.2},
+                    {'type': 'key_press', 'key': '3', 'time': 0.3}
+                ]
+            }
+        ]
+
+class Dota2Plugin(BasePlugin):
+    def get_game_specific_keys(self):
+        return {
+            'attack': 'a',
+            'move': 's',
+            'cast_q': 'q',
+            'cast_w': 'w',
+            'cast_e': 'e',
+            'cast_r': 'r',
+            'item_1': 'd',
+            'item_2': 'f',
+            'item_3': 'g',
+            'item_4': 'z',
+            'item_5': 'x',
+            'item_6': 'c'
+        }
+    
+    def get_macro_presets(self):
+        return [
+            {
+                'name': 'Комбо Q-W-E',
+                'actions': [
+                    {'type': 'key_press', 'key': 'q', 'time': 0.1},
+                    {'type': 'key_press', 'key': 'w', 'time': 0.3},
+                    {'type': 'key_press', 'key': 'e', 'time': 0.5}
+                ]
+            },
+            {
+                'name': 'Использование всех предметов',
+                'actions': [
+                    {'type': 'key_press', 'key': 'd', 'time': 0.1},
+                    {'type': 'key_press', 'key': 'f', 'time': 0.2},
+                    {'type': 'key_press', 'key': 'g', 'time': 0.3}
+                ]
+            }
+        ]
+
+class OSUPlugin(BasePlugin):
+    def get_game_specific_keys(self):
+        return {
+            'click_left': 'z',
+            'click_right': 'x',
+            'smoke': 'c',
+            'skip': 'space'
+        }
+    
+    def get_macro_presets(self):
+        return [
+            {
+                'name': 'Быстрое кликание',
+                'actions': [
+                    {'type': 'key_press', 'key': 'z', 'time': 0.05},
+                    {'type': 'key_press', 'key': 'x', 'time': 0.1},
+                    {'type': 'key_press', 'key': 'z', 'time': 0.15},
+                    {'type': 'key_press', 'key': 'x', 'time': 0.2}
+                ]
+            }
+        ]
+
+class BladeSoulPlugin(BasePlugin):
+    def get_game_specific_keys(self):
+        return {
+            'attack_1': '1',
+            'attack_2': '2',
+            'attack_3': '3',
+            'attack_4': '4',
+            'dodge': 'f',
+            'block': 'q',
+            'special': 'r'
+        }
+    
+    def get_macro_presets(self):
+        return [
+            {
+                'name': 'Базовый комбо атаки',
+                'actions': [
+                    {'type': 'key_press', 'key': '1', 'time': 0.1},
+                    {'type': 'key_press', 'key': '2', 'time': 0.3},
+                    {'type': 'key_press', 'key': '3', 'time': 0.5},
+                    {'type': 'key_press', 'key': '4', 'time': 0.7}
+                ]
+            }
+        ]
+
+
+class ModulePlugin(BasePlugin):
+    """Плагин на основе внешнего модуля plugins/<game>.py"""
+    def __init__(self, module):
+        self.module = module
+    
+    def get_game_specific_keys(self):
+        return getattr(self.module, 'get_game_specific_keys', lambda: {})()
+    
+    def get_default_coords(self):
+        return getattr(self.module, 'get_default_coords', lambda: {})()
+    
+    def get_macro_presets(self):
+        return getattr(self.module, 'get_macro_presets', lambda: [])()
+    
+    def get_base_resolution(self):
+        return getattr(self.module, 'get_base_resolution', lambda: BASE_RESOLUTION)()
+    
+    def process_batch(self, events):
+        # Модуль может объявить process_batch или старый post_process_event
+        process_batch = getattr(self.module, 'process_batch', None)
+        if process_batch:
+            return process_batch(events)
+        post_process = getattr(self.module, 'post_process_event', None)
+        if post_process:
+            return [post_process(event) for event in events]
+        return events
+    
+    def has_batch_transform(self):
+        return hasattr(self.module, 'process_batch') or hasattr(self.module, 'post_process_event')
+
+
+def builtin_plugins():
+    """Встроенные плагины по названию игры"""
+    return {
+        DEFAULT_GAME: BasePlugin(),
+        "CS2": CS2Plugin(),
+        "Dota 2": Dota2Plugin(),
+        "OSU!": OSUPlugin(),
+        "Blade&Soul": BladeSoulPlugin()
+    }
+
+
+def plugin_file_name(game_name):
+    """Имя файла внешнего плагина для игры: 'Blade&Soul' -> 'bladesoul'"""
+    return game_name.lower().replace(" ", "").replace("&", "").replace("!", "")
+
+
+class PluginRegistry:
+    """Реестр плагинов: папка plugins/ просматривается один раз.
+
+    Загруженные модули кешируются и перечитываются, только если у файла
+    изменилось время модификации. Клавиши и пресеты плагина считаются
+    один раз, пресеты ищутся по имени через словарь.
+    """
+
+    def __init__(self, plugin_dir=PLUGIN_DIR):
+        self.plugin_dir = plugin_dir
+        self.builtins = builtin_plugins()
+        self._files = None
+        # путь -> (mtime, ModulePlugin)
+        self._modules = {}
+        # плагин -> (клавиши, пресеты, {имя: пресет})
+        self._info = {}
+
+    def games(self):
+        return list(self.builtins)
+
+    def discover(self):
+        """Перечитывает список файлов plugins/ -> {имя без .py: путь}"""
+        files = {}
+        try:
+            with os.scandir(self.plugin_dir) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    if ext == '.py' and entry.is_file():
+                        files[stem.lower()] = entry.path
+        except OSError:
+            pass
+        self._files = files
+        return files
+
+    def _plugin_path(self, name):
+        if self._files is None:
+            self.discover()
+        path = self._files.get(name)
+        if path is None and os.path.exists(f"{name}.py"):
+            path = f"{name}.py"
+        return path
+
+    def _load(self, name, path):
+        """Модуль плагина из кеша; перезагрузка только при изменении файла"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # Файл удалили после просмотра папки
+            self._forget(path)
+            self.discover()
+            return None
+        cached = self._modules.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            plugin = ModulePlugin(_exec_plugin(name, path))
+        except Exception as e:
+            print(f"Ошибка загрузки плагина {path}: {e}")
+            self._forget(path)
+            return None
+        self._forget(path)
+        self._modules[path] = (mtime, plugin)
+        return plugin
+
+    def _forget(self, path):
+        cached = self._modules.pop(path, None)
+        if cached:
+            self._info.pop(cached[1], None)
+
+    def get(self, game_name):
+        """Плагин для игры -> (plugin, источник: 'external'/'builtin'/'default')"""
+        if game_name == DEFAULT_GAME:
+            return self.builtins[DEFAULT_GAME], 'default'
+        
+        # Пробуем загрузить внешний плагин
+        name = plugin_file_name(game_name)
+        path = self._plugin_path(name)
+        if path:
+            plugin = self._load(name, path)
+            if plugin:
+                return plugin, 'external'
+        # Используем встроенный плагин
+        return self.builtins.get(game_name, self.builtins[DEFAULT_GAME]), 'builtin'
+
+    def _plugin_info(self, plugin):
+        info = self._info.get(plugin)
+        if info is None:
+            presets = plugin.get_macro_presets()
+            info = (plugin.get_game_specific_keys(), presets, {p['name']: p for p in presets})
+            self._info[plugin] = info
+        return info
+
+    def keys(self, plugin):
+        return self._plugin_info(plugin)[0]
+
+    def presets(self, plugin):
+        return self._plugin_info(plugin)[1]
+
+    def preset(self, plugin, name):
+        """Пресет по имени или None"""
+        return self._plugin_info(plugin)[2].get(name)
+
+    def default_coords(self, plugin, mapping=None):
+        """Координаты плагина, пересчитанные под экран (mapping - ScreenMapping или None)"""
+        coords = plugin.get_default_coords()
+        return mapping.map_coords(coords) if mapping else coords
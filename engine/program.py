@@ -0,0 +1,375 @@
+"""Составные макросы: повторы, вызовы и разделы в одном потоке инструкций.
+
+JSON-макрос может содержать в 'actions', кроме обычных событий, блоки:
+
+    {"type": "repeat", "count": 10000, "actions": [...]}
+    {"type": "call", "macro": "buy.mrec"}      - другой сохраненный макрос
+    {"type": "preset", "name": "Комбо Q-W-E"}  - пресет плагина игры
+    {"type": "label", "name": "фарм"}          - начало раздела (видно в логе)
+    {"type": "wait", "seconds": 1.5}
+
+Подряд идущие события - сегмент: паузы внутри него берутся из 'time',
+сегменты и блоки идут друг за другом без пауз (для паузы - wait).
+Каждый сегмент компилируется один раз, повтор хранит только счетчик,
+поэтому 10 000 итераций занимают на диске и в памяти столько же, сколько
+одна.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from engine.event_store import EventStore, parse_resolution
+from engine.macro_file import BLOCK_TYPES, MAGIC, MacroFormatError, has_blocks, load_macro_file, is_binary
+from engine.motion import MOVE_PLAYBACK_HZ
+from engine.normalize import normalize_events
+from engine.plan import PlanCompiler, OP_NOP
+from engine.screen import ASPECT_FIT, mapping_for, remap_store
+
+# Глубина вложенных вызовов программ
+MAX_CALL_DEPTH = 32
+
+# Инструкции: (код, аргумент, аргумент)
+I_SEGMENT = 0  # (I_SEGMENT, номер сегмента)
+I_WAIT = 1     # (I_WAIT, нс)
+I_LABEL = 2    # (I_LABEL, текст)
+I_REPEAT = 3   # (I_REPEAT, число повторов, адрес I_END)
+I_END = 4      # (I_END, адрес I_REPEAT)
+I_CALL = 5     # (I_CALL, номер подпрограммы)
+I_RETURN = 6
+
+
+def is_program(macro_data):
+    """Есть ли в JSON-макросе блоки (на верхнем уровне)"""
+    if not isinstance(macro_data, dict) or not isinstance(macro_data.get('actions'), list):
+        return False
+    return has_blocks(macro_data['actions'])
+
+
+def is_program_file(path):
+    if is_binary(path):
+        return False
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return is_program(json.load(f))
+    except (OSError, ValueError):
+        return False
+
+
+def _read_program(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise MacroFormatError(f"Неверный формат файла макроса {path}: {e}")
+
+
+def program_digest(path, _stack=()):
+    """SHA-256 программы вместе со всеми вызываемыми файлами"""
+    path = os.path.abspath(path)
+    if path in _stack:
+        raise MacroFormatError(f"Рекурсивный вызов макроса: {path}")
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data)
+    if not data.startswith(MAGIC):
+        try:
+            macro_data = json.loads(data.decode('utf-8'))
+        except ValueError:
+            macro_data = None
+        base = os.path.dirname(path)
+        for target in _call_targets(macro_data.get('actions', []) if is_program(macro_data) else []):
+            digest.update(program_digest(os.path.join(base, target), _stack + (path,)).encode())
+    return digest.hexdigest()
+
+
+def _call_targets(actions):
+    for action in actions:
+        if not isinstance(action, dict):
+            continue
+        if action.get('type') == 'call':
+            yield action['macro']
+        elif action.get('type') == 'repeat':
+            yield from _call_targets(action.get('actions', []))
+
+
+def _number(action, name, default, kind):
+    """Неотрицательное число из блока: иначе длительность и число шагов ушли бы в минус"""
+    try:
+        value = kind(action[name] if default is None else action.get(name, default))
+    except (KeyError, TypeError, ValueError):
+        raise MacroFormatError(f"Неверное значение '{name}' в блоке {action['type']}: {action.get(name)!r}")
+    if not value >= 0:
+        raise MacroFormatError(f"'{name}' в блоке {action['type']} не может быть меньше нуля: {value}")
+    return value
+
+
+class ProgramPlan:
+    """Скомпилированная программа с интерфейсом плана (iter_steps, duration_ns).
+
+    Шаги сегментов хранятся со смещениями от начала сегмента; интерпретатор
+    сдвигает их на текущую позицию шкалы, раскручивая повторы и вызовы.
+    """
+    __slots__ = ('code', 'segments', 'routines', 'duration_ns', 'step_count', 'digest')
+
+    def __init__(self, code, segments, routines, digest=None):
+        self.code = code
+        # [(шаги, длительность_нс)]
+        self.segments = segments
+        # номер подпрограммы -> адрес первой инструкции
+        self.routines = routines
+        self.digest = digest
+        self.duration_ns, self.step_count = self._measure(0)[:2]
+
+    def __len__(self):
+        return self.step_count
+
+    def _measure(self, pc):
+        """Длительность и число шагов без раскрутки повторов -> (нс, шаги, адрес конца)"""
+        code, segments = self.code, self.segments
+        duration = steps = 0
+        while True:
+            instruction = code[pc]
+            op = instruction[0]
+            if op == I_SEGMENT:
+                seg_steps, seg_duration = segments[instruction[1]]
+                duration += seg_duration
+                steps += len(seg_steps)
+            elif op == I_WAIT:
+                duration += instruction[1]
+            elif op == I_LABEL:
+                steps += 1
+            elif op == I_REPEAT:
+                body_duration, body_steps, end = self._measure(pc + 1)
+                duration += body_duration * instruction[1]
+                steps += body_steps * instruction[1]
+                pc = end
+            elif op == I_CALL:
+                call_duration, call_steps, _ = self._measure(self.routines[instruction[1]])
+                duration += call_duration
+                steps += call_steps
+            else:  # I_END, I_RETURN
+                return duration, steps, pc
+            pc += 1
+
+    def iter_steps(self):
+        code, segments, routines = self.code, self.segments, self.routines
+        cursor = 0
+        pc = 0
+        # Счетчики повторов ([адрес, осталось]) и адреса возврата вперемешку: вложены правильно
+        stack = []
+        while True:
+            instruction = code[pc]
+            op = instruction[0]
+            if op == I_SEGMENT:
+                seg_steps, seg_duration = segments[instruction[1]]
+                for step in seg_steps:
+                    yield (cursor + step[0],) + step[1:]
+                cursor += seg_duration
+            elif op == I_WAIT:
+                cursor += instruction[1]
+            elif op == I_LABEL:
+                yield cursor, OP_NOP, None, 0, 0, instruction[1]
+            elif op == I_REPEAT:
+                if instruction[1] <= 0:
+                    pc = instruction[2]
+                else:
+                    stack.append([pc, instruction[1]])
+            elif op == I_END:
+                counter = stack[-1]
+                counter[1] -= 1
+                if counter[1] > 0:
+                    pc = counter[0]
+                else:
+                    stack.pop()
+            elif op == I_CALL:
+                stack.append(pc)
+                pc = routines[instruction[1]]
+                continue
+            else:  # I_RETURN
+                if not stack:
+                    return
+                pc = stack.pop()
+            pc += 1
+
+    def close(self):
+        pass
+
+
+class ProgramCompiler:
+    """Компилирует JSON-программу и все, что она вызывает, в ProgramPlan.
+
+    Плагин применяется к каждому сегменту при компиляции, координаты
+    пересчитываются под экран target. Вызванные файлы компилируются один
+    раз, сколько бы раз их ни вызывали. registry нужен для блоков preset.
+    """
+
+    def __init__(self, plugin=None, registry=None, target=None, aspect=ASPECT_FIT,
+                 move_rate_hz=MOVE_PLAYBACK_HZ):
+        self.plugin = plugin
+        self.registry = registry
+        self.target = target
+        self.aspect = aspect
+        self.move_rate_hz = move_rate_hz
+        self.segments = []
+        self.routines = []  # код подпрограмм (списки инструкций)
+        self._called = {}   # абсолютный путь -> ('segment'/'routine', номер)
+        self._stack = []
+
+    def compile_file(self, path, digest=None):
+        path = os.path.abspath(path)
+        macro_data = _read_program(path)
+        if not is_program(macro_data):
+            raise MacroFormatError(f"В макросе нет блоков: {path}")
+        self._stack.append(path)
+        main = self._compile_program(macro_data, os.path.dirname(path))
+        self._stack.pop()
+
+        # Раскладка: основная программа, за ней подпрограммы; каждая кончается I_RETURN
+        code = main + [(I_RETURN,)]
+        starts = []
+        for routine in self.routines:
+            starts.append(len(code))
+            code += routine + [(I_RETURN,)]
+        return ProgramPlan(code, self.segments, starts, digest)
+
+    def _compile_program(self, macro_data, base):
+        resolution = parse_resolution(macro_data.get('resolution'))
+        code = []
+        self._compile_actions(macro_data['actions'], base, resolution, code)
+        return code
+
+    def _compile_actions(self, actions, base, resolution, code):
+        pending = []
+        for action in actions:
+            if not isinstance(action, dict):
+                raise MacroFormatError(f"Неверное действие в макросе: {action!r}")
+            kind = action.get('type')
+            if kind not in BLOCK_TYPES:
+                pending.append(action)
+                continue
+            self._flush_segment(pending, resolution, code)
+            pending = []
+            if kind == 'repeat':
+                count = _number(action, 'count', 1, int)
+                start = len(code)
+                code.append(None)
+                self._compile_actions(action.get('actions', []), base, resolution, code)
+                code[start] = (I_REPEAT, count, len(code))
+                code.append((I_END, start))
+            elif kind == 'call':
+                self._compile_call(os.path.join(base, action['macro']), code)
+            elif kind == 'preset':
+                self._compile_preset(action['name'], code)
+            elif kind == 'label':
+                code.append((I_LABEL, f"раздел {action['name']}"))
+            else:  # wait
+                code.append((I_WAIT, round(_number(action, 'seconds', None, float) * 1e9)))
+        self._flush_segment(pending, resolution, code)
+
+    def _add_segment(self, store):
+        compiler = PlanCompiler(self.plugin, self.move_rate_hz)
+        steps = compiler.compile(store) + compiler.finish()
+        if not steps:
+            return None
+        self.segments.append((steps, steps[-1][0]))
+        return len(self.segments) - 1
+
+    def _flush_segment(self, events, resolution, code):
+        if not events:
+            return
+        store, _ = normalize_events(EventStore.from_dicts(events))
+        remap_store(store, mapping_for(resolution, self.target, self.aspect))
+        index = self._add_segment(store)
+        if index is not None:
+            code.append((I_SEGMENT, index))
+
+    def _compile_call(self, path, code):
+        path = os.path.abspath(path)
+        if path in self._stack:
+            raise MacroFormatError(f"Рекурсивный вызов макроса: {path}")
+        if len(self._stack) >= MAX_CALL_DEPTH:
+            raise MacroFormatError(f"Слишком глубокая вложенность вызовов: {path}")
+        called = self._called.get(path)
+        if called is None:
+            if is_program_file(path):
+                self._stack.append(path)
+                routine = self._compile_program(_read_program(path), os.path.dirname(path))
+                self._stack.pop()
+                self.routines.append(routine)
+                called = ('routine', len(self.routines) - 1)
+            else:
+                # Обычный записанный макрос - один сегмент
+                _, events = load_macro_file(path)
+                events, _ = normalize_events(events)
+                remap_store(events, mapping_for(events.resolution, self.target, self.aspect))
+                called = ('segment', self._add_segment(events))
+            self._called[path] = called
+        kind, index = called
+        if index is None:
+            return
+        code.append((I_CALL, index) if kind == 'routine' else (I_SEGMENT, index))
+
+    def _compile_preset(self, name, code):
+        if self.registry is None or self.plugin is None:
+            raise MacroFormatError(f"Пресет '{name}' недоступен: не выбран плагин игры")
+        preset = self.registry.preset(self.plugin, name)
+        if preset is None:
+            raise MacroFormatError(f"Нет пресета '{name}' у плагина игры")
+        key = ('preset', name)
+        index = self._called.get(key)
+        if index is None:
+            store = EventStore.from_dicts(preset['actions'])
+            remap_store(store, mapping_for(self.plugin.get_base_resolution(), self.target, self.aspect))
+            index = self._called[key] = self._add_segment(store)
+        if index is not None:
+            code.append((I_SEGMENT, index))
+
+
+class MacroProgram:
+    """Составной макрос, открытый в GUI.
+
+    Как MacroStream заменяет EventStore там, где макрос только показывают
+    и воспроизводят: статистика берется из скомпилированной программы.
+    """
+
+    def __init__(self, path, plan):
+        self.path = path
+        macro_data = _read_program(path)
+        self.metadata = {k: v for k, v in macro_data.items() if k != 'actions'}
+        self.resolution = parse_resolution(self.metadata.get('resolution'))
+        self.duration = plan.duration_ns / 1e9
+        self.type_counts = {'инструкций': len(plan.code), 'сегментов': len(plan.segments),
+                            'подпрограмм': len(plan.routines)}
+        self._count = len(plan)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def to_store(self):
+        raise MacroFormatError("Составной макрос нельзя пересохранить: он уже лежит в файле")
+
+
+class ProgramCache:
+    """Скомпилированные программы по хешу содержимого (вместе с вызываемыми файлами)"""
+
+    def __init__(self, size=4):
+        self.size = size
+        self._entries = OrderedDict()
+
+    def get(self, path, plugin=None, registry=None, target=None, aspect=ASPECT_FIT):
+        digest = program_digest(path)
+        key = (digest, id(plugin), parse_resolution(target), aspect)
+        entry = self._entries.get(key)
+        # Храним и сам плагин: id может достаться новому объекту после сборки мусора
+        if entry is not None and entry[0] is plugin:
+            self._entries.move_to_end(key)
+            return entry[1]
+        plan = ProgramCompiler(plugin, registry, target, aspect).compile_file(path, digest)
+        self._entries[key] = (plugin, plan)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return plan
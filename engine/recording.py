@@ -0,0 +1,242 @@
+"""Запись макроса: подписка на хаб ввода, буфер захвата, журнал"""
+import time
+
+from engine.capture import CaptureBuffer
+from engine.event_store import EventStore
+from engine.input_hub import InputHub
+from engine.journal import RecordingJournal, JOURNAL_DIR
+from engine.macro_file import save_macro_file
+from engine.motion import MotionCompressor, MOVE_TOLERANCE_PX
+from engine.normalize import normalize_events
+from engine.screen import screen_size
+
+# Файл автосохранения последней записи
+RECORDING_FILE = 'recording.mrec'
+# Как часто владелец сессии забирает события из буфера захвата (мс)
+CAPTURE_DRAIN_MS = 15
+# Сколько событий обрабатывать за один проход, чтобы не подвешивать окно
+CAPTURE_DRAIN_BATCH = 2048
+
+
+def key_name(key):
+    """Имя клавиши pynput так, как оно хранится в макросе"""
+    char = getattr(key, 'char', None)
+    return char if char is not None else str(key)
+
+
+class RecordingSession:
+    """Одна сессия записи.
+
+    Колбэки слушателей только ставят метку времени и кладут запись в
+    кольцевой буфер. Мышь и клавиатура приходят подпиской на общий
+    InputHub (hub): его хуки уже работают, и первое событие не теряется на
+    старте слушателей; без hub сессия запускает собственный хаб. Владелец
+    сессии (GUI или CLI) периодически вызывает poll() в своем потоке: там
+    записи превращаются в события, проходят через плагин и попадают в
+    хранилище и журнал.
+    """
+
+    def __init__(self, plugin=None, record_moves=False, use_journal=True,
+                 move_tolerance=MOVE_TOLERANCE_PX, resolution=None, journal_dir=JOURNAL_DIR,
+                 metrics=None, hub=None):
+        self.plugin = plugin
+        self.hub = hub
+        # engine.metrics.Metrics или None
+        self.metrics = metrics
+        self._dropped_seen = 0
+        # Разрешение экрана сохраняется с макросом для пересчета на другом экране
+        self.resolution = resolution
+        self.record_moves = record_moves
+        self.use_journal = use_journal
+        self.journal_dir = journal_dir
+        self.move_tolerance = move_tolerance
+        self.events = EventStore()
+        self.capture = CaptureBuffer()
+        self.motion = MotionCompressor(move_tolerance)
+        self.journal = None
+        self.journal_error = None
+        self.active = False
+        # Вызывается из потока слушателя по клавише остановки (engine/runtime.py будит ею цикл)
+        self.on_stop = None
+        self._own_hub = None
+        self._subscription = None
+
+    def start(self, listen=True):
+        """Начинает запись; listen=False - без хаба ввода (колбэки вызывает сам владелец)"""
+        self.events = EventStore()
+        self.events.resolution = self.resolution or screen_size()
+        self.capture.clear()
+        self.motion = MotionCompressor(self.move_tolerance)
+        
+        # События сразу дописываются в журнал на диске
+        if self.use_journal:
+            self.journal = RecordingJournal(self.journal_dir)
+            try:
+                self.journal.start()
+            except OSError as e:
+                self.journal = None
+                self.journal_error = e
+        
+        self.active = True
+        if not listen:
+            return
+        hub = self.hub
+        if hub is None:
+            hub = self._own_hub = InputHub(self.metrics)
+            hub.start()
+        self._subscription = hub.subscribe(
+            on_move=self.on_move if self.record_moves else None, on_click=self.on_click,
+            on_press=self.on_press, on_release=self.on_release)
+
+    def stop(self):
+        """Останавливает слушателей и дописывает остатки -> (batch, messages)"""
+        self.active = False
+        if self._subscription is not None:
+            self._subscription.cancel()
+            self._subscription = None
+        if self._own_hub is not None:
+            self._own_hub.stop()
+            self._own_hub = None
+        
+        # Забираем то, что слушатели успели положить в буфер, и дописываем начатый штрих
+        batch, messages, _ = self.process(self.capture.drain(), flush_motion=True)
+        if self.journal:
+            self.journal.close()
+            if self.journal.error:
+                self.journal_error = self.journal.error
+        return batch, messages
+
+    def request_stop(self, event_time=None):
+        """Просит владельца остановить запись (клавиша остановки или кнопка в окне).
+        Дальше ничего не пишем: владелец остановит сессию, забрав метку из буфера"""
+        self.active = False
+        self.capture.push(('stop', event_time or time.time()))
+        if self.on_stop is not None:
+            self.on_stop()
+
+    def poll(self, max_items=CAPTURE_DRAIN_BATCH):
+        """Забирает пачку из буфера -> (batch, messages, stop_requested)"""
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter_ns()
+            metrics.gauge('capture.queue_depth', len(self.capture))
+        items = self.capture.drain(max_items)
+        # Штрих без новых точек дольше паузы считаем законченным
+        pending = self.motion.pending_since()
+        flush_motion = pending is not None and time.time() - pending > self.motion.stroke_gap
+        result = self.process(items, flush_motion)
+        if metrics is not None:
+            metrics.span('capture.poll', started, time.perf_counter_ns(), 'capture', {'items': len(items)})
+        return result
+
+    def process(self, items, flush_motion=False):
+        """Превращает сырые записи буфера в события"""
+        plugin = self.plugin
+        messages = []
+        batch = []
+        stop_requested = False
+        
+        def add_moves(points):
+            for move_time, x, y in points:
+                batch.append({'type': 'move', 'x': x, 'y': y, 'time': move_time})
+        
+        for item in items:
+            kind = item[0]
+            if kind == 'move':
+                # Движения сжимаются сразу; в лог их не пишем
+                _, event_time, x, y = item
+                add_moves(self.motion.add(event_time, x, y))
+                continue
+            
+            # Начатый штрих завершается до клика/клавиши, чтобы порядок сохранился
+            add_moves(self.motion.flush())
+            if kind == 'click':
+                _, event_time, x, y, button_name = item
+                event = {'type': 'click', 'x': x, 'y': y, 'button': button_name, 'time': event_time}
+                messages.append(f"Клик: ({x}, {y}) {button_name}")
+            elif kind == 'key_press':
+                _, event_time, key_char = item
+                event = {'type': 'key_press', 'key': key_char, 'time': event_time}
+                messages.append(f"Клавиша: {key_char}")
+            elif kind == 'key_release':
+                _, event_time, key_char = item
+                event = {'type': 'key_release', 'key': key_char, 'time': event_time}
+            else:  # 'stop'
+                stop_requested = True
+                continue
+            
+            batch.append(event)
+        
+        if flush_motion:
+            add_moves(self.motion.flush())
+        
+        # Обработка плагином
+        if plugin and batch:
+            started = time.perf_counter_ns()
+            batch = [plugin.pre_process_event(event) for event in batch]
+            if self.metrics is not None:
+                self.metrics.observe('plugin.pre_process', time.perf_counter_ns() - started)
+        
+        if self.metrics is not None and items:
+            self._record_metrics(items)
+        
+        if batch:
+            self.events.extend(batch)
+            if self.journal:
+                self.journal.append(batch)
+        return batch, messages, stop_requested
+
+    def _record_metrics(self, items):
+        metrics = self.metrics
+        now = time.time()
+        # Задержка от метки времени в колбэке слушателя до обработки
+        metrics.observe_many('capture.store_latency', [round((now - item[1]) * 1e9) for item in items])
+        metrics.incr('capture.events', len(items))
+        dropped = self.capture.dropped
+        if dropped != self._dropped_seen:
+            metrics.incr('capture.dropped', dropped - self._dropped_seen)
+            metrics.instant('capture.dropped', 'capture', {'total': dropped})
+            self._dropped_seen = dropped
+    
+    def on_click(self, x, y, button, pressed):
+        """Handle mouse clicks (listener thread: only timestamp and enqueue)"""
+        if pressed and self.active:
+            self.capture.push(('click', time.time(), x, y, button.name))
+    
+    def on_move(self, x, y):
+        """Handle mouse movement (listener thread: only timestamp and enqueue)"""
+        if self.active:
+            self.capture.push(('move', time.time(), x, y))
+    
+    def on_press(self, key):
+        """Handle keyboard presses (listener thread: only timestamp and enqueue)"""
+        event_time = time.time()
+        key_char = key_name(key)
+        
+        # Stop recording with 'q' or Esc
+        if key_char == 'q' or key_char == 'Key.esc':
+            self.request_stop(event_time)
+            return
+        
+        # Record key press
+        if self.active:
+            self.capture.push(('key_press', event_time, key_char))
+    
+    def on_release(self, key):
+        """Handle keyboard releases (listener thread: only timestamp and enqueue)"""
+        if self.active:
+            self.capture.push(('key_release', time.time(), key_name(key)))
+
+
+def finish_recording(events, journal=None, path=RECORDING_FILE, metadata=None):
+    """Нормализует и сохраняет запись -> (normalized, report).
+
+    Журнал удаляется только после успешного сохранения.
+    """
+    normalized, report = normalize_events(events)
+    if metadata is not None:
+        metadata = dict(metadata, events_count=len(normalized))
+    save_macro_file(path, normalized, metadata)
+    if journal:
+        journal.discard()
+    return normalized, report
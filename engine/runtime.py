@@ -0,0 +1,161 @@
+"""Управляющий цикл asyncio: воспроизведение и запись как отменяемые задачи.
+
+Точные шаги по-прежнему выполняет поток TrackScheduler: asyncio спит с
+точностью около миллисекунды, а спин до дедлайна занял бы весь цикл.
+Цикл отвечает за жизнь сессий. play() ждет дорожку, и отмена задачи
+снимает ее сразу: планировщик будится условием, а не опросом флага.
+record() забирает события из буфера захвата по таймеру. Колбэки из
+чужих потоков (поток планировщика, слушатели pynput) переносятся в цикл
+через call_soon_threadsafe. Отмена структурная: отмененная задача
+дожидается, пока дорожка отпустит клавиши, и только потом завершается.
+"""
+import asyncio
+import threading
+
+from engine.recording import CAPTURE_DRAIN_BATCH, CAPTURE_DRAIN_MS
+from engine.tracks import Track
+
+
+def _settle(future, result=None, error=None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def threadsafe(loop, func):
+    """Обертка для колбэка из другого потока: func выполнится в цикле loop.
+    После закрытия цикла вызовы молча отбрасываются"""
+    def call(*args):
+        try:
+            loop.call_soon_threadsafe(func, *args)
+        except RuntimeError:
+            pass
+    return call
+
+
+async def play(scheduler, plan, on_started=None, **options):
+    """Играет план (или Track) дорожкой планировщика -> (остановлена ли, TimingReport).
+
+    Собственные колбэки дорожки вызываются как обычно, из потока
+    планировщика; ошибка воспроизведения поднимается из await.
+    on_started(track) вызывается в цикле, когда дорожка добавлена. Отмена
+    задачи останавливает дорожку и ждет, пока та отпустит клавиши.
+    """
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    track = plan if isinstance(plan, Track) else Track(plan, **options)
+    on_finished, on_error = track.on_finished, track.on_error
+    settle = threadsafe(loop, _settle)
+
+    def finished(stopped, report):
+        if on_finished:
+            on_finished(stopped, report)
+        settle(done, (stopped, report))
+
+    def error(e):
+        if on_error:
+            on_error(e)
+        settle(done, None, e)
+
+    track.on_finished, track.on_error = finished, error
+    try:
+        scheduler.add(track)
+    except Exception:
+        # Контроллеры ввода недоступны (например, нет дисплея)
+        track.on_finished, track.on_error = on_finished, on_error
+        track.plan.close()
+        raise
+    if on_started is not None:
+        on_started(track)
+    try:
+        return await asyncio.shield(done)
+    except asyncio.CancelledError:
+        track.stop()
+        try:
+            await done
+        except Exception:
+            pass
+        raise
+    finally:
+        track.on_finished, track.on_error = on_finished, on_error
+
+
+async def record(session, on_batch=None, interval=CAPTURE_DRAIN_MS / 1000, max_items=CAPTURE_DRAIN_BATCH):
+    """Забирает события сессии записи, пока не нажат Esc/q или задачу не отменили.
+
+    on_batch(batch, messages) вызывается в цикле на каждую непустую пачку.
+    Клавиша остановки будит цикл сразу, не дожидаясь таймера. Сессию
+    останавливает владелец: stop() дописывает то, что осталось в буфере.
+    """
+    stop = asyncio.Event()
+    session.on_stop = threadsafe(asyncio.get_running_loop(), stop.set)
+    try:
+        while True:
+            batch, messages, stop_requested = session.poll(max_items)
+            if on_batch is not None and (batch or messages):
+                on_batch(batch, messages)
+            if stop_requested:
+                return
+            if stop.is_set():
+                if not batch and not messages:
+                    # Буфер пуст, а метки нет: она не влезла в переполненный буфер
+                    return
+                # Метка остановки уже в буфере, за этой пачкой
+                continue
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        session.on_stop = None
+
+
+class Runtime:
+    """Цикл asyncio в отдельном потоке - для GUI, чей поток занят Tk.
+
+    spawn() запускает корутину задачей и возвращает concurrent.futures.Future:
+    его можно отменить из любого потока. close() отменяет все задачи,
+    ждет их завершения и останавливает цикл.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="runtime", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def spawn(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _cancel_all(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self, timeout=1.0):
+        """Отменяет задачи (дорожки отпускают клавиши) и останавливает цикл"""
+        if not self.running:
+            return
+        try:
+            self.spawn(self._cancel_all()).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,149 @@
+"""Планировщик воспроизведения по абсолютным дедлайнам"""
+import threading
+import time
+from collections import deque
+
+# Последний отрезок перед дедлайном ждем активно, а не через sleep
+SPIN_NS = 2_000_000
+# Максимальный кусок сна (остановка будит раньше, через wake)
+MAX_SLEEP_NS = 10_000_000
+# Если опоздали сильнее (система подвисла), сдвигаем шкалу, а не догоняем залпом
+RESYNC_NS = 250_000_000
+
+
+class TimeWarp:
+    """Перестраивает шкалу макроса: скорость и сжатие пауз.
+
+    Вызов с offset_ns шага (смещение от начала макроса) возвращает дедлайн
+    от точки отсчета воспроизведения. Интервалы между шагами длиннее
+    max_gap_ns сокращаются до max_gap_ns, затем все делится на speed.
+    Шкала непрерывна между циклами: next_loop() начинает смещения заново.
+    """
+
+    def __init__(self, speed=1.0, max_gap_ns=None):
+        if speed <= 0:
+            raise ValueError("Скорость должна быть больше нуля")
+        self.speed = speed
+        self.max_gap_ns = max_gap_ns
+        self._last_offset = 0
+        self._warped = 0.0
+
+    def next_loop(self):
+        # Первый шаг нового цикла совпадает с последним шагом предыдущего
+        self._last_offset = 0
+
+    def __call__(self, offset_ns):
+        gap = offset_ns - self._last_offset
+        self._last_offset = offset_ns
+        if self.max_gap_ns is not None and gap > self.max_gap_ns:
+            gap = self.max_gap_ns
+        self._warped += gap / self.speed
+        return int(self._warped)
+
+
+def time_warp(speed=1.0, max_gap=None):
+    """TimeWarp или None, если шкалу менять не нужно (max_gap - в секундах)"""
+    if speed == 1.0 and max_gap is None:
+        return None
+    return TimeWarp(speed, None if max_gap is None else round(max_gap * 1e9))
+
+
+class TimingReport:
+    """Статистика: запланированное время против фактического"""
+
+    def __init__(self, keep=1000):
+        self.count = 0
+        self.total_abs_ns = 0
+        self.max_late_ns = 0
+        self.resyncs = 0
+        # Шаги шли без ожидания дедлайнов (режим максимальной скорости)
+        self.unpaced = False
+        # (scheduled_ns, actual_ns); keep=None - хранить все замеры (бенчмарки)
+        self.samples = deque(maxlen=keep)
+
+    def add(self, scheduled_ns, actual_ns):
+        late = actual_ns - scheduled_ns
+        self.count += 1
+        self.total_abs_ns += abs(late)
+        if late > self.max_late_ns:
+            self.max_late_ns = late
+        self.samples.append((scheduled_ns, actual_ns))
+
+    def mean_abs_us(self):
+        return self.total_abs_ns / self.count / 1000 if self.count else 0.0
+
+    def late_percentiles_us(self, percents=(50, 90, 99, 99.9)):
+        """Перцентили опоздания по сохраненным замерам -> {процент: мкс}"""
+        lates = sorted(actual - scheduled for scheduled, actual in self.samples)
+        if not lates:
+            return {p: 0.0 for p in percents}
+        last = len(lates) - 1
+        return {p: lates[min(last, round(p / 100 * last))] / 1000 for p in percents}
+
+    def summary(self):
+        if self.unpaced:
+            return f"Максимальная скорость: {self.count} событий без ожидания"
+        text = (f"Точность: {self.count} событий, среднее отклонение "
+                f"{self.mean_abs_us():.0f} мкс, макс. опоздание {self.max_late_ns / 1000:.0f} мкс")
+        if self.resyncs:
+            text += f", пересинхронизаций: {self.resyncs}"
+        return text
+
+
+class DeadlineScheduler:
+    """Ждет абсолютные дедлайны на perf_counter_ns: грубый сон, затем спин.
+
+    Дедлайны считаются от одной точки отсчета, поэтому ошибка не копится
+    ни от события к событию, ни от цикла к циклу. wake() прерывает сон,
+    чтобы остановка не ждала его конца.
+    """
+
+    def __init__(self, spin_ns=SPIN_NS, max_sleep_ns=MAX_SLEEP_NS, resync_ns=RESYNC_NS):
+        self.spin_ns = spin_ns
+        self.max_sleep_ns = max_sleep_ns
+        self.resync_ns = resync_ns
+        self.origin_ns = 0
+        self.shift_ns = 0
+        # Абсолютный дедлайн последнего дождавшегося шага (perf_counter_ns)
+        self.last_deadline_ns = 0
+        self.report = TimingReport()
+        self._wake = threading.Event()
+
+    def start(self):
+        """Фиксирует точку отсчета шкалы"""
+        self._wake.clear()
+        self.origin_ns = time.perf_counter_ns()
+        self.shift_ns = 0
+        return self.origin_ns
+
+    def wait_until(self, offset_ns, should_stop=None):
+        """Ждет момента origin + offset. Возвращает False, если попросили остановиться"""
+        perf_counter_ns = time.perf_counter_ns
+        deadline = self.origin_ns + self.shift_ns + offset_ns
+
+        while True:
+            if should_stop is not None and should_stop():
+                return False
+            remaining = deadline - perf_counter_ns()
+            if remaining <= self.spin_ns:
+                break
+            if self._wake.wait(min(remaining - self.spin_ns, self.max_sleep_ns) / 1e9):
+                self._wake.clear()
+
+        now = perf_counter_ns()
+        while now < deadline:
+            now = perf_counter_ns()
+
+        if now - deadline > self.resync_ns:
+            # Переносим шкалу на величину опоздания
+            self.shift_ns += now - deadline
+            self.report.resyncs += 1
+            deadline = now
+
+        self.report.add(deadline, now)
+        self.last_deadline_ns = deadline
+        return True
+
+    def wake(self):
+        """Будит wait_until, чтобы тот сразу проверил should_stop"""
+        self._wake.set()
@@ -0,0 +1,128 @@
+"""Разрешение экрана и пересчет координат макроса под другой экран"""
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: есть запасной путь на чистом Python
+    np = None
+
+from engine.event_store import NO_COORD, parse_resolution
+
+# Как вписывать макрос в экран с другим соотношением сторон
+ASPECT_STRETCH = 'stretch'  # растянуть по обеим осям независимо
+ASPECT_FIT = 'fit'  # сохранить пропорции, вписать целиком (поля по краям)
+ASPECT_FILL = 'fill'  # сохранить пропорции, заполнить экран (края обрезаются)
+ASPECT_POLICIES = (ASPECT_STRETCH, ASPECT_FIT, ASPECT_FILL)
+
+
+def screen_size():
+    """Размер основного экрана (ширина, высота) или None, если узнать не удалось"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            user32 = ctypes.windll.user32
+            return user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+        if sys.platform == 'darwin':
+            import Quartz
+            display = Quartz.CGMainDisplayID()
+            return Quartz.CGDisplayPixelsWide(display), Quartz.CGDisplayPixelsHigh(display)
+        # Xlib ставится вместе с pynput на Linux
+        from Xlib import display
+        screen = display.Display().screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+    except Exception:
+        return None
+
+
+class ScreenMapping:
+    """Линейное преобразование координат: x' = x * scale_x + offset_x"""
+
+    def __init__(self, source, target, policy=ASPECT_FIT):
+        if policy not in ASPECT_POLICIES:
+            raise ValueError(f"Неизвестный режим пропорций: {policy}")
+        self.source = source
+        self.target = target
+        self.policy = policy
+        (src_w, src_h), (dst_w, dst_h) = source, target
+        scale_x, scale_y = dst_w / src_w, dst_h / src_h
+        if policy == ASPECT_FIT:
+            scale_x = scale_y = min(scale_x, scale_y)
+        elif policy == ASPECT_FILL:
+            scale_x = scale_y = max(scale_x, scale_y)
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        # Центрируем: поля (fit) или обрезка (fill) делятся поровну
+        self.offset_x = (dst_w - src_w * scale_x) / 2
+        self.offset_y = (dst_h - src_h * scale_y) / 2
+
+    def __repr__(self):
+        return f"{self.source[0]}x{self.source[1]} -> {self.target[0]}x{self.target[1]} ({self.policy})"
+
+    @property
+    def is_identity(self):
+        return (self.scale_x == self.scale_y == 1.0) and self.offset_x == self.offset_y == 0
+
+    def map_point(self, x, y):
+        return round(x * self.scale_x + self.offset_x), round(y * self.scale_y + self.offset_y)
+
+    def map_coords(self, coords):
+        """{'name': (x, y)} -> те же имена с пересчитанными точками"""
+        return {name: self.map_point(*point) for name, point in coords.items()}
+
+
+def mapping_for(source, target, policy=ASPECT_FIT):
+    """ScreenMapping или None, если пересчет не нужен или разрешения неизвестны"""
+    source, target = parse_resolution(source), parse_resolution(target)
+    if source is None or target is None or source == target:
+        return None
+    return ScreenMapping(source, target, policy)
+
+
+def _remap_column(column, scale, offset):
+    """Пересчитывает колонку array('i'), пропуская отсутствующие координаты"""
+    if np is not None:
+        # Вид на тот же буфер: один векторный проход без копирования колонки
+        values = np.frombuffer(column, dtype=np.int32)
+        missing = values == NO_COORD
+        mapped = values * scale
+        mapped += offset
+        np.rint(mapped, out=mapped)
+        mapped[missing] = NO_COORD
+        values[:] = mapped
+        del values
+        return column
+    return array('i', [v if v == NO_COORD else round(v * scale + offset) for v in column])
+
+
+def remap_store(store, mapping):
+    """Пересчитывает координаты хранилища на месте под mapping.target"""
+    if mapping is None:
+        return store
+    if not mapping.is_identity and len(store):
+        store._x = _remap_column(store._x, mapping.scale_x, mapping.offset_x)
+        store._y = _remap_column(store._y, mapping.scale_y, mapping.offset_y)
+        # Нецелые координаты из extras пересчитываем поштучно; вторая
+        # координата того же события может лежать в колонке
+        axes = (('x', mapping.scale_x, mapping.offset_x), ('y', mapping.scale_y, mapping.offset_y))
+        for extra in store._extras.values():
+            for name, scale, offset in axes:
+                if name in extra:
+                    try:
+                        extra[name] = round(extra[name] * scale + offset)
+                    except TypeError:
+                        pass
+        store.version += 1
+    store.resolution = mapping.target
+    return store
+
+
+def remap_events(events, mapping):
+    """То же для списка dict (блоки потокового воспроизведения)"""
+    if mapping is None or mapping.is_identity:
+        return events
+    map_point = mapping.map_point
+    for event in events:
+        if 'x' in event and 'y' in event:
+            event['x'], event['y'] = map_point(event['x'], event['y'])
+    return events
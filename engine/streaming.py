@@ -0,0 +1,154 @@
+"""Потоковое воспроизведение больших макросов прямо с диска"""
+import os
+import queue
+import threading
+
+from engine.event_store import parse_resolution
+from engine.macro_file import MacroFile, is_binary
+from engine.plan import PlanCompiler
+from engine.screen import remap_events
+
+# Бинарные файлы больше этого размера не загружаются в память целиком
+STREAMING_THRESHOLD_BYTES = 16 * 1024 * 1024
+# Сколько декодированных блоков держать впереди воспроизведения
+READ_AHEAD_BLOCKS = 4
+
+_DONE = object()
+
+
+def should_stream(path):
+    return os.path.getsize(path) >= STREAMING_THRESHOLD_BYTES and is_binary(path)
+
+
+class MacroStream:
+    """Макрос, оставленный на диске.
+
+    Для панели информации отдает статистику из заголовка, события читает
+    лениво по блокам. Заменяет EventStore там, где макрос только
+    показывают и воспроизводят.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with MacroFile(path) as macro:
+            self.metadata = macro.metadata
+        self.type_counts = self.metadata.get('type_counts', {})
+        self.duration = self.metadata.get('duration', 0.0)
+        self.resolution = parse_resolution(self.metadata.get('resolution'))
+
+    def __len__(self):
+        return self.metadata.get('events_count', 0)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        with MacroFile(self.path) as macro:
+            yield from macro.iter_events()
+
+    def to_store(self):
+        """Загружает макрос в память (нужно, например, для сохранения в JSON)"""
+        with MacroFile(self.path) as macro:
+            store = macro.to_store()
+        store.resolution = self.resolution
+        return store
+
+
+class ReadAhead:
+    """Фоновый поток, который держит ограниченный запас элементов впереди потребителя"""
+
+    def __init__(self, source, max_items=READ_AHEAD_BLOCKS):
+        self._source = source
+        self._queue = queue.Queue(maxsize=max_items)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, name="read-ahead", daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            for item in self._source:
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if self._stop.is_set():
+                    return
+            self._queue.put(_DONE)
+        except BaseException as e:
+            self._queue.put(e)
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """Останавливает поток и ждет его: после этого источник можно закрывать"""
+        self._stop.set()
+        # Освобождаем место, чтобы поток не висел на put
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._thread.join()
+
+
+class StreamingPlan:
+    """План воспроизведения, который компилирует блоки файла на лету.
+
+    Память постоянна: в очереди не больше READ_AHEAD_BLOCKS блоков.
+    Каждый проход (в том числе очередной цикл) заново читает файл с начала,
+    копия событий в памяти не хранится. duration_ns до конца первого прохода
+    берется из заголовка, после - смещение последнего шага, как у PlaybackPlan
+    (с отпусканием key_hold и хвостом движения).
+    """
+
+    def __init__(self, path, plugin=None, mapping=None):
+        self.path = path
+        self.plugin = plugin
+        # Пересчет координат под текущий экран (ScreenMapping или None)
+        self.mapping = mapping
+        self._file = MacroFile(path)
+        self._read_ahead = None
+        self.duration_ns = round(self._file.metadata.get('duration', 0.0) * 1e9)
+
+    def __len__(self):
+        return len(self._file)
+
+    def _compiled_blocks(self):
+        compiler = PlanCompiler(self.plugin)
+        for number in range(len(self._file.blocks)):
+            yield compiler.compile(remap_events(self._file.read_block(number), self.mapping))
+        yield compiler.finish()
+
+    def iter_steps(self):
+        self._read_ahead = ReadAhead(self._compiled_blocks())
+        last_ns = None
+        for steps in self._read_ahead:
+            if steps:
+                last_ns = steps[-1][0]
+            yield from steps
+        if last_ns is not None:
+            self.duration_ns = last_ns
+
+    def queue_depth(self):
+        """Сколько скомпилированных блоков ждут воспроизведения"""
+        return self._read_ahead.queue_depth() if self._read_ahead else 0
+
+    def close(self):
+        if self._read_ahead is not None:
+            self._read_ahead.close()
+        self._file.close()
@@ -0,0 +1,401 @@
+"""Редактирование макроса: шкала событий поверх таблицы кусков (piece table).
+
+Исходные EventStore не меняются. Шкала - список кусков: диапазон
+событий хранилища и преобразование времени (t * scale + shift). Обрезка,
+вырезание, вставка и смена темпа только разрезают и переставляют куски,
+а сдвиг последующих событий - это новые shift у кусков после правки.
+Стоимость правки зависит от числа кусков (то есть правок), а не событий:
+у записи на миллионы событий ни список, ни метки времени не копируются.
+Настоящий EventStore собирается один раз - для воспроизведения и
+сохранения (to_store()).
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: есть запасной путь на чистом Python
+    np = None
+
+from engine.event_store import EventRecord, EventStore
+
+# Сколько правок помнит отмена
+UNDO_LIMIT = 100
+# Промежуток (сек) между вставкой и соседним событием, если исходного нет: вставка в начало или в конец
+INSERT_SPACING = 0.1
+
+
+class Piece:
+    """Диапазон [start, end) хранилища store; время события - t * scale + shift"""
+    __slots__ = ('store', 'start', 'end', 'scale', 'shift')
+
+    def __init__(self, store, start, end, scale=1.0, shift=0.0):
+        self.store = store
+        self.start = start
+        self.end = end
+        self.scale = scale
+        self.shift = shift
+
+    def __len__(self):
+        return self.end - self.start
+
+    def time(self, i):
+        """Время i-го события куска (NaN - событие без времени)"""
+        return self.store._times[self.start + i] * self.scale + self.shift
+
+    def first_time(self):
+        times = self.store._times
+        for i in range(self.start, self.end):
+            if times[i] == times[i]:
+                return times[i] * self.scale + self.shift
+        return None
+
+    def last_time(self):
+        times = self.store._times
+        for i in range(self.end - 1, self.start - 1, -1):
+            if times[i] == times[i]:
+                return times[i] * self.scale + self.shift
+        return None
+
+    def slice(self, start, end):
+        """Часть куска по номерам внутри него"""
+        return Piece(self.store, self.start + start, self.start + end, self.scale, self.shift)
+
+    def moved(self, delta):
+        return Piece(self.store, self.start, self.end, self.scale, self.shift + delta)
+
+    def times(self):
+        """Метки времени куска -> array('d')"""
+        times = self.store._times
+        if self.scale == 1.0 and self.shift == 0.0:
+            return times[self.start:self.end]
+        if np is not None:
+            values = np.frombuffer(times, dtype=np.float64)[self.start:self.end] * self.scale
+            values += self.shift
+            return array('d', values.tobytes())
+        scale, shift = self.scale, self.shift
+        return array('d', [t * scale + shift for t in times[self.start:self.end]])
+
+
+class Clip:
+    """Вырезанные или вставляемые события; время отсчитывается от первого события"""
+
+    def __init__(self, pieces):
+        first = _first_time(pieces)
+        self.pieces = [piece.moved(-first) for piece in pieces] if first else list(pieces)
+        last = _last_time(self.pieces)
+        self.duration = last if last is not None else 0.0
+
+    @classmethod
+    def from_store(cls, store):
+        """Весь макрос как фрагмент для вставки"""
+        return cls([Piece(store, 0, len(store))] if len(store) else [])
+
+    def __len__(self):
+        return sum(len(piece) for piece in self.pieces)
+
+
+def _first_time(pieces):
+    for piece in pieces:
+        value = piece.first_time()
+        if value is not None:
+            return value
+    return None
+
+
+def _last_time(pieces):
+    for piece in reversed(pieces):
+        value = piece.last_time()
+        if value is not None:
+            return value
+    return None
+
+
+class Timeline:
+    """Редактируемый макрос поверх EventStore с отменой и повтором.
+
+    Для панели информации ведет себя как EventStore (len, duration,
+    type_counts, resolution, итерация), поэтому может стоять в
+    RecorderApp.events. Номера событий в правках - позиции на шкале,
+    диапазоны полуоткрытые [start, end). Каждая правка запоминает
+    прежний список кусков: отмена стоит O(кусков).
+    """
+
+    def __init__(self, store):
+        self.resolution = store.resolution
+        self.pieces = [Piece(store, 0, len(store))] if len(store) else []
+        self.version = 0
+        self._undo = []
+        self._redo = []
+        self._stats = None
+        self._store = None
+        self._reindex()
+
+    # --- Служебное ---
+
+    def _reindex(self):
+        # Начало каждого куска на шкале: поиск куска по номеру события - bisect
+        offsets = []
+        count = 0
+        for piece in self.pieces:
+            offsets.append(count)
+            count += len(piece)
+        self._offsets = offsets
+        self._count = count
+
+    def _locate(self, index):
+        """Номер события на шкале -> (номер куска, номер внутри куска)"""
+        k = bisect_right(self._offsets, index) - 1
+        return k, index - self._offsets[k]
+
+    def _cut_at(self, pieces, index):
+        """Копия списка кусков с границей перед событием index -> (куски, номер куска)"""
+        if index >= self._count:
+            return list(pieces), len(pieces)
+        k, inner = self._locate(index)
+        if inner == 0:
+            return list(pieces), k
+        piece = pieces[k]
+        return pieces[:k] + [piece.slice(0, inner), piece.slice(inner, len(piece))] + pieces[k + 1:], k + 1
+
+    def _split(self, start, end):
+        """Куски до, внутри и после диапазона [start, end)"""
+        self._check_range(start, end)
+        pieces, k_end = self._cut_at(self.pieces, end)
+        if start == end:
+            return pieces[:k_end], [], pieces[k_end:]
+        # Граница start лежит раньше end, поэтому номера кусков до нее не сдвинулись
+        if start == 0:
+            k_start = 0
+        else:
+            k, inner = self._locate(start)
+            if inner == 0:
+                k_start = k
+            else:
+                piece = pieces[k]
+                pieces[k:k + 1] = [piece.slice(0, inner), piece.slice(inner, len(piece))]
+                k_start = k + 1
+                k_end += 1
+        return pieces[:k_start], pieces[k_start:k_end], pieces[k_end:]
+
+    def _check_range(self, start, end):
+        if not 0 <= start <= end <= self._count:
+            raise IndexError(f"Неверный диапазон событий: {start}-{end} (всего {self._count})")
+
+    def _commit(self, pieces):
+        self._undo.append(self.pieces)
+        del self._undo[:-UNDO_LIMIT]
+        self._redo.clear()
+        self._set(pieces)
+
+    def _set(self, pieces):
+        # Соседние куски одного хранилища с тем же временем снова склеиваются
+        merged = []
+        for piece in pieces:
+            if not len(piece):
+                continue
+            last = merged[-1] if merged else None
+            if (last is not None and last.store is piece.store and last.end == piece.start
+                    and last.scale == piece.scale and last.shift == piece.shift):
+                merged[-1] = Piece(last.store, last.start, piece.end, last.scale, last.shift)
+            else:
+                merged.append(piece)
+        self.pieces = merged
+        self.version += 1
+        self._stats = None
+        self._store = None
+        self._reindex()
+
+    # --- Чтение ---
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __iter__(self):
+        for piece in self.pieces:
+            for i in range(len(piece)):
+                yield self._record(piece, i)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("event index out of range")
+        k, inner = self._locate(index)
+        return self._record(self.pieces[k], inner)
+
+    @staticmethod
+    def _record(piece, i):
+        event = EventRecord(piece.store, piece.start + i).to_dict()
+        if 'time' in event and type(event['time']) is float:
+            event['time'] = piece.time(i)
+        return event
+
+    def time_at(self, index):
+        k, inner = self._locate(index)
+        return self.pieces[k].time(inner)
+
+    def index_at_time(self, t):
+        """Номер первого события со временем >= t (шкала считается упорядоченной)"""
+        for k, piece in enumerate(self.pieces):
+            last = piece.last_time()
+            if last is None or last < t:
+                continue
+            store = piece.store
+            if store._sorted and not store._untimed and piece.scale > 0:
+                i = bisect_left(store._times, (t - piece.shift) / piece.scale, piece.start, piece.end)
+                return self._offsets[k] + i - piece.start
+            for i in range(len(piece)):
+                value = piece.time(i)
+                if value == value and value >= t:
+                    return self._offsets[k] + i
+        return self._count
+
+    @property
+    def start_time(self):
+        return _first_time(self.pieces)
+
+    @property
+    def duration(self):
+        """Длительность в секундах, как у EventStore"""
+        first, last = _first_time(self.pieces), _last_time(self.pieces)
+        if first is not None:
+            return last - first
+        return max(self._count - 1, 0) * 0.5
+
+    @property
+    def type_counts(self):
+        """Счетчики по типам; считаются по кускам один раз на версию"""
+        if self._stats is None:
+            counts = Counter()
+            for piece in self.pieces:
+                store = piece.store
+                if np is not None:
+                    ids = np.bincount(np.frombuffer(store._types, dtype=np.uint8)[piece.start:piece.end])
+                    pairs = ((i, int(n)) for i, n in enumerate(ids) if n)
+                else:
+                    pairs = Counter(store._types[piece.start:piece.end]).items()
+                for type_id, n in pairs:
+                    counts[store._type_names[type_id]] += n
+            self._stats = dict(counts)
+        return self._stats
+
+    def copy(self, start, end):
+        """Фрагмент [start, end) без изменения шкалы -> Clip"""
+        return Clip(self._split(start, end)[1])
+
+    def to_store(self):
+        """Собирает правленый макрос в новый EventStore (один раз на версию)"""
+        if self._store is not None:
+            return self._store
+        store = EventStore()
+        for piece in self.pieces:
+            source, start, end = piece.store, piece.start, piece.end
+            extras = {i - start: dict(extra) for i, extra in source._extras.items() if start <= i < end}
+            store.extend_columns(source._type_names, source._strings, source._types[start:end],
+                                 piece.times(), source._x[start:end], source._y[start:end],
+                                 source._keys[start:end], source._buttons[start:end],
+                                 source._durations[start:end], extras)
+        store.resolution = self.resolution
+        self._store = store
+        return store
+
+    # --- Правки ---
+
+    def _span(self, middle, after):
+        """На сколько сдвинуть хвост, чтобы он встал на место начала middle"""
+        begin = _first_time(middle)
+        resume = _first_time(after[:1])
+        if begin is None or resume is None:
+            return 0.0
+        return resume - begin
+
+    def cut(self, start, end):
+        """Вырезает [start, end); следующие события сдвигаются на место вырезанных -> Clip"""
+        before, middle, after = self._split(start, end)
+        if not middle:
+            return Clip([])
+        delta = self._span(middle, after)
+        self._commit(before + [piece.moved(-delta) for piece in after])
+        return Clip(middle)
+
+    def delete(self, start, end):
+        self.cut(start, end)
+
+    def trim(self, start, end):
+        """Оставляет только [start, end)"""
+        _, middle, _ = self._split(start, end)
+        self._commit(middle)
+
+    def insert(self, index, clip, gap=0.0):
+        """Вставляет фрагмент перед событием index. Фрагмент начинается на месте события
+        index, а хвост отступает от его конца на тот же промежуток, что был перед index,
+        плюс gap. В конце шкалы фрагмент встает через INSERT_SPACING + gap"""
+        if not clip.pieces:
+            return
+        before, _, after = self._split(index, index)
+        self._commit(self._inserted(before, clip, after, gap))
+
+    def _inserted(self, before, clip, after, gap):
+        last, at = _last_time(before), _first_time(after)
+        # Без исходного промежутка хвост встал бы вплотную к концу фрагмента
+        spacing = at - last if last is not None and at is not None else INSERT_SPACING
+        if at is None:
+            at = last + spacing + gap if last is not None else 0.0
+            tail_shift = 0.0
+        else:
+            tail_shift = clip.duration + spacing + gap
+        return (before + [piece.moved(at) for piece in clip.pieces]
+                + [piece.moved(tail_shift) for piece in after])
+
+    def splice(self, start, end, clip, gap=0.0):
+        """Заменяет [start, end) фрагментом одной правкой -> вырезанный Clip"""
+        before, middle, after = self._split(start, end)
+        delta = self._span(middle, after)
+        after = [piece.moved(-delta) for piece in after]
+        self._commit(self._inserted(before, clip, after, gap))
+        return Clip(middle)
+
+    def retime(self, start, end, scale=1.0, offset=0.0):
+        """Темп диапазона: время растягивается в scale раз от его первого события
+        и сдвигается на offset; события после диапазона сдвигаются следом"""
+        if scale <= 0:
+            raise ValueError("Множитель времени должен быть больше нуля")
+        before, middle, after = self._split(start, end)
+        origin = _first_time(middle)
+        if origin is None:
+            return
+        old_end = _last_time(middle)
+        # t -> origin + (t - origin) * scale + offset
+        middle = [Piece(p.store, p.start, p.end, p.scale * scale,
+                        (p.shift - origin) * scale + origin + offset) for p in middle]
+        tail_shift = (old_end - origin) * (scale - 1) + offset
+        self._commit(before + middle + [piece.moved(tail_shift) for piece in after])
+
+    # --- Отмена ---
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        if not self._undo:
+            return False
+        self._redo.append(self.pieces)
+        self._set(self._undo.pop())
+        return True
+
+    def redo(self):
+        if not self._redo:
+            return False
+        self._undo.append(self.pieces)
+        self._set(self._redo.pop())
+        return True
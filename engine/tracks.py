@@ -0,0 +1,409 @@
+"""Несколько макросов одновременно на одном потоке воспроизведения"""
+import heapq
+import itertools
+import threading
+import time
+
+from engine.backend import PynputBackend
+from engine.player import execute_step, OP_NAMES
+from engine.scheduler import TimingReport, time_warp, SPIN_NS, MAX_SLEEP_NS, RESYNC_NS
+
+# Последний отрезок спина идет без уступки GIL, чтобы не терять точность
+HARD_SPIN_NS = 100_000
+
+
+class Track:
+    """Дорожка: один план со своими циклами, скоростью и остановкой.
+
+    loop можно менять на ходу, stop() снимает дорожку, не трогая
+    остальные, pause()/resume() приостанавливают ее шкалу. speed
+    ускоряет шкалу, max_gap (сек) сжимает паузы длиннее себя, loops
+    ограничивает число циклов (None - без ограничения); колбэки
+    вызываются из потока планировщика. Шаги дорожки с max_rate
+    идут без ожидания, но по очереди с другими дорожками, чьи дедлайны
+    уже наступили. С restore_mouse доигравшая (не остановленная) дорожка
+    возвращает мышь туда, где она была при запуске.
+    """
+
+    def __init__(self, plan, name="", loop=False, loops=None, speed=1.0,
+                 on_step=None, on_loop=None, on_finished=None, on_error=None,
+                 max_gap=None, max_rate=False, restore_mouse=True):
+        if speed <= 0:
+            raise ValueError("Скорость должна быть больше нуля")
+        self.plan = plan
+        self.name = name
+        self.loop = loop
+        self.loops = loops
+        self.speed = speed
+        self.max_gap = max_gap
+        self.max_rate = max_rate
+        self.restore_mouse = restore_mouse
+        # Позиция мыши при запуске (для restore_mouse)
+        self.start_position = None
+        self.on_step = on_step
+        self.on_loop = on_loop
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.stopped = False
+        self.paused = False
+        self.finished = False
+        self.report = TimingReport()
+        self.held_keys = set()
+        self.loop_count = 0
+        self.origin_ns = 0
+        self.shift_ns = 0
+        # Когда выполнен первый шаг (perf_counter_ns): задержка от запуска до ввода
+        self.first_step_ns = 0
+        self._steps = None
+        self._step = None
+        self._warp = None
+        self._scheduler = None
+
+    @property
+    def running(self):
+        return self._scheduler is not None and not self.finished
+
+    def stop(self):
+        self.stopped = True
+        if self._scheduler is not None:
+            self._scheduler._wake()
+
+    def pause(self):
+        """Приостанавливает дорожку: зажатые клавиши отпускаются до resume()"""
+        self.paused = True
+        if self._scheduler is not None:
+            self._scheduler._wake()
+
+    def resume(self):
+        """Продолжает с того же шага; шкала сдвигается на длительность паузы"""
+        self.paused = False
+        if self._scheduler is not None:
+            self._scheduler._wake()
+
+    def _advance(self):
+        """Следующий шаг -> абсолютный дедлайн (perf_counter_ns) или None, если дорожка кончилась"""
+        plan = self.plan
+        fresh = False
+        while True:
+            if self._steps is None:
+                self._steps = plan.iter_steps()
+                if self._warp is not None:
+                    self._warp.next_loop()
+                fresh = True
+            step = next(self._steps, None)
+            if step is not None:
+                self._step = step
+                if self.max_rate:
+                    return time.perf_counter_ns()
+                if self._warp is None:
+                    deadline = self.loop_count * plan.duration_ns + step[0]
+                else:
+                    deadline = self._warp(step[0])
+                return self.origin_ns + self.shift_ns + deadline
+            self._steps = None
+            if fresh:
+                # Пустой план не зацикливаем
+                return None
+            self.loop_count += 1
+            if not self.loop or (self.loops is not None and self.loop_count >= self.loops):
+                return None
+            if self.on_loop:
+                self.on_loop(self.loop_count + 1)
+
+
+class TrackScheduler:
+    """Один поток сводит шкалы всех дорожек через кучу дедлайнов.
+
+    В куче лежит (дедлайн, номер, дорожка) для ближайшего шага каждой
+    дорожки. Поток спит до верхнего дедлайна (грубый сон, затем спин, как
+    DeadlineScheduler), выполняет шаг и кладет следующий шаг той же
+    дорожки. Добавление, остановка и пауза дорожки будят поток, поэтому
+    они действуют сразу, а не после чужого сна: дорожка на паузе
+    переносится из кучи в отдельный список вместе с дедлайном. pause()
+    планировщика действует и на дорожки, добавленные до resume(): они
+    ждут в том же списке. Поток живет, пока есть дорожки, и запускается
+    снова при следующем add(). С keep_alive=True
+    поток и контроллеры создаются заранее (prepare()) и ждут дорожек до
+    close(): так запуск по горячей клавише не платит за старт потока.
+    """
+
+    def __init__(self, backend=None, metrics=None, spin_ns=SPIN_NS,
+                 max_sleep_ns=MAX_SLEEP_NS, resync_ns=RESYNC_NS, keep_alive=False):
+        self.backend = backend or PynputBackend()
+        self.metrics = metrics
+        self.keep_alive = keep_alive
+        self.spin_ns = spin_ns
+        self.max_sleep_ns = max_sleep_ns
+        self.resync_ns = resync_ns
+        self._heap = []
+        # Дорожки на паузе: (дедлайн, дорожка, начало паузы)
+        self._parked = []
+        # pause() без resume(): новые дорожки тоже встают на паузу
+        self._paused = False
+        self._tracks = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._controllers = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def tracks(self):
+        """Активные дорожки"""
+        with self._cond:
+            return list(self._tracks)
+
+    def prepare(self):
+        """Заранее создает контроллеры и (при keep_alive) поток воспроизведения"""
+        with self._cond:
+            if self._controllers is None:
+                self._controllers = self.backend.controllers()
+            if self.keep_alive and not self.running:
+                self._thread = threading.Thread(target=self._run, name="tracks", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Отпускает ждущий поток: он завершится, когда доиграют дорожки"""
+        with self._cond:
+            self.keep_alive = False
+            self._cond.notify()
+
+    def add(self, plan, **options):
+        """Запускает план отдельной дорожкой -> Track (параметры - как у Track)"""
+        track = plan if isinstance(plan, Track) else Track(plan, **options)
+        track.stopped = False
+        track.finished = False
+        track.first_step_ns = 0
+        track.loop_count = 0
+        track.shift_ns = 0
+        track._steps = None
+        track._warp = time_warp(track.speed, track.max_gap)
+        track.report.unpaced = track.max_rate
+        track._scheduler = self
+        with self._cond:
+            if self._controllers is None:
+                self._controllers = self.backend.controllers()
+            track.start_position = self._controllers[0].position if track.restore_mouse else None
+            if not self._tracks:
+                # Пауза относится к текущим дорожкам, новый запуск ее сбрасывает
+                self._paused = False
+            track.paused = self._paused
+            track.origin_ns = time.perf_counter_ns()
+            deadline = track._advance()
+            if deadline is not None:
+                self._tracks.append(track)
+                if track.paused:
+                    # Клавиши еще не зажаты: сразу в список ждущих, шкала сдвинется при resume()
+                    self._parked.append((deadline, track, track.origin_ns))
+                else:
+                    heapq.heappush(self._heap, (deadline, next(self._counter), track))
+                if not self.running:
+                    self._thread = threading.Thread(target=self._run, name="tracks", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+        if deadline is None:
+            # Пустой план: играть нечего
+            self._finish(track)
+        return track
+
+    def stop(self):
+        """Останавливает все дорожки"""
+        with self._cond:
+            for track in self._tracks:
+                track.stopped = True
+            self._cond.notify()
+
+    def pause(self):
+        """Приостанавливает все дорожки, в том числе добавленные до resume()"""
+        with self._cond:
+            self._paused = True
+            for track in self._tracks:
+                track.paused = True
+            self._cond.notify()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            for track in self._tracks:
+                track.paused = False
+            self._cond.notify()
+
+    @property
+    def paused(self):
+        """Есть дорожки и все они на паузе"""
+        with self._cond:
+            return bool(self._tracks) and all(track.paused for track in self._tracks)
+
+    def join(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify()
+
+    def _finish(self, track, error=None):
+        """Отпускает клавиши дорожки, возвращает мышь и сообщает о завершении (без блокировки)"""
+        track.finished = True
+        track.plan.close()
+        try:
+            if self._controllers is not None:
+                keyboard_ctrl = self._controllers[1]
+                for key_obj in track.held_keys:
+                    keyboard_ctrl.release(key_obj)
+                if error is None and not track.stopped and track.start_position is not None:
+                    self._controllers[0].position = track.start_position
+            track.held_keys.clear()
+        except Exception as e:
+            error = error or e
+        track.paused = False
+        if error is not None:
+            if track.on_error:
+                track.on_error(error)
+        elif track.on_finished:
+            track.on_finished(track.stopped, track.report)
+
+    def _pop_due(self):
+        """Ждет ближайший шаг -> (дедлайн, дорожка); None - дорожек не осталось"""
+        perf_counter_ns = time.perf_counter_ns
+        with self._cond:
+            while True:
+                heap = self._heap
+                # Остановленные дорожки снимаем сразу, не дожидаясь их дедлайна
+                if any(track.stopped for _, _, track in heap):
+                    stopped = [entry for entry in heap if entry[2].stopped]
+                    heap[:] = [entry for entry in heap if not entry[2].stopped]
+                    heapq.heapify(heap)
+                    for _, _, track in stopped:
+                        self._tracks.remove(track)
+                    self._cond.release()
+                    try:
+                        for _, _, track in stopped:
+                            self._finish(track)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                if any(track.paused for _, _, track in heap):
+                    self._park()
+                    continue
+                if self._parked and any(not track.paused or track.stopped for _, track, _ in self._parked):
+                    self._unpark()
+                    continue
+                if not heap:
+                    if self.keep_alive or self._parked:
+                        self._cond.wait()
+                        continue
+                    self._thread = None
+                    return None
+                deadline = heap[0][0]
+                remaining = deadline - perf_counter_ns()
+                if remaining <= HARD_SPIN_NS:
+                    _, _, track = heapq.heappop(heap)
+                    return deadline, track
+                if remaining <= self.spin_ns:
+                    # Спин с уступкой GIL: поток слушателя горячих клавиш успевает
+                    # добавить дорожку, и ее более ранний дедлайн окажется наверху
+                    self._cond.release()
+                    try:
+                        time.sleep(0)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                self._cond.wait(min(remaining - self.spin_ns, self.max_sleep_ns) / 1e9)
+
+    def _park(self):
+        """Переносит дорожки на паузе из кучи в _parked и отпускает их клавиши
+        (вызывается под блокировкой)"""
+        now = time.perf_counter_ns()
+        heap = self._heap
+        paused = [entry for entry in heap if entry[2].paused]
+        heap[:] = [entry for entry in heap if not entry[2].paused]
+        heapq.heapify(heap)
+        self._parked += [(deadline, track, now) for deadline, _, track in paused]
+        keyboard_ctrl = self._controllers[1]
+        for _, _, track in paused:
+            for key_obj in track.held_keys:
+                keyboard_ctrl.release(key_obj)
+
+    def _unpark(self):
+        """Возвращает в кучу продолженные дорожки со сдвигом шкалы на паузу,
+        остановленные на паузе - завершает (вызывается под блокировкой)"""
+        now = time.perf_counter_ns()
+        parked, stopped = [], []
+        keyboard_ctrl = self._controllers[1]
+        for entry in self._parked:
+            deadline, track, paused_ns = entry
+            if track.stopped:
+                stopped.append(track)
+            elif track.paused:
+                parked.append(entry)
+            else:
+                track.shift_ns += now - paused_ns
+                for key_obj in track.held_keys:
+                    keyboard_ctrl.press(key_obj)
+                heapq.heappush(self._heap, (deadline + now - paused_ns, next(self._counter), track))
+        self._parked = parked
+        for track in stopped:
+            self._tracks.remove(track)
+        if stopped:
+            self._cond.release()
+            try:
+                for track in stopped:
+                    self._finish(track)
+            finally:
+                self._cond.acquire()
+
+    def _run(self):
+        perf_counter_ns = time.perf_counter_ns
+        mouse_ctrl, keyboard_ctrl = self._controllers
+        while True:
+            due = self._pop_due()
+            if due is None:
+                return
+            deadline, track = due
+            # Метрики могут смениться между сессиями, пока поток ждет (keep_alive)
+            metrics = self.metrics
+            now = perf_counter_ns()
+            while now < deadline:
+                now = perf_counter_ns()
+            if now - deadline > self.resync_ns:
+                # Сдвигаем шкалу только этой дорожки
+                track.shift_ns += now - deadline
+                track.report.resyncs += 1
+                deadline = now
+            track.report.add(deadline, now)
+
+            _, op, arg, x, y, label = track._step
+            try:
+                execute_step(mouse_ctrl, keyboard_ctrl, op, arg, x, y, track.held_keys)
+                if not track.first_step_ns:
+                    track.first_step_ns = perf_counter_ns()
+                if metrics is not None:
+                    inject_end = perf_counter_ns()
+                    metrics.observe('playback.late', now - deadline)
+                    metrics.observe('playback.inject', inject_end - now)
+                    metrics.span(OP_NAMES.get(op, 'nop'), now, inject_end, 'playback',
+                                 {'track': track.name})
+                if label and track.on_step:
+                    track.on_step(label)
+                next_deadline = None if track.stopped else track._advance()
+            except Exception as e:
+                with self._cond:
+                    self._tracks.remove(track)
+                self._finish(track, e)
+                continue
+
+            with self._cond:
+                if next_deadline is None:
+                    self._tracks.remove(track)
+                else:
+                    heapq.heappush(self._heap, (next_deadline, next(self._counter), track))
+                if metrics is not None:
+                    metrics.gauge('playback.tracks', len(self._tracks))
+            if next_deadline is None:
+                if metrics is not None:
+                    metrics.incr('playback.loops', track.loop_count)
+                self._finish(track)
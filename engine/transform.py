@@ -0,0 +1,138 @@
+"""Пакетные преобразования макроса перед воспроизведением"""
+from collections import OrderedDict
+import time
+
+from engine.event_store import EventStore
+
+# Сколько преобразованных макросов держать в кеше
+TRANSFORM_CACHE_SIZE = 4
+
+# Типы событий, у которых есть клавиша
+_KEY_EVENTS = ('key_press', 'key_hold', 'key_release')
+
+
+class TransformStage:
+    """Этап конвейера: принимает список событий-dict, возвращает новый список"""
+
+    def __call__(self, events):
+        return events
+
+
+class PluginStage(TransformStage):
+    """Вызывает process_batch плагина"""
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def __call__(self, events):
+        return self.plugin.process_batch(events)
+
+
+class KeyRemapStage(TransformStage):
+    """Заменяет имена действий на клавиши: 'reload' -> 'r', 'jump' -> 'Key.space'.
+    Пары, где действие и клавиша совпадают, пропускаются"""
+
+    def __init__(self, mapping):
+        self.mapping = {}
+        for action, key in mapping.items():
+            if not isinstance(key, str) or key.endswith('_click'):
+                # Действия мыши в клавиши не превращаются
+                continue
+            key = key if len(key) == 1 or key.startswith('Key.') else f"Key.{key}"
+            if key != action:
+                self.mapping[action] = key
+
+    def __call__(self, events):
+        mapping = self.mapping
+        for event in events:
+            if event.get('type') in _KEY_EVENTS:
+                key = mapping.get(event.get('key'))
+                if key is not None:
+                    event['key'] = key
+        return events
+
+
+class OffsetStage(TransformStage):
+    """Сдвигает координаты кликов и движений"""
+
+    def __init__(self, dx=0, dy=0):
+        self.dx = dx
+        self.dy = dy
+
+    def __call__(self, events):
+        dx, dy = self.dx, self.dy
+        for event in events:
+            if 'x' in event and 'y' in event:
+                event['x'] += dx
+                event['y'] += dy
+        return events
+
+
+class TransformPipeline:
+    """Цепочка этапов. Пустой конвейер отдает события как есть, без копирования"""
+
+    def __init__(self, stages=()):
+        self.stages = list(stages)
+
+    def __bool__(self):
+        return bool(self.stages)
+
+    def run(self, events):
+        if not self.stages:
+            return events
+        # Этапы вправе менять dict на месте: исходное хранилище не трогаем
+        events = [dict(event) for event in events]
+        for stage in self.stages:
+            events = stage(events)
+        return events
+
+
+def plugin_pipeline(plugin):
+    """Конвейер для плагина: переназначение клавиш и его собственная обработка"""
+    stages = []
+    if plugin is None:
+        return TransformPipeline(stages)
+    remap = KeyRemapStage(plugin.get_game_specific_keys() or {})
+    # Тождественная замена только скопировала бы все события
+    if remap.mapping:
+        stages.append(remap)
+    if plugin.has_batch_transform():
+        stages.append(PluginStage(plugin))
+    return TransformPipeline(stages)
+
+
+class TransformCache:
+    """Кеш преобразованных макросов.
+
+    Ключ - хранилище, его version и плагин, поэтому повторное
+    воспроизведение (и каждый цикл) не платит за обработку плагином,
+    а изменение макроса или перезагрузка плагина дают новый ключ.
+    """
+
+    def __init__(self, size=TRANSFORM_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+
+    def get(self, store, plugin, metrics=None):
+        """Макрос после конвейера плагина (EventStore)"""
+        key = (id(store), store.version, id(plugin))
+        entry = self._entries.get(key)
+        # Храним и сами объекты: id может достаться новому объекту после сборки мусора
+        if entry is not None and entry[0] is store and entry[1] is plugin:
+            self._entries.move_to_end(key)
+            if metrics is not None:
+                metrics.incr('plugin.cache_hits')
+            return entry[2]
+        
+        started = time.perf_counter_ns()
+        pipeline = plugin_pipeline(plugin)
+        result = EventStore.from_dicts(pipeline.run(store)) if pipeline else store
+        if metrics is not None:
+            metrics.observe('plugin.process_batch', time.perf_counter_ns() - started)
+        self._entries[key] = (store, plugin, result)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._entries.clear()
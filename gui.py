@@ -0,0 +1,1295 @@
+"""Графический интерфейс Macro Recorder"""
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, filedialog, simpledialog
+import os
+import queue
+import sqlite3
+import threading
+from engine.plan import compile_plan
+from engine.transform import TransformCache
+from engine.tracks import Track, TrackScheduler
+from engine.runtime import Runtime, play, record
+from engine.input_hub import InputHub
+from engine.hotkeys import (HotkeyManager, Binding, load_bindings, save_bindings,
+                            HOTKEYS_FILE, HOTKEY_POLICIES, POLICY_RESTART)
+from engine.event_store import EventStore
+from engine.metrics import Metrics, trace_path_for
+from engine.logbuffer import LogBuffer, DEBUG, INFO, WARNING, ERROR
+from engine.macro_file import load_macro_file, save_macro_file, MacroFormatError
+from engine.journal import list_journals, recover_journal, discard_journal
+from engine.streaming import MacroStream, StreamingPlan, should_stream
+from engine.program import MacroProgram, ProgramCache, is_program_file
+from engine.library import LIBRARY_DIR, MacroLibrary
+from engine.timeline import Clip, Timeline
+from engine.motion import MOVE_PLAYBACK_HZ
+from engine.normalize import normalize_events
+from engine.plugins import DEFAULT_GAME, PluginRegistry
+from engine.screen import ASPECT_POLICIES, ASPECT_FIT, mapping_for, remap_store
+from engine.recording import RecordingSession, finish_recording, RECORDING_FILE
+
+# Типы файлов для диалогов сохранения/загрузки
+MACRO_FILETYPES = [("Macro files", "*.mrec"), ("JSON files", "*.json"), ("All files", "*.*")]
+
+# Подписи типов событий для панели информации
+EVENT_TYPE_NAMES = {
+    'click': "Клики",
+    'key_press': "Клавиши",
+    'key_hold': "Удержания",
+    'key_release': "Отпускания",
+    'text': "Текст",
+    'move': "Движения"
+}
+
+# Множители скорости в списке (можно ввести и свой)
+SPEED_CHOICES = ("0.5", "1", "2", "4", "10")
+
+# Что сделала горячая клавиша - для лога
+HOTKEY_ACTIONS = {'start': "запуск", 'stop': "остановка", 'queue': "в очередь"}
+
+# Лог перерисовывается не чаще LOG_FPS раз в секунду и хранит не больше LOG_MAX_LINES строк
+LOG_FPS = 10
+LOG_MAX_LINES = 1000
+# Цвета строк лога по уровню
+LOG_COLORS = {DEBUG: "gray50", WARNING: "dark orange", ERROR: "red"}
+# Как часто открытая библиотека проверяет папку (только stat файлов)
+LIBRARY_SCAN_MS = 2000
+# Как часто GUI-поток выполняет вызовы, переданные из других потоков
+UI_CALLS_MS = 10
+ALL_GAMES = "Все игры"
+ALL_TAGS = "Все теги"
+
+
+class LogView:
+    """Окно лога поверх LogBuffer.
+
+    Сообщения копятся в буфере (из любого потока), а в виджет попадают
+    одной вставкой на кадр. Старые строки обрезаются.
+    """
+
+    def __init__(self, root, text, buffer=None, max_lines=LOG_MAX_LINES, fps=LOG_FPS):
+        self.root = root
+        self.text = text
+        self.buffer = buffer or LogBuffer()
+        self.max_lines = max_lines
+        self.interval_ms = max(1000 // fps, 1)
+        self.lines = 0
+        for level, color in LOG_COLORS.items():
+            text.tag_configure(level, foreground=color)
+        self.root.after(self.interval_ms, self._tick)
+
+    def add(self, message, level=INFO, key=None):
+        self.buffer.add(message, level, key)
+
+    def add_many(self, messages, level=INFO):
+        self.buffer.add_many(messages, level)
+
+    def _tick(self):
+        self.flush()
+        self.root.after(self.interval_ms, self._tick)
+
+    def flush(self):
+        """Переносит накопленное в виджет одной вставкой"""
+        lines, overflowed = self.buffer.drain()
+        if not lines:
+            return
+        args = []
+        if overflowed:
+            args += [f"... пропущено строк: {overflowed}\n", WARNING]
+        for when, level, message in lines:
+            args += [f"[{time.strftime('%H:%M:%S', time.localtime(when))}] {message}\n", level]
+        text = self.text
+        text.insert(tk.END, *args)
+        self.lines += len(lines) + (1 if overflowed else 0)
+        excess = self.lines - self.max_lines
+        if excess > 0:
+            text.delete("1.0", f"{excess + 1}.0")
+            self.lines = self.max_lines
+        text.see(tk.END)
+
+    def clear(self):
+        self.buffer.drain()
+        self.text.delete("1.0", tk.END)
+        self.lines = 0
+
+
+class LibraryDialog:
+    """Окно библиотеки макросов.
+
+    Список строится по индексу MacroLibrary; пока окно открыто, папка
+    периодически проверяется, и в индекс попадают только измененные файлы.
+    """
+
+    def __init__(self, app, directory=LIBRARY_DIR):
+        self.app = app
+        self.library = MacroLibrary(directory)
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Библиотека макросов")
+        self.window.geometry("700x400")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._job = None
+        
+        filter_frame = ttk.Frame(self.window, padding="5")
+        filter_frame.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        ttk.Label(filter_frame, text="Поиск:").grid(row=0, column=0)
+        self.query_var = tk.StringVar()
+        self.query_var.trace_add('write', lambda *_: self.refresh())
+        ttk.Entry(filter_frame, textvariable=self.query_var).grid(row=0, column=1, padx=5, sticky=(tk.W, tk.E))
+        self.game_var = tk.StringVar(value=ALL_GAMES)
+        game_combo = ttk.Combobox(filter_frame, textvariable=self.game_var, state="readonly", width=14,
+                                  values=[ALL_GAMES] + list(app.plugins.keys()))
+        game_combo.grid(row=0, column=2, padx=5)
+        game_combo.bind('<<ComboboxSelected>>', lambda _: self.refresh())
+        self.tag_var = tk.StringVar(value=ALL_TAGS)
+        self.tag_combo = ttk.Combobox(filter_frame, textvariable=self.tag_var, state="readonly", width=12)
+        self.tag_combo.grid(row=0, column=3, padx=5)
+        self.tag_combo.bind('<<ComboboxSelected>>', lambda _: self.refresh())
+        ttk.Button(filter_frame, text="Папка...", command=self.choose_directory).grid(row=0, column=4, padx=5)
+        filter_frame.columnconfigure(1, weight=1)
+        
+        columns = ('game', 'duration', 'events', 'tags')
+        self.tree = ttk.Treeview(self.window, columns=columns)
+        self.tree.heading('#0', text="Макрос")
+        for column, title in zip(columns, ("Игра", "Длительность", "Событий", "Теги")):
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=90)
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=5)
+        self.tree.bind('<Double-1>', lambda _: self.open_selected())
+        
+        button_frame = ttk.Frame(self.window, padding="5")
+        button_frame.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        ttk.Button(button_frame, text="Открыть", command=self.open_selected).grid(row=0, column=0, padx=5)
+        ttk.Button(button_frame, text="Теги...", command=self.edit_tags).grid(row=0, column=1, padx=5)
+        self.status_var = tk.StringVar()
+        ttk.Label(button_frame, textvariable=self.status_var).grid(row=0, column=2, padx=5)
+        
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+        self.show()
+    
+    def show(self):
+        """Первый показ папки: индекс обновляется, список строится целиком"""
+        self.library.scan()
+        self.refresh()
+        self._job = self.window.after(LIBRARY_SCAN_MS, self.rescan)
+    
+    def rescan(self):
+        """Обновляет индекс по папке и, если что-то изменилось, список"""
+        try:
+            if any(self.library.scan()):
+                self.refresh()
+        except OSError as e:
+            self.status_var.set(f"Папка недоступна: {e}")
+        self._job = self.window.after(LIBRARY_SCAN_MS, self.rescan)
+    
+    def refresh(self):
+        """Перестраивает список по фильтрам (запрос к индексу, файлы не открываются)"""
+        game = self.game_var.get()
+        tag = self.tag_var.get()
+        rows = self.library.search(self.query_var.get().strip(),
+                                   None if game == ALL_GAMES else game,
+                                   None if tag == ALL_TAGS else tag)
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            if row['error']:
+                values = (row['game'] or "", "", "не читается", "")
+            else:
+                duration = "" if row['duration'] is None else f"{row['duration']:.1f} сек"
+                events = "составной" if row['events_count'] is None else row['events_count']
+                values = (row['game'] or "", duration, events, row['tags'] or "")
+            self.tree.insert('', tk.END, iid=row['path'], text=row['name'], values=values)
+        self.tag_combo['values'] = [ALL_TAGS] + self.library.tags()
+        self.status_var.set(f"{self.library.directory}: {len(rows)}")
+    
+    def selected(self):
+        selection = self.tree.selection()
+        return selection[0] if selection else None
+    
+    def open_selected(self):
+        path = self.selected()
+        if path is not None:
+            self.app.open_macro(self.library.full_path(path))
+    
+    def edit_tags(self):
+        path = self.selected()
+        if path is None:
+            return
+        text = simpledialog.askstring("Теги", "Теги через запятую:", parent=self.window,
+                                      initialvalue=", ".join(self.library.tags(path)))
+        if text is not None:
+            self.library.set_tags(path, text.split(','))
+            self.refresh()
+    
+    def choose_directory(self):
+        directory = filedialog.askdirectory(parent=self.window, initialdir=self.library.directory,
+                                            title="Папка библиотеки")
+        if not directory:
+            return
+        self.window.after_cancel(self._job)
+        self.library.close()
+        try:
+            self.library = MacroLibrary(directory)
+            self.show()
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть библиотеку: {e}", parent=self.window)
+            self.close()
+    
+    def close(self):
+        if self._job is not None:
+            self.window.after_cancel(self._job)
+        self.library.close()
+        self.window.destroy()
+        self.app.library_dialog = None
+
+
+class RecorderApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Macro Recorder with Plugins")
+        self.root.geometry("750x650")
+        
+        self.events = EventStore()
+        self.recording = False
+        self.playing = False
+        self.loop_macro = False
+        self.current_plugin = None
+        self.session = None
+        # Все макросы играют дорожками на одном потоке; self.track - последняя запущенная
+        self.scheduler = TrackScheduler()
+        self.track = None
+        self.tracks_started = 0
+        self.paused = False
+        # Сессии воспроизведения - задачи asyncio в своем потоке; Tk трогает только GUI-поток
+        self.runtime = Runtime()
+        self.runtime.start()
+        self.ui_calls = queue.SimpleQueue()
+        # Единственные хуки мыши и клавиатуры: строка состояния, запись и горячие клавиши - подписчики
+        self.input_hub = InputHub()
+        # Горячие клавиши (HotkeyManager), пока включены
+        self.hotkeys = None
+        # Открытое окно библиотеки (LibraryDialog) или None
+        self.library_dialog = None
+        # Буфер редактора: вырезанный или скопированный фрагмент (Clip)
+        self.clipboard_events = None
+        # Макрос после плагина и скомпилированный план переиспользуются между запусками
+        self.transforms = TransformCache()
+        # Составные макросы компилируются один раз на содержимое файла, плагин и экран
+        self.programs = ProgramCache()
+        self.compiled = None
+        # Метрики последней сессии записи/воспроизведения
+        self.metrics = None
+        self._metrics_job = None
+        
+        # Регистрируем плагины
+        self.registry = PluginRegistry()
+        self.plugins = self.registry.builtins
+        
+        self.setup_ui()
+        self.pump_ui_calls()
+        self.recover_recording()
+        
+    def setup_ui(self):
+        # Main frame
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Title
+        title_label = ttk.Label(main_frame, text="Macro Recorder with Plugins", 
+                               font=("Arial", 16, "bold"))
+        title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
+        
+        # Game selection
+        game_frame = ttk.LabelFrame(main_frame, text="Выбор игры", padding="10")
+        game_frame.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Label(game_frame, text="Игра:").grid(row=0, column=0, sticky=tk.W)
+        
+        self.game_var = tk.StringVar(value=DEFAULT_GAME)
+        game_combo = ttk.Combobox(game_frame, textvariable=self.game_var, 
+                                 values=list(self.plugins.keys()), state="readonly")
+        game_combo.grid(row=0, column=1, padx=(10, 0), sticky=(tk.W, tk.E))
+        game_combo.bind('<<ComboboxSelected>>', self.on_game_selected)
+        
+        # Plugin info
+        self.plugin_info_var = tk.StringVar(value="Режим: Обычный")
+        ttk.Label(game_frame, textvariable=self.plugin_info_var).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        # Пересчет координат макросов, записанных на другом экране
+        ttk.Label(game_frame, text="Пропорции:").grid(row=2, column=0, sticky=tk.W, pady=(5, 0))
+        self.aspect_var = tk.StringVar(value=ASPECT_FIT)
+        ttk.Combobox(game_frame, textvariable=self.aspect_var, values=ASPECT_POLICIES,
+                     state="readonly", width=10).grid(row=2, column=1, padx=(10, 0), pady=(5, 0), sticky=tk.W)
+        
+        game_frame.columnconfigure(1, weight=1)
+        
+        # Preset macros
+        preset_frame = ttk.LabelFrame(main_frame, text="Готовые макросы", padding="10")
+        preset_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        self.preset_var = tk.StringVar()
+        self.preset_combo = ttk.Combobox(preset_frame, textvariable=self.preset_var, state="readonly")
+        self.preset_combo.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 10))
+        
+        self.load_preset_btn = ttk.Button(preset_frame, text="Загрузить макрос", 
+                                        command=self.load_preset, state=tk.DISABLED)
+        self.load_preset_btn.grid(row=0, column=1)
+        
+        preset_frame.columnconfigure(0, weight=1)
+        
+        # Control buttons
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=3, column=0, columnspan=3, pady=(0, 20))
+        
+        self.record_btn = ttk.Button(button_frame, text="Начать запись", 
+                                   command=self.toggle_recording)
+        self.record_btn.grid(row=0, column=0, padx=5)
+        
+        self.play_btn = ttk.Button(button_frame, text="Воспроизвести", 
+                                 command=self.play_recording, state=tk.DISABLED)
+        self.play_btn.grid(row=0, column=1, padx=5)
+        
+        self.stop_btn = ttk.Button(button_frame, text="Стоп", 
+                                 command=self.stop_playback, state=tk.DISABLED)
+        self.stop_btn.grid(row=0, column=2, padx=5)
+        
+        self.pause_btn = ttk.Button(button_frame, text="Пауза", 
+                                  command=self.toggle_pause, state=tk.DISABLED)
+        self.pause_btn.grid(row=0, column=3, padx=5)
+        
+        self.clear_btn = ttk.Button(button_frame, text="Очистить", 
+                                  command=self.clear_events)
+        self.clear_btn.grid(row=0, column=4, padx=5)
+        
+        # Additional controls frame
+        additional_frame = ttk.Frame(main_frame)
+        additional_frame.grid(row=4, column=0, columnspan=3, pady=(0, 10))
+        
+        # Loop checkbox
+        self.loop_var = tk.BooleanVar()
+        # Поток воспроизведения не читает Tk-переменные: флаг передается ему отсюда
+        self.loop_var.trace_add('write', self.on_loop_changed)
+        self.loop_check = ttk.Checkbutton(additional_frame, text="Зациклить макрос", 
+                                        variable=self.loop_var)
+        self.loop_check.grid(row=0, column=0, padx=5)
+        
+        # Save macro button
+        self.save_macro_btn = ttk.Button(additional_frame, text="Сохранить макрос", 
+                                       command=self.save_macro, state=tk.DISABLED)
+        self.save_macro_btn.grid(row=0, column=1, padx=5)
+        
+        # Load macro button
+        self.load_macro_btn = ttk.Button(additional_frame, text="Загрузить макрос", 
+                                       command=self.load_macro)
+        self.load_macro_btn.grid(row=0, column=2, padx=5)
+        
+        # Record mouse movement checkbox
+        self.record_moves_var = tk.BooleanVar()
+        self.record_moves_check = ttk.Checkbutton(additional_frame, text="Записывать движение мыши", 
+                                                variable=self.record_moves_var)
+        self.record_moves_check.grid(row=0, column=3, padx=5)
+        
+        # Global hotkeys
+        self.hotkeys_var = tk.BooleanVar()
+        ttk.Checkbutton(additional_frame, text="Горячие клавиши", variable=self.hotkeys_var,
+                        command=self.toggle_hotkeys).grid(row=1, column=0, padx=5, pady=(5, 0))
+        self.hotkey_policy_var = tk.StringVar(value=POLICY_RESTART)
+        ttk.Combobox(additional_frame, textvariable=self.hotkey_policy_var, values=HOTKEY_POLICIES,
+                     state="readonly", width=10).grid(row=1, column=1, padx=5, pady=(5, 0))
+        ttk.Button(additional_frame, text="Привязать макрос...",
+                   command=self.bind_hotkey).grid(row=1, column=2, padx=5, pady=(5, 0))
+        ttk.Button(additional_frame, text="Библиотека...",
+                   command=self.open_library).grid(row=1, column=3, padx=5, pady=(5, 0))
+        
+        # Playback timing
+        timing_frame = ttk.Frame(additional_frame)
+        timing_frame.grid(row=2, column=0, columnspan=4, pady=(5, 0))
+        ttk.Label(timing_frame, text="Скорость:").grid(row=0, column=0, padx=(5, 0))
+        self.speed_var = tk.StringVar(value="1")
+        ttk.Combobox(timing_frame, textvariable=self.speed_var, values=SPEED_CHOICES,
+                     width=5).grid(row=0, column=1, padx=5)
+        ttk.Label(timing_frame, text="Паузы не дольше (сек):").grid(row=0, column=2, padx=(5, 0))
+        self.max_gap_var = tk.StringVar(value="")
+        ttk.Entry(timing_frame, textvariable=self.max_gap_var, width=6).grid(row=0, column=3, padx=5)
+        self.max_rate_var = tk.BooleanVar()
+        ttk.Checkbutton(timing_frame, text="Максимальная скорость",
+                        variable=self.max_rate_var).grid(row=0, column=4, padx=5)
+        
+        # Status frame
+        status_frame = ttk.LabelFrame(main_frame, text="Статус", padding="10")
+        status_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        self.status_var = tk.StringVar(value="Готов к работе")
+        self.status_label = ttk.Label(status_frame, textvariable=self.status_var,
+                                     font=("Arial", 10))
+        self.status_label.grid(row=0, column=0, sticky=tk.W)
+        
+        self.progress = ttk.Progressbar(status_frame, mode='indeterminate')
+        self.progress.grid(row=0, column=1, sticky=(tk.W, tk.E))
+        
+        ttk.Button(status_frame, text="Экспорт метрик",
+                   command=self.export_metrics).grid(row=0, column=2, padx=(10, 0))
+        
+        self.metrics_var = tk.StringVar(value="")
+        ttk.Label(status_frame, textvariable=self.metrics_var, font=("Arial", 8),
+                  wraplength=700).grid(row=1, column=0, columnspan=3, sticky=tk.W)
+        
+        # Events info
+        info_frame = ttk.LabelFrame(main_frame, text="Информация о записи", padding="10")
+        info_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        self.events_count_var = tk.StringVar(value="Записанных событий: 0")
+        ttk.Label(info_frame, textvariable=self.events_count_var).grid(row=0, column=0, sticky=tk.W)
+        
+        self.duration_var = tk.StringVar(value="Длительность: 0.0 сек")
+        ttk.Label(info_frame, textvariable=self.duration_var).grid(row=1, column=0, sticky=tk.W)
+        
+        self.types_var = tk.StringVar(value="")
+        ttk.Label(info_frame, textvariable=self.types_var).grid(row=2, column=0, sticky=tk.W)
+        
+        # Editor: диапазон задается в секундах от начала макроса
+        edit_frame = ttk.Frame(info_frame)
+        edit_frame.grid(row=0, column=1, rowspan=3, sticky=tk.E)
+        ttk.Label(edit_frame, text="Фрагмент с (сек):").grid(row=0, column=0)
+        self.edit_from_var = tk.StringVar(value="")
+        ttk.Entry(edit_frame, textvariable=self.edit_from_var, width=7).grid(row=0, column=1, padx=2)
+        ttk.Label(edit_frame, text="по:").grid(row=0, column=2)
+        self.edit_to_var = tk.StringVar(value="")
+        ttk.Entry(edit_frame, textvariable=self.edit_to_var, width=7).grid(row=0, column=3, padx=2)
+        ttk.Label(edit_frame, text="Темп x").grid(row=0, column=4)
+        self.edit_scale_var = tk.StringVar(value="1")
+        ttk.Entry(edit_frame, textvariable=self.edit_scale_var, width=5).grid(row=0, column=5, padx=2)
+        edit_buttons = (("Обрезать", self.edit_trim), ("Вырезать", self.edit_cut),
+                        ("Копировать", self.edit_copy), ("Вставить", self.edit_paste),
+                        ("Вставить файл...", self.edit_insert_file), ("Темп", self.edit_retime),
+                        ("Отменить", self.edit_undo), ("Повторить", self.edit_redo))
+        edit_buttons_frame = ttk.Frame(edit_frame)
+        edit_buttons_frame.grid(row=1, column=0, columnspan=6)
+        for i, (text, command) in enumerate(edit_buttons):
+            ttk.Button(edit_buttons_frame, text=text, command=command).grid(
+                row=i // 4, column=i % 4, padx=2, pady=(2, 0), sticky=(tk.W, tk.E))
+        info_frame.columnconfigure(0, weight=1)
+        self.root.bind('<Control-z>', lambda _: self.edit_undo())
+        self.root.bind('<Control-y>', lambda _: self.edit_redo())
+        
+        # Events log
+        log_frame = ttk.LabelFrame(main_frame, text="Лог событий", padding="10")
+        log_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.log_text = scrolledtext.ScrolledText(log_frame, height=12, width=60)
+        self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.log_view = LogView(self.root, self.log_text)
+        
+        # Configure grid weights
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(7, weight=1)
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(0, weight=1)
+        status_frame.columnconfigure(1, weight=1)
+        
+        # Start mouse listener for continuous updates
+        self.setup_listeners()
+        
+        # Load initial plugin
+        self.on_game_selected()
+        
+    def setup_listeners(self):
+        """Start the input hub; the cursor position goes to the status bar at most 10 times a second"""
+        self.input_hub.start()
+        self.input_hub.subscribe(
+            on_move=lambda x, y: self.call_in_gui(self.status_var.set, f"Курсор: X={x}, Y={y}"),
+            move_interval=0.1)
+        
+    def on_game_selected(self, event=None):
+        """Обработчик выбора игры"""
+        game_name = self.game_var.get()
+        
+        self.current_plugin, source = self.registry.get(game_name)
+        if source == 'external':
+            self.log_message(f"Загружен внешний плагин для {game_name}")
+        elif source == 'builtin':
+            self.log_message(f"Загружен встроенный плагин для {game_name}")
+        else:
+            self.log_message("Режим: Обычный")
+        
+        # Обновляем информацию о плагине
+        if self.current_plugin:
+            keys = self.registry.keys(self.current_plugin)
+            presets = self.registry.presets(self.current_plugin)
+            self.plugin_info_var.set(f"Режим: {game_name} | Клавиши: {len(keys)} | Макросы: {len(presets)}")
+            
+            # Обновляем список пресетов
+            preset_names = [p['name'] for p in presets]
+            self.preset_combo['values'] = preset_names
+            if preset_names:
+                self.preset_combo.set(preset_names[0])
+                self.load_preset_btn.config(state=tk.NORMAL)
+            else:
+                self.preset_combo.set('')
+                self.load_preset_btn.config(state=tk.DISABLED)
+        
+    def load_preset(self):
+        """Загружает выбранный пресет-макрос"""
+        if not self.current_plugin:
+            return
+            
+        preset_name = self.preset_var.get()
+        preset = self.registry.preset(self.current_plugin, preset_name)
+        if preset:
+            self.events = EventStore.from_dicts(preset['actions'])
+            self.events.resolution = self.current_plugin.get_base_resolution()
+            self.fit_to_screen(self.events)
+            self.update_info()
+            self.log_message(f"Загружен макрос: {preset_name}")
+            self.log_message(f"Действий: {len(self.events)}")
+        else:
+            messagebox.showwarning("Предупреждение", "Макрос не найден")
+    
+    def screen_resolution(self):
+        return self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+    
+    def screen_mapping(self, resolution):
+        """Пересчет из разрешения макроса в текущий экран или None"""
+        return mapping_for(resolution, self.screen_resolution(), self.aspect_var.get())
+    
+    def fit_to_screen(self, store):
+        """Пересчитывает координаты макроса под текущий экран одним проходом"""
+        mapping = self.screen_mapping(store.resolution)
+        if mapping:
+            remap_store(store, mapping)
+            self.log_message(f"Координаты пересчитаны: {mapping}")
+    
+    def log_message(self, message, level=INFO, key=None):
+        """Add message to log (thread-safe, drawn on the next log frame)"""
+        self.log_view.add(message, level, key)
+    
+    def log_messages(self, messages, level=INFO):
+        """Add several messages to log"""
+        self.log_view.add_many(messages, level)
+        
+    def update_info(self):
+        """Update events information"""
+        count = len(self.events)
+        self.events_count_var.set(f"Записанных событий: {count}")
+        
+        # Статистика ведется хранилищем по мере добавления, здесь O(1)
+        self.duration_var.set(f"Длительность: {self.events.duration:.1f} сек")
+        # Копия: во время записи счетчики пополняет поток runtime
+        self.types_var.set(" | ".join(f"{EVENT_TYPE_NAMES.get(t, t)}: {n}"
+                                      for t, n in list(self.events.type_counts.items())))
+            
+        # Enable/disable play button
+        if count > 0 and not self.recording:
+            self.play_btn.config(state=tk.NORMAL)
+            self.save_macro_btn.config(state=tk.NORMAL)
+        else:
+            self.play_btn.config(state=tk.DISABLED)
+            if count == 0:
+                self.save_macro_btn.config(state=tk.DISABLED)
+    
+    def toggle_recording(self):
+        """Start or stop recording"""
+        if not self.recording:
+            self.start_recording()
+        else:
+            self.stop_recording()
+    
+    def start_recording(self):
+        """Start recording events"""
+        self.recording = True
+        if self.hotkeys:
+            # Нажатия во время записи не должны запускать макросы
+            self.hotkeys.enabled = False
+        self.start_metrics('record')
+        # Новая сессия со своим хранилищем: прошлая запись может еще сохраняться в фоне
+        self.session = RecordingSession(self.current_plugin, record_moves=self.record_moves_var.get(),
+                                        resolution=self.screen_resolution(), metrics=self.metrics,
+                                        hub=self.input_hub)
+        self.session.start()
+        self.events = self.session.events
+        if self.session.journal_error:
+            self.log_message(f"Журнал записи недоступен: {self.session.journal_error}", WARNING)
+        self.record_btn.config(text="Остановить запись")
+        self.play_btn.config(state=tk.DISABLED)
+        self.stop_btn.config(state=tk.DISABLED)
+        self.save_macro_btn.config(state=tk.DISABLED)
+        self.progress.start()
+        self.status_var.set("Запись... Нажмите 'Esc' или 'q' для остановки")
+        
+        self.log_message("Начало записи")
+        
+        # Буфер захвата разбирает задача runtime, пачки переносятся в GUI-поток через очередь вызовов
+        session = self.session
+        task = self.runtime.spawn(record(
+            session, on_batch=lambda batch, messages: self.call_in_gui(self._recorded_batch, messages)))
+        task.add_done_callback(lambda task: self.call_in_gui(self._recording_done, session, task))
+        
+        # Update UI periodically
+        self.update_ui_during_recording()
+    
+    def stop_recording(self):
+        """Ask the recording task to stop; _recording_done finishes the session"""
+        if self.recording:
+            self.session.request_stop()
+    
+    def _recorded_batch(self, messages):
+        """Пачка событий записана (GUI-поток): UI обновляется один раз на пачку"""
+        if messages:
+            self.log_messages(messages)
+        if self.recording:
+            self.update_info()
+    
+    def _recording_done(self, session, task):
+        """Задача записи завершилась (GUI-поток)"""
+        if not self.recording or session is not self.session:
+            return
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            self.log_message(f"Ошибка записи: {str(error) or type(error).__name__}", ERROR)
+        self._finish_recording()
+    
+    def _finish_recording(self):
+        """Останавливает сессию записи и сохраняет ее в фоне (после задачи записи)"""
+        self.recording = False
+        if self.hotkeys:
+            self.hotkeys.enabled = True
+        self.record_btn.config(text="Начать запись")
+        self.progress.stop()
+        self.status_var.set("Запись остановлена")
+        
+        session = self.session
+        journal_error = session.journal_error
+        _, messages = session.stop()
+        if messages:
+            self.log_messages(messages)
+        if session.motion.raw_count:
+            self.log_message(f"Движения мыши: {session.motion.raw_count} точек сжато до {session.motion.kept_count}")
+        if session.capture.dropped:
+            self.log_message(f"Потеряно событий при переполнении буфера: {session.capture.dropped}", WARNING)
+        if session.journal_error is not journal_error:
+            self.log_message(f"Ошибка записи журнала: {session.journal_error}", ERROR)
+        
+        # Итоговое сохранение в фоне, чтобы не подвешивать окно
+        thread = threading.Thread(target=self._save_recording_thread, args=(session.events, session.journal))
+        thread.daemon = True
+        thread.start()
+        self.update_info()
+        self.metrics_var.set(self.metrics.summary())
+        self.log_message(f"Запись остановлена. Событий: {len(self.events)}")
+    
+    def update_ui_during_recording(self):
+        """Update UI during recording"""
+        if self.recording:
+            count = len(self.events)
+            self.status_var.set(f"Запись... Событий: {count}. Нажмите 'Esc' или 'q' для остановки")
+            self.root.after(100, self.update_ui_during_recording)
+    
+    def save_events(self):
+        """Save events to file"""
+        try:
+            save_macro_file(RECORDING_FILE, self.events)
+            self.log_message(f"События сохранены в {RECORDING_FILE}")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+    
+    def _save_recording_thread(self, events, journal):
+        """Нормализует и сохраняет завершенную запись; журнал удаляется только после успеха"""
+        try:
+            normalized, report = finish_recording(events, journal)
+        except Exception as e:
+            self.call_in_gui(messagebox.showerror,
+                             "Ошибка", f"Не удалось сохранить файл: {e}. Запись сохранена в журнале")
+            return
+        self.call_in_gui(self._recording_saved, events, normalized, report)
+    
+    def _recording_saved(self, events, normalized, report):
+        """Подменяет сырую запись нормализованной (GUI-поток)"""
+        if self.events is events:
+            self.events = normalized
+            self.update_info()
+        self.log_message(report.summary())
+        self.log_message(f"События сохранены в {RECORDING_FILE}")
+    
+    def recover_recording(self):
+        """Предлагает восстановить записи из журналов, оставшихся после сбоя (с последней).
+        После восстановленной остальные журналы ждут следующего запуска"""
+        try:
+            journals = list_journals()
+        except OSError as e:
+            self.log_message(f"Не удалось прочитать журнал записи: {e}", WARNING)
+            return
+        for path in reversed(journals):
+            try:
+                events = recover_journal(path)
+                # Журнал пишется на этой же машине
+                events.resolution = self.screen_resolution()
+            except OSError as e:
+                self.log_message(f"Не удалось прочитать журнал записи: {e}", WARNING)
+                continue
+            
+            if events and messagebox.askyesno(
+                    "Восстановление",
+                    f"Найдена незавершенная запись ({len(events)} событий). Восстановить?"):
+                self.events = events
+                self.update_info()
+                self.log_message(f"Запись восстановлена из журнала. Событий: {len(events)}")
+                try:
+                    save_macro_file(RECORDING_FILE, events)
+                except Exception as e:
+                    # Журнал оставляем: без него восстановленное нигде не сохранено
+                    messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+                    return
+                self.log_message(f"События сохранены в {RECORDING_FILE}")
+                discard_journal(path)
+                return
+            discard_journal(path)
+    
+    def save_macro(self):
+        """Save current macro to a file"""
+        if not self.events:
+            messagebox.showwarning("Предупреждение", "Нет событий для сохранения")
+            return
+            
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".mrec",
+            filetypes=MACRO_FILETYPES,
+            title="Сохранить макрос"
+        )
+        
+        if filename:
+            try:
+                # Добавляем метаданные о макросе
+                metadata = {
+                    'name': os.path.basename(filename),
+                    'game': self.game_var.get(),
+                    'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+                    'events_count': len(self.events)
+                }
+                
+                # Формат выбирается по расширению: .json или бинарный .mrec
+                events = self.events
+                if not isinstance(events, EventStore):
+                    # Потоковый макрос или правленая шкала собираются в хранилище
+                    events = events.to_store()
+                save_macro_file(filename, events, metadata)
+                
+                self.log_message(f"Макрос сохранен в {filename}")
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+    
+    def load_macro(self):
+        """Load macro from a file"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("Macro files", "*.mrec *.json")] + MACRO_FILETYPES[2:],
+            title="Загрузить макрос"
+        )
+        if filename:
+            self.open_macro(filename)
+    
+    def open_library(self):
+        """Open the macro library window (or bring it to front)"""
+        if self.library_dialog is not None:
+            self.library_dialog.window.lift()
+            return
+        try:
+            self.library_dialog = LibraryDialog(self)
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть библиотеку: {e}")
+    
+    def open_macro(self, filename):
+        """Open a macro file (from the file dialog or the library)"""
+        try:
+            # Формат (бинарный или JSON) определяется по содержимому файла
+            if is_program_file(filename):
+                self.events = MacroProgram(filename, self.compile_program(filename))
+                metadata = self.events.metadata
+                self.log_message("Открыт составной макрос (повторы и вызовы)")
+            elif should_stream(filename):
+                # Большой файл остается на диске и читается во время воспроизведения
+                self.events = MacroStream(filename)
+                metadata = self.events.metadata
+                self.log_message("Макрос открыт в потоковом режиме")
+            else:
+                metadata, events = load_macro_file(filename)
+                self.events, report = normalize_events(events)
+                if report.removed:
+                    self.log_message(report.summary())
+                self.fit_to_screen(self.events)
+            self.update_info()
+            self.log_message(f"Загружен макрос из {filename}")
+            self.log_message(f"Действий: {len(self.events)}")
+            
+            # Если в файле есть информация о игре, пытаемся переключиться
+            if 'game' in metadata:
+                game_name = metadata['game']
+                if game_name in self.plugins:
+                    self.game_var.set(game_name)
+                    self.on_game_selected()
+                
+        except MacroFormatError as e:
+            messagebox.showerror("Ошибка", str(e))
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {e}")
+    
+    def play_recording(self):
+        """Play recorded events; во время воспроизведения добавляет еще одну дорожку"""
+        if self.recording or len(self.events) == 0:
+            return
+        timing = self.playback_timing()
+        if timing is None:
+            return
+        
+        if not self.playing:
+            self.start_metrics('playback')
+            self.scheduler.metrics = self.metrics
+        # Компилируем макрос один раз до запуска потока
+        try:
+            if isinstance(self.events, MacroStream):
+                plan = StreamingPlan(self.events.path, self.current_plugin,
+                                     self.screen_mapping(self.events.resolution))
+            elif isinstance(self.events, MacroProgram):
+                plan = self.compile_program(self.events.path)
+            else:
+                plan = self.compile_events()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось подготовить макрос: {e}")
+            return
+            
+        self.tracks_started += 1
+        name = f"#{self.tracks_started}"
+        
+        # Дорожка играет в потоке планировщика, сессию ведет задача runtime;
+        # ее итог переносится в GUI-поток через очередь вызовов
+        self.track = Track(
+            plan, name=name, loop=self.loop_var.get(), **timing,
+            # Шаги и циклы пишутся в буфер лога прямо из потока воспроизведения, с ограничением частоты
+            on_step=lambda m: self.log_message(f"Воспроизведение {name}: {m}", key="Воспроизведение"),
+            on_loop=lambda n: self.log_message(f"Повтор макроса {name} (цикл {n})", key="Повтор макроса"))
+        session = self.runtime.spawn(play(
+            self.scheduler, self.track,
+            on_started=lambda track: self.call_in_gui(self._playback_started, name)))
+        session.add_done_callback(lambda session: self.call_in_gui(self._playback_done, name, session))
+        
+        self.playing = True
+        self.record_btn.config(state=tk.DISABLED)
+        self.stop_btn.config(state=tk.NORMAL)
+        self.pause_btn.config(state=tk.NORMAL)
+        self.progress.start()
+        self.update_playing_status()
+    
+    def _playback_started(self, name):
+        """Дорожка добавлена в планировщик (GUI-поток)"""
+        self.update_playing_status()
+        if len(self.scheduler.tracks()) > 1:
+            self.log_message(f"Макрос {name} добавлен дорожкой")
+    
+    def _playback_done(self, name, session):
+        """Задача воспроизведения завершилась (GUI-поток)"""
+        if session.cancelled():
+            self._last_track_done()
+            return
+        error = session.exception()
+        if error is not None:
+            self._playback_error(name, str(error) or type(error).__name__)
+        else:
+            self._playback_finished(name, *session.result())
+    
+    def call_in_gui(self, func, *args):
+        """Передает вызов в GUI-поток (из любого потока)"""
+        self.ui_calls.put((func, args))
+    
+    def pump_ui_calls(self):
+        """Выполняет вызовы из других потоков: Tk трогается только из GUI-потока"""
+        while True:
+            try:
+                func, args = self.ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+        self.root.after(UI_CALLS_MS, self.pump_ui_calls)
+    
+    def toggle_hotkeys(self):
+        """Включает/выключает горячие клавиши из hotkeys.json"""
+        if self.hotkeys_var.get():
+            self.start_hotkeys()
+        else:
+            self.stop_hotkeys()
+    
+    def start_hotkeys(self):
+        """Компилирует макросы привязок заранее и запускает глобальный слушатель"""
+        try:
+            bindings = load_bindings()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить {HOTKEYS_FILE}: {e}")
+            self.hotkeys_var.set(False)
+            return
+        if not bindings:
+            messagebox.showinfo("Горячие клавиши", "Привязок нет: нажмите 'Привязать макрос...'")
+            self.hotkeys_var.set(False)
+            return
+        
+        # Запуск по клавише не должен ждать старта потока воспроизведения
+        self.scheduler.keep_alive = True
+        self.hotkeys = HotkeyManager(
+            self.scheduler, bindings, self.metrics,
+            on_trigger=lambda b, action: self.log_message(
+                f"Горячая клавиша {b.hotkey}: {HOTKEY_ACTIONS[action]} {os.path.basename(b.macro)}",
+                key="Горячая клавиша"),
+            on_finished=lambda b, stopped, report: self.call_in_gui(self._hotkey_finished),
+            on_error=lambda b, e: self.log_message(f"Ошибка макроса {b.hotkey}: {e}", ERROR),
+            hub=self.input_hub)
+        target = self.screen_resolution()
+        try:
+            failed = self.hotkeys.prepare(self.current_plugin, target, self.aspect_var.get(),
+                                          self.registry)
+            self.hotkeys.start()
+        except Exception as e:
+            self.hotkeys = None
+            self.scheduler.close()
+            self.hotkeys_var.set(False)
+            messagebox.showerror("Ошибка", f"Не удалось включить горячие клавиши: {e}")
+            return
+        for binding, error in failed:
+            self.log_message(f"Макрос для {binding.hotkey} не загружен: {error}", WARNING)
+        self.hotkeys.enabled = not self.recording
+        self.log_message(f"Горячие клавиши включены: {len(bindings) - len(failed)}")
+    
+    def stop_hotkeys(self):
+        if self.hotkeys is None:
+            return
+        self.hotkeys.stop()
+        self.log_message(self.hotkeys.latency_summary())
+        self.hotkeys = None
+        self.scheduler.close()
+        self.log_message("Горячие клавиши выключены")
+    
+    def bind_hotkey(self):
+        """Добавляет привязку клавиши к файлу макроса в hotkeys.json"""
+        hotkey = simpledialog.askstring("Горячая клавиша",
+                                        "Сочетание в формате pynput, например <ctrl>+<alt>+1 или <f5>:",
+                                        parent=self.root)
+        if not hotkey:
+            return
+        filename = filedialog.askopenfilename(filetypes=MACRO_FILETYPES)
+        if not filename:
+            return
+        try:
+            bindings = [b for b in load_bindings() if b.hotkey != hotkey]
+            bindings.append(Binding(hotkey, filename, self.hotkey_policy_var.get(), self.loop_var.get(),
+                                    **self.playback_timing() or {}))
+            save_bindings(bindings)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить {HOTKEYS_FILE}: {e}")
+            return
+        self.log_message(f"{hotkey} -> {os.path.basename(filename)} ({self.hotkey_policy_var.get()})")
+        if self.hotkeys:
+            # Перечитываем привязки и перекомпилируем макросы
+            self.stop_hotkeys()
+            self.start_hotkeys()
+    
+    def _hotkey_finished(self):
+        """Макрос горячей клавиши доиграл; окно могло ждать только его"""
+        if self.playing:
+            self._last_track_done()
+    
+    def playback_timing(self):
+        """Параметры шкалы из окна -> dict(speed, max_gap, max_rate) или None при ошибке ввода"""
+        try:
+            speed = float(self.speed_var.get().replace(',', '.'))
+            gap_text = self.max_gap_var.get().strip().replace(',', '.')
+            max_gap = float(gap_text) if gap_text else None
+        except ValueError:
+            messagebox.showerror("Ошибка", "Скорость и паузы задаются числами")
+            return None
+        if speed <= 0 or (max_gap is not None and max_gap < 0):
+            messagebox.showerror("Ошибка", "Скорость должна быть больше нуля, пауза - не меньше нуля")
+            return None
+        return {'speed': speed, 'max_gap': max_gap, 'max_rate': self.max_rate_var.get()}
+    
+    def update_playing_status(self):
+        """Статус воспроизведения с числом дорожек"""
+        count = len(self.scheduler.tracks())
+        state = "Пауза" if self.paused else "Воспроизведение..."
+        self.status_var.set(state if count < 2 else f"{state} Дорожек: {count}")
+    
+    def compile_events(self):
+        """План для текущего макроса; перекомпиляция только если сменился макрос или плагин"""
+        events = self.events
+        if isinstance(events, Timeline):
+            events = events.to_store()
+        events = self.transforms.get(events, self.current_plugin, self.metrics)
+        if self.compiled is None or self.compiled[0] is not events or self.compiled[1] != events.version:
+            self.compiled = (events, events.version, compile_plan(events, None, MOVE_PLAYBACK_HZ))
+        return self.compiled[2]
+    
+    def compile_program(self, path):
+        """План составного макроса из кеша; перекомпиляция, только если сменились файлы, плагин или экран"""
+        return self.programs.get(path, self.current_plugin, self.registry,
+                                 self.screen_resolution(), self.aspect_var.get())
+    
+    def editable_timeline(self):
+        """Текущий макрос как Timeline для правки или None, если править нельзя"""
+        if self.recording:
+            return None
+        if isinstance(self.events, MacroProgram):
+            messagebox.showwarning("Предупреждение", "Составной макрос правится в JSON-файле")
+            return None
+        if not isinstance(self.events, Timeline):
+            store = self.events
+            if isinstance(store, MacroStream):
+                self.log_message("Макрос загружен в память для редактирования")
+                store = store.to_store()
+            self.events = Timeline(store)
+        return self.events
+    
+    def edit_range(self, timeline):
+        """Диапазон событий из полей редактора -> (start, end) или None"""
+        try:
+            start_text = self.edit_from_var.get().strip().replace(',', '.')
+            end_text = self.edit_to_var.get().strip().replace(',', '.')
+            origin = timeline.start_time or 0.0
+            start = timeline.index_at_time(origin + float(start_text)) if start_text else 0
+            end = timeline.index_at_time(origin + float(end_text)) if end_text else len(timeline)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Границы фрагмента задаются числами (секунды)")
+            return None
+        if start >= end:
+            messagebox.showwarning("Предупреждение", "В выбранном фрагменте нет событий")
+            return None
+        return start, end
+    
+    def _edited(self, message):
+        self.update_info()
+        self.log_message(message)
+    
+    def edit_trim(self):
+        """Оставляет только выбранный фрагмент"""
+        timeline = self.editable_timeline()
+        selected = timeline is not None and self.edit_range(timeline)
+        if selected:
+            timeline.trim(*selected)
+            self._edited(f"Макрос обрезан: осталось событий {len(timeline)}")
+    
+    def edit_cut(self):
+        timeline = self.editable_timeline()
+        selected = timeline is not None and self.edit_range(timeline)
+        if selected:
+            self.clipboard_events = timeline.cut(*selected)
+            self._edited(f"Вырезано событий: {len(self.clipboard_events)}")
+    
+    def edit_copy(self):
+        timeline = self.editable_timeline()
+        selected = timeline is not None and self.edit_range(timeline)
+        if selected:
+            self.clipboard_events = timeline.copy(*selected)
+            self.log_message(f"Скопировано событий: {len(self.clipboard_events)}")
+    
+    def _insert_position(self, timeline):
+        """Куда вставлять: перед событием в начале фрагмента или в конец"""
+        text = self.edit_from_var.get().strip().replace(',', '.')
+        if not text:
+            return len(timeline)
+        try:
+            return timeline.index_at_time((timeline.start_time or 0.0) + float(text))
+        except ValueError:
+            messagebox.showerror("Ошибка", "Границы фрагмента задаются числами (секунды)")
+            return None
+    
+    def edit_paste(self):
+        if not self.clipboard_events:
+            return
+        timeline = self.editable_timeline()
+        if timeline is None:
+            return
+        index = self._insert_position(timeline)
+        if index is not None:
+            timeline.insert(index, self.clipboard_events)
+            self._edited(f"Вставлено событий: {len(self.clipboard_events)}")
+    
+    def edit_insert_file(self):
+        """Вставляет другой макрос; если выбран фрагмент, он заменяется"""
+        timeline = self.editable_timeline()
+        if timeline is None:
+            return
+        filename = filedialog.askopenfilename(
+            filetypes=[("Macro files", "*.mrec *.json")] + MACRO_FILETYPES[2:],
+            title="Вставить макрос"
+        )
+        if not filename:
+            return
+        try:
+            _, events = load_macro_file(filename)
+            events, _ = normalize_events(events)
+            self.fit_to_screen(events)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {e}")
+            return
+        clip = Clip.from_store(events)
+        if self.edit_to_var.get().strip():
+            selected = self.edit_range(timeline)
+            if selected:
+                timeline.splice(*selected, clip)
+                self._edited(f"Фрагмент заменен макросом {filename}: событий {len(clip)}")
+            return
+        index = self._insert_position(timeline)
+        if index is not None:
+            timeline.insert(index, clip)
+            self._edited(f"Вставлен макрос {filename}: событий {len(clip)}")
+    
+    def edit_retime(self):
+        """Меняет темп фрагмента; следующие события сдвигаются следом"""
+        timeline = self.editable_timeline()
+        selected = timeline is not None and self.edit_range(timeline)
+        if not selected:
+            return
+        try:
+            scale = float(self.edit_scale_var.get().replace(',', '.'))
+            timeline.retime(*selected, scale=1 / scale)
+        except (ValueError, ZeroDivisionError):
+            messagebox.showerror("Ошибка", "Темп должен быть числом больше нуля")
+            return
+        self._edited(f"Темп фрагмента изменен: x{scale:g}")
+    
+    def edit_undo(self):
+        if isinstance(self.events, Timeline) and not self.recording and self.events.undo():
+            self._edited("Правка отменена")
+    
+    def edit_redo(self):
+        if isinstance(self.events, Timeline) and not self.recording and self.events.redo():
+            self._edited("Правка повторена")
+    
+    def start_metrics(self, name):
+        """Новые метрики для сессии; сводка в панели статуса обновляется, пока сессия идет"""
+        self.metrics = Metrics(name, trace=True)
+        self.input_hub.metrics = self.metrics
+        if self.hotkeys:
+            self.hotkeys.metrics = self.metrics
+        self.metrics_var.set("")
+        if self._metrics_job is not None:
+            self.root.after_cancel(self._metrics_job)
+        self._metrics_job = self.root.after(500, self.update_metrics)
+    
+    def update_metrics(self):
+        """Живая сводка метрик в панели статуса"""
+        self._metrics_job = None
+        if self.metrics is not None:
+            self.metrics_var.set(self.metrics.summary())
+        if self.recording or self.playing:
+            self._metrics_job = self.root.after(500, self.update_metrics)
+    
+    def export_metrics(self):
+        """Сохраняет метрики последней сессии и трассу для Perfetto"""
+        if self.metrics is None:
+            messagebox.showinfo("Метрики", "Нет данных: запишите или воспроизведите макрос")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json")],
+                                            initialfile=f"{self.metrics.name}.metrics.json")
+        if not path:
+            return
+        trace_path = trace_path_for(path)
+        try:
+            self.metrics.export_json(path)
+            self.metrics.export_trace(trace_path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить метрики: {e}")
+            return
+        self.log_message(f"Метрики сохранены в {path}, трасса - в {trace_path}")
+    
+    def stop_playback(self):
+        """Stop playback (all tracks)"""
+        self.scheduler.stop()
+        self.status_var.set("Остановка воспроизведения...")
+    
+    def toggle_pause(self):
+        """Pause or resume all tracks"""
+        self.paused = not self.paused
+        if self.paused:
+            self.scheduler.pause()
+            self.pause_btn.config(text="Продолжить")
+        else:
+            self.scheduler.resume()
+            self.pause_btn.config(text="Пауза")
+        self.update_playing_status()
+    
+    def on_loop_changed(self, *args):
+        """Галочку зацикливания можно менять во время воспроизведения (для последней дорожки)"""
+        if self.track:
+            self.track.loop = self.loop_var.get()
+    
+    def _playback_finished(self, name, stopped, report):
+        """Called when a track finishes"""
+        self.log_view.buffer.flush_rates()
+        self.log_message(f"{name}: {report.summary()}")
+        if stopped:
+            self.log_message(f"Воспроизведение {name} остановлено пользователем")
+        else:
+            self.log_message(f"Воспроизведение {name} завершено")
+        if self._last_track_done():
+            self.status_var.set("Воспроизведение остановлено" if stopped else "Воспроизведение завершено")
+    
+    def _playback_error(self, name, error_msg):
+        """Called when a track encounters an error"""
+        self.log_view.buffer.flush_rates()
+        if self._last_track_done():
+            self.status_var.set("Ошибка воспроизведения")
+        messagebox.showerror("Ошибка", f"Ошибка при воспроизведении: {error_msg}")
+        self.log_message(f"Ошибка воспроизведения {name}: {error_msg}", ERROR)
+    
+    def _last_track_done(self):
+        """Возвращает окно в режим ожидания, если дорожек не осталось"""
+        if self.scheduler.tracks():
+            self.update_playing_status()
+            return False
+        self.playing = False
+        self.paused = False
+        self.track = None
+        self.metrics_var.set(self.metrics.summary())
+        self.record_btn.config(state=tk.NORMAL)
+        self.stop_btn.config(state=tk.DISABLED)
+        self.pause_btn.config(text="Пауза", state=tk.DISABLED)
+        self.progress.stop()
+        return True
+    
+    def clear_events(self):
+        """Clear all recorded events"""
+        if self.recording or self.playing:
+            messagebox.showwarning("Предупреждение", "Невозможно очистить во время записи или воспроизведения")
+            return
+            
+        if messagebox.askyesno("Подтверждение", "Очистить все записанные события?"):
+            self.events = EventStore()
+            self.update_info()
+            self.log_view.clear()
+            self.log_message("Все события очищены")
+    
+    def on_closing(self):
+        """Handle application closing"""
+        # Отмена задач останавливает дорожки и ждет, пока они отпустят клавиши
+        self.runtime.close()
+        self.scheduler.stop()
+        self.stop_hotkeys()
+        if self.library_dialog is not None:
+            self.library_dialog.close()
+        
+        if self.recording:
+            # Задачу записи уже отменил runtime.close()
+            self._finish_recording()
+        self.input_hub.stop()
+        self.root.destroy()
+
+def main():
+    root = tk.Tk()
+    app = RecorderApp(root)
+    
+    # Handle window closing
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    
+    # Center window
+    root.eval('tk::PlaceWindow . center')
+    
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""Общие настройки тестов: pynput без дисплея, корень репозитория в sys.path"""
+import os
+import sys
+
+os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,29 @@
+from engine.capture import CaptureBuffer
+
+
+def test_drain_in_order_across_wrap():
+    buffer = CaptureBuffer(capacity=4)
+    for i in range(3):
+        buffer.push(i)
+    assert buffer.drain(2) == [0, 1]
+    # Запись уходит через конец массива слотов на его начало
+    for i in range(3, 6):
+        assert buffer.push(i)
+    assert len(buffer) == 4
+    assert buffer.drain() == [2, 3, 4, 5]
+    assert buffer.drain() == []
+    # Прочитанные слоты освобождены, чтобы не держать ссылки на записи
+    assert buffer._slots == [None] * 4
+
+
+def test_overflow_drops_new_items():
+    buffer = CaptureBuffer(capacity=2)
+    assert buffer.push('a') and buffer.push('b')
+    assert not buffer.push('c')
+    assert buffer.dropped == 1
+    assert buffer.drain() == ['a', 'b']
+    assert buffer.push('d')
+    assert buffer.drain() == ['d']
+    buffer.push('e')
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.dropped == 0
@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from engine.event_store import NO_COORD, EventStore
+
+
+def test_append_keeps_fields_and_stats():
+    store = EventStore()
+    version = store.version
+    store.append({'type': 'click', 'x': 10, 'y': 20, 'button': 'left', 'time': 1.0})
+    store.append({'type': 'key_hold', 'key': 'w', 'time': 0.5, 'duration': 2.0})
+    # Нестандартные значения уходят в extras и читаются как есть
+    store.append({'type': 'move', 'x': 1.5, 'y': 2 ** 40, 'time': 3.0, 'note': 'тест'})
+    store.append({'type': 'key_press', 'key': 'a'})
+    assert store.version == version + 4
+    assert len(store) == 4
+    assert store.type_counts == {'click': 1, 'key_hold': 1, 'move': 1, 'key_press': 1}
+    assert store.duration == pytest.approx(2.5)
+    assert store.to_dicts() == [
+        {'type': 'click', 'x': 10, 'y': 20, 'button': 'left', 'time': 1.0},
+        {'type': 'key_hold', 'key': 'w', 'time': 0.5, 'duration': 2.0},
+        {'type': 'move', 'x': 1.5, 'y': 2 ** 40, 'time': 3.0, 'note': 'тест'},
+        {'type': 'key_press', 'key': 'a'},
+    ]
+    # Время шло назад и есть событие без времени: поиск идет перебором
+    assert store.index_at_time(0.7) == 0
+    assert store.index_at_time(2.0) == 2
+
+
+def test_extend_columns_matches_append():
+    events = [{'type': 'click', 'x': 5, 'y': 6, 'button': 'right', 'time': 0.0},
+              {'type': 'key_press', 'key': 'b', 'time': 0.25},
+              {'type': 'text', 'text': 'привет', 'time': 0.5}]
+    store = EventStore.from_dicts(events[:1])
+    # Номера типов и строк - в таблицах пачки, не хранилища
+    store.extend_columns(['text', 'key_press'], [None, 'b'], [1, 0], [0.25, 0.5],
+                         [NO_COORD] * 2, [NO_COORD] * 2, [1, 0], [0, 0], [math.nan] * 2,
+                         extras={1: {'text': 'привет'}})
+    assert store.to_dicts() == EventStore.from_dicts(events).to_dicts()
+    assert store.type_counts == {'click': 1, 'key_press': 1, 'text': 1}
+    assert store.duration == 0.5
+    assert store.index_at_time(0.3) == 2
+
+
+def test_record_views():
+    store = EventStore.from_dicts([{'type': 'key_press', 'key': 'a', 'time': float(i)}
+                                   for i in range(3)])
+    record = store[-1]
+    assert record['time'] == 2.0 and record.get('x') is None
+    assert 'x' not in record and list(record) == ['type', 'key', 'time']
+    assert len(record) == 3
+    with pytest.raises(KeyError):
+        record['button']
+    with pytest.raises(IndexError):
+        store[3]
+    assert [r['time'] for r in store[1:]] == [1.0, 2.0]
+    assert dict(record) == record.to_dict() == {'type': 'key_press', 'key': 'a', 'time': 2.0}
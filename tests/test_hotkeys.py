@@ -0,0 +1,38 @@
+import threading
+
+from engine.backend import RecordingBackend
+from engine.hotkeys import POLICY_QUEUE, POLICY_RESTART, Binding, HotkeyManager
+from engine.plan import compile_plan
+from engine.tracks import TrackScheduler
+
+
+def _manager(plan, policy, finished):
+    scheduler = TrackScheduler(backend=RecordingBackend())
+    binding = Binding('<ctrl>+1', 'macro.json', policy=policy)
+    binding.plan = plan
+    manager = HotkeyManager(scheduler, [binding],
+                            on_finished=lambda b, stopped, report: finished.append(stopped))
+    return manager, binding
+
+
+def test_empty_plan_does_not_deadlock():
+    finished = []
+    manager, binding = _manager(compile_plan([]), POLICY_RESTART, finished)
+    worker = threading.Thread(target=manager.trigger, args=(binding,), daemon=True)
+    worker.start()
+    worker.join(2.0)
+    assert not worker.is_alive()
+    assert finished == [False]
+
+
+def test_queue_replays_after_finish():
+    finished = []
+    plan = compile_plan([{'type': 'key_press', 'key': 'a', 'time': 0.0},
+                         {'type': 'key_press', 'key': 'b', 'time': 0.05}])
+    manager, binding = _manager(plan, POLICY_QUEUE, finished)
+    manager.trigger(binding)
+    manager.trigger(binding)
+    assert binding.queued == 1
+    manager.scheduler.join(2.0)
+    assert finished == [False, False]
+    assert manager.latency.count == 2
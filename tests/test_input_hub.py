@@ -0,0 +1,53 @@
+from engine.input_hub import InputHub
+
+
+def test_subscribers_get_only_their_events():
+    hub = InputHub()
+    keys, clicks = [], []
+    keyboard = hub.subscribe(on_press=keys.append, on_release=keys.append)
+    mouse = hub.subscribe(on_click=lambda x, y, button, pressed: clicks.append((x, y, pressed)))
+    hub.on_press('a')
+    hub.on_click(1, 2, 'left', True)
+    hub.on_release('a')
+    hub.on_move(5, 5)
+    assert keys == ['a', 'a']
+    assert clicks == [(1, 2, True)]
+    assert keyboard.error is None and mouse.error is None
+
+
+def test_unsubscribe_stops_delivery():
+    hub = InputHub()
+    first, second = [], []
+    subscription = hub.subscribe(on_press=first.append)
+    hub.subscribe(on_press=second.append)
+    hub.on_press('a')
+    subscription.cancel()
+    hub.on_press('b')
+    # Повторная отписка ничего не ломает
+    hub.unsubscribe(subscription)
+    assert first == ['a']
+    assert second == ['a', 'b']
+
+
+def test_failing_subscriber_does_not_block_others():
+    hub = InputHub()
+    received = []
+
+    def broken(key):
+        raise RuntimeError("сбой")
+    failing = hub.subscribe(on_press=broken)
+    hub.subscribe(on_press=received.append)
+    hub.on_press('a')
+    assert isinstance(failing.error, RuntimeError)
+    assert received == ['a']
+
+
+def test_move_interval_throttles_one_subscriber():
+    hub = InputHub()
+    throttled, every = [], []
+    hub.subscribe(on_move=lambda x, y: throttled.append(x), move_interval=60)
+    hub.subscribe(on_move=lambda x, y: every.append(x))
+    for x in range(5):
+        hub.on_move(x, 0)
+    assert throttled == [0]
+    assert every == [0, 1, 2, 3, 4]
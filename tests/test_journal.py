@@ -0,0 +1,99 @@
+import os
+import time
+
+from engine.journal import (RecordingJournal, discard_journal, has_journal, list_journals,
+                            recover_journal)
+
+
+def _batch(start, count=3):
+    return [{'type': 'key_press', 'key': 'a', 'time': (start + i) * 0.1} for i in range(count)]
+
+
+def _journal(directory, batches, **options):
+    """Каждая пачка - отдельный кадр: следующая отдается, когда записана предыдущая"""
+    journal = RecordingJournal(str(directory), flush_interval=0.01, **options)
+    journal.start()
+    written = 0
+    for batch in batches:
+        journal.append(batch)
+        written += len(batch)
+        deadline = time.monotonic() + 2.0
+        while journal.events_written < written and time.monotonic() < deadline:
+            time.sleep(0.001)
+    return journal
+
+
+def _write(directory, batches, **options):
+    """Пишет журнал сессии -> (папка сессии, ее сегменты)"""
+    journal = _journal(directory, batches, **options)
+    journal.close()
+    assert journal.error is None
+    return journal.path, sorted(os.path.join(journal.path, name) for name in os.listdir(journal.path))
+
+
+def _times(store):
+    return [round(event['time'], 6) for event in store]
+
+
+def test_recover_full_journal(tmp_path):
+    batches = [_batch(0), _batch(3), _batch(6)]
+    session, _ = _write(tmp_path, batches)
+    assert has_journal(str(tmp_path))
+    assert list_journals(str(tmp_path)) == [session]
+    assert _times(recover_journal(session)) == _times(sum(batches, []))
+
+
+def test_truncated_tail_frame_is_dropped(tmp_path):
+    batches = [_batch(0), _batch(3)]
+    session, (path,) = _write(tmp_path, batches)
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        f.truncate(size - 5)
+    assert _times(recover_journal(session)) == _times(batches[0])
+
+
+def test_corrupt_frame_stops_segment(tmp_path):
+    batches = [_batch(0), _batch(3), _batch(6)]
+    session, (path,) = _write(tmp_path, batches)
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    # Портим байт полезной нагрузки второго кадра: crc не сойдется
+    second = data.index(b'MRJF', 4)
+    data[second + 20] ^= 0xFF
+    with open(path, 'wb') as f:
+        f.write(data)
+    assert _times(recover_journal(session)) == _times(batches[0])
+
+
+def test_segments_and_discard(tmp_path):
+    batches = [_batch(0), _batch(3), _batch(6)]
+    session, paths = _write(tmp_path, batches, segment_bytes=1)
+    assert len(paths) > 1
+    assert _times(recover_journal(session)) == _times(sum(batches, []))
+    discard_journal(session)
+    assert not os.path.exists(session)
+    assert not has_journal(str(tmp_path))
+
+
+def test_discard_keeps_other_sessions(tmp_path):
+    # Прошлая запись сохраняется в фоне, пока идет следующая
+    left, _ = _write(tmp_path, [_batch(0)])
+    saved = _journal(tmp_path, [_batch(3)])
+    live = _journal(tmp_path, [_batch(6)])
+    saved.discard()
+    live.append(_batch(9))
+    live.close()
+    assert live.error is None
+    assert list_journals(str(tmp_path)) == sorted([left, live.path])
+    assert _times(recover_journal(live.path)) == _times(_batch(6) + _batch(9))
+    assert _times(recover_journal(left)) == _times(_batch(0))
+
+
+def test_legacy_flat_journal(tmp_path):
+    session, (path,) = _write(tmp_path, [_batch(0)])
+    os.replace(path, tmp_path / os.path.basename(path))
+    os.rmdir(session)
+    assert list_journals(str(tmp_path)) == [str(tmp_path)]
+    assert _times(recover_journal(str(tmp_path))) == _times(_batch(0))
+    discard_journal(str(tmp_path))
+    assert not has_journal(str(tmp_path))
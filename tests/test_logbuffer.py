@@ -0,0 +1,61 @@
+import pytest
+
+from engine import logbuffer
+from engine.logbuffer import DEBUG, ERROR, INFO, LogBuffer
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(logbuffer, 'time', clock)
+    return clock
+
+
+def _texts(lines):
+    return [(level, text) for _, level, text in lines]
+
+
+def test_rate_limit_per_key(clock):
+    log = LogBuffer(rate_per_sec=3)
+    shown = [log.add(f"шаг {i}", key='step') for i in range(5)]
+    assert shown == [True, True, True, False, False]
+    # Другой вид и сообщения без ключа не ограничиваются
+    assert log.add("ошибка", ERROR, key='error')
+    assert all(log.add("без ключа") for _ in range(5))
+    assert log.suppressed == 2
+    clock.now += 1.0
+    assert log.add("шаг 5", key='step')
+    lines, overflowed = log.drain()
+    assert overflowed == 0
+    assert _texts(lines)[-2:] == [(DEBUG, "step: пропущено сообщений: 2"), (INFO, "шаг 5")]
+    assert len(lines) == 3 + 1 + 5 + 2
+
+
+def test_flush_rates_reports_skipped(clock):
+    log = LogBuffer(rate_per_sec=1)
+    log.add("a", key='step')
+    log.add("b", key='step')
+    log.add("c", key='other')
+    log.flush_rates()
+    assert _texts(log.drain()[0]) == [(INFO, "a"), (INFO, "c"), (DEBUG, "step: пропущено сообщений: 1")]
+    # После итога окно начинается заново
+    assert log.add("d", key='step')
+    log.flush_rates()
+    assert _texts(log.drain()[0]) == [(INFO, "d")]
+
+
+def test_ring_drops_oldest():
+    log = LogBuffer(capacity=3)
+    log.add_many([str(i) for i in range(5)])
+    lines, overflowed = log.drain()
+    assert [text for _, _, text in lines] == ['2', '3', '4']
+    assert overflowed == 2
+    assert log.drain() == ([], 0)
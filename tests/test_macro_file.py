@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from engine import macro_file
+from engine.event_store import EventStore
+from engine.macro_file import (MAGIC, MacroFile, MacroFormatError, load_macro_file, read_header,
+                               read_json_header, save_macro_file, write_binary)
+
+EVENTS = [
+    {'type': 'move', 'x': -5, 'y': 3000, 'time': 0.0},
+    {'type': 'click', 'x': 100, 'y': 200, 'button': 'left', 'time': 0.123456},
+    {'type': 'key_press', 'key': 'Key.space', 'time': 0.5},
+    {'type': 'key_hold', 'key': 'w', 'time': 1.0, 'duration': 2.25},
+    {'type': 'text', 'text': 'привет', 'time': 3.0},
+    {'type': 'key_press', 'key': 'q'},
+]
+
+
+def _events(store_or_list):
+    events = [dict(event) for event in store_or_list]
+    for event in events:
+        if 'time' in event:
+            event['time'] = round(event['time'], 6)
+    return events
+
+
+def _store():
+    store = EventStore.from_dicts(EVENTS)
+    store.resolution = (2560, 1440)
+    return store
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_binary_roundtrip(tmp_path, compress):
+    path = str(tmp_path / 'macro.mrec')
+    # Маленькие блоки: события делятся на несколько независимых блоков
+    write_binary(path, _store(), {'game': 'CS2'}, compress=compress, block_size=4)
+    metadata, store = load_macro_file(path)
+    assert _events(store) == _events(EVENTS)
+    assert store.resolution == (2560, 1440)
+    assert metadata['game'] == 'CS2'
+    with MacroFile(path) as macro:
+        assert len(macro.blocks) == 2
+        assert _events(macro.read_block(1)) == _events(EVENTS[4:])
+        assert macro.block_for_time(3.5) == 1
+        assert _events(macro.iter_events()) == _events(EVENTS)
+
+
+def test_failed_write_keeps_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'macro.mrec')
+    write_binary(path, _store(), {'name': 'старый'})
+
+    def broken(*args):
+        raise OSError("диск заполнен")
+    monkeypatch.setattr(macro_file, '_encode_block', broken)
+    with pytest.raises(OSError):
+        write_binary(path, _store(), {'name': 'новый'})
+    assert os.listdir(tmp_path) == ['macro.mrec']
+    assert read_header(path)['name'] == 'старый'
+
+
+def test_read_header_without_events(tmp_path):
+    path = str(tmp_path / 'macro.mrec')
+    save_macro_file(path, _store(), {'name': 'тест'})
+    header = read_header(path)
+    assert header['name'] == 'тест'
+    assert header['events_count'] == len(EVENTS)
+    assert header['type_counts']['key_press'] == 2
+    assert header['duration'] == pytest.approx(3.0)
+    # Заголовок читается, даже если события и индекс обрезаны
+    with open(path, 'rb') as f:
+        data = f.read()
+    header_end = 10 + int.from_bytes(data[6:10], 'little')
+    with open(path, 'wb') as f:
+        f.write(data[:header_end + 3])
+    assert read_header(path)['name'] == 'тест'
+    with pytest.raises(MacroFormatError):
+        MacroFile(path)
+
+
+def test_not_a_macro(tmp_path):
+    path = tmp_path / 'macro.mrec'
+    path.write_bytes(b'XXXX' + bytes(20))
+    with pytest.raises(MacroFormatError):
+        read_header(str(path))
+    path.write_bytes(MAGIC)
+    with pytest.raises(MacroFormatError):
+        read_header(str(path))
+
+
+def test_json_roundtrip_and_header(tmp_path):
+    path = str(tmp_path / 'macro.json')
+    save_macro_file(path, _store(), {'game': 'OSU!'})
+    metadata, store = load_macro_file(path)
+    assert _events(store) == _events(EVENTS)
+    header = read_json_header(path)
+    assert header['game'] == 'OSU!'
+    assert header['events_count'] == len(EVENTS)
+    assert 'actions' not in header
@@ -0,0 +1,49 @@
+from engine.motion import MotionCompressor, interpolate_segment, simplify_path
+
+
+def _line(count, step=0.01):
+    return [(i * step, i * 10, i * 5) for i in range(count)]
+
+
+def test_simplify_straight_line_keeps_ends():
+    points = _line(50)
+    assert simplify_path(points) == [points[0], points[-1]]
+    assert simplify_path(points[:2]) == points[:2]
+    assert simplify_path(points, tolerance=0) == points
+
+
+def test_simplify_keeps_corners_within_tolerance():
+    # Угол и мелкое дрожание вдоль сторон: дрожание в пределах допуска уходит
+    points = [(i * 0.01, i * 10, i % 2) for i in range(10)]
+    points += [(0.1 + i * 0.01, 90 + i % 2, 10 + i * 10) for i in range(10)]
+    kept = simplify_path(points, tolerance=2.0)
+    assert kept[0] == points[0] and kept[-1] == points[-1]
+    assert (0.09, 90, 1) in kept
+    assert len(kept) <= 4
+    assert len(simplify_path(points, tolerance=0.5)) > len(kept)
+
+
+def test_interpolation_stays_in_segment():
+    points = interpolate_segment((0, 0), (0, 0), (100, 50), (100, 50), 1_000_000, 41_000_000)
+    times = [t for t, _, _ in points]
+    # Не включая начало, включая конец; шаг около 1/125 сек
+    assert times[0] > 1_000_000 and times[-1] == 41_000_000
+    assert times == sorted(times) and len(points) == 5
+    assert points[-1] == (41_000_000, 100, 50)
+    assert all(0 <= x <= 100 and 0 <= y <= 50 for _, x, y in points)
+
+
+def test_short_segment_is_a_jump():
+    assert interpolate_segment((0, 0), (0, 0), (7, 8), (9, 9), 0, 5_000_000) == [(5_000_000, 7, 8)]
+    assert interpolate_segment((0, 0), (0, 0), (7, 8), (9, 9), 5, 5) == [(5, 7, 8)]
+
+
+def test_compressor_splits_strokes_on_pause():
+    compressor = MotionCompressor()
+    for t, x, y in _line(10):
+        assert compressor.add(t, x, y) == []
+    # Пауза дольше stroke_gap завершает штрих
+    finished = compressor.add(1.0, 500, 500)
+    assert finished == [(0.0, 0, 0), (0.09, 90, 45)]
+    assert compressor.flush() == [(1.0, 500, 500)]
+    assert compressor.raw_count == 11 and compressor.kept_count == 3
@@ -0,0 +1,65 @@
+from engine.event_store import EventStore
+from engine.normalize import normalize_events
+
+
+def _normalize(events, **options):
+    store, report = normalize_events(EventStore.from_dicts(events), **options)
+    return list(store), report
+
+
+def test_untimed_clicks_are_kept():
+    events, report = _normalize([{'type': 'click', 'x': 10, 'y': 10, 'button': 'left'}] * 3)
+    assert len(events) == 3
+    assert report.duplicate_clicks == 0
+
+
+def test_untimed_keys_are_not_folded_or_merged():
+    events, report = _normalize([{'type': 'key_press', 'key': key} for key in 'zzx'], fold_text=True)
+    assert [(e['type'], e['key']) for e in events] == [('key_press', 'z'), ('key_press', 'z'),
+                                                       ('key_press', 'x')]
+    assert report.repeats_merged == 0
+    assert report.text_runs == 0
+
+
+def test_timed_game_taps_keep_rhythm_on_load():
+    taps = [{'type': 'key_press', 'key': key, 'time': i * 0.05} for i, key in enumerate('zxzx')]
+    events, report = _normalize(taps)
+    assert [(e['key'], e['time']) for e in events] == [(t['key'], t['time']) for t in taps]
+    assert report.removed == 0
+
+
+def test_fold_text_only_on_request():
+    typed = [{'type': 'key_press', 'key': key, 'time': i * 0.05} for i, key in enumerate('hello')]
+    events, _ = _normalize(typed)
+    assert len(events) == 5
+    events, report = _normalize(typed, fold_text=True)
+    assert [(e['type'], e['text']) for e in events] == [('text', 'hello')]
+    assert report.chars_folded == 5
+
+
+def test_autorepeat_and_hold():
+    events, report = _normalize([
+        {'type': 'key_press', 'key': 'w', 'time': 0.0},
+        {'type': 'key_press', 'key': 'w', 'time': 0.03},
+        {'type': 'key_press', 'key': 'w', 'time': 0.06},
+        {'type': 'key_release', 'key': 'w', 'time': 0.5},
+    ])
+    assert len(events) == 1
+    assert events[0]['type'] == 'key_hold'
+    assert events[0]['duration'] == 0.5
+    assert report.repeats_merged == 2
+
+
+def test_untimed_release_does_not_make_hold():
+    events, _ = _normalize([{'type': 'key_press', 'key': 'w'}, {'type': 'key_release', 'key': 'w'}])
+    assert [e['type'] for e in events] == ['key_press']
+
+
+def test_duplicate_timed_click_dropped():
+    events, report = _normalize([
+        {'type': 'click', 'x': 10, 'y': 10, 'button': 'left', 'time': 0.0},
+        {'type': 'click', 'x': 11, 'y': 10, 'button': 'left', 'time': 0.01},
+        {'type': 'click', 'x': 10, 'y': 10, 'button': 'left', 'time': 0.5},
+    ])
+    assert [e['time'] for e in events] == [0.0, 0.5]
+    assert report.duplicate_clicks == 1
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from engine.hotkeys import compile_macro_file
+from engine.macro_file import MacroFormatError
+from engine.plan import OP_KEY, OP_NOP, OP_TYPE
+from engine.plugins import PluginRegistry
+from engine.program import ProgramCompiler
+
+
+def _write(path, actions):
+    path.write_text(json.dumps({'actions': actions}), encoding='utf-8')
+    return str(path)
+
+
+def _keys(plan):
+    return [(offset, arg) for offset, op, arg, _, _, _ in plan.iter_steps() if op in (OP_KEY, OP_TYPE)]
+
+
+def test_repeat_unrolls_body(tmp_path):
+    path = _write(tmp_path / 'farm.json', [
+        {'type': 'repeat', 'count': 3, 'actions': [
+            {'type': 'key_press', 'key': 'a', 'time': 0.0},
+            {'type': 'key_press', 'key': 'b', 'time': 0.1},
+        ]},
+    ])
+    plan = ProgramCompiler().compile_file(path)
+    assert len(plan.segments) == 1
+    assert len(plan) == 6
+    keys = _keys(plan)
+    assert [key for _, key in keys] == ['a', 'b'] * 3
+    assert [offset for offset, _ in keys] == sorted(offset for offset, _ in keys)
+    assert plan.duration_ns == 3 * plan.segments[0][1]
+
+
+def test_call_label_and_wait(tmp_path):
+    _write(tmp_path / 'buy.json', [
+        {'type': 'label', 'name': 'покупка'},
+        {'type': 'key_press', 'key': 'b', 'time': 0.0},
+    ])
+    path = _write(tmp_path / 'main.json', [
+        {'type': 'call', 'macro': 'buy.json'},
+        {'type': 'wait', 'seconds': 1.5},
+        {'type': 'call', 'macro': 'buy.json'},
+    ])
+    plan = ProgramCompiler().compile_file(path)
+    # Вызванный файл компилируется один раз
+    assert len(plan.routines) == 1
+    steps = list(plan.iter_steps())
+    assert [step[5] for step in steps if step[1] == OP_NOP] == ['раздел покупка'] * 2
+    first, second = [offset for offset, _ in _keys(plan)]
+    assert second - first >= 1.5e9
+
+
+def test_recursive_call_is_rejected(tmp_path):
+    _write(tmp_path / 'a.json', [{'type': 'call', 'macro': 'b.json'}])
+    _write(tmp_path / 'b.json', [{'type': 'call', 'macro': 'a.json'}])
+    with pytest.raises(MacroFormatError):
+        ProgramCompiler().compile_file(str(tmp_path / 'a.json'))
+
+
+def test_preset_needs_plugin(tmp_path):
+    path = _write(tmp_path / 'osu.json', [{'type': 'preset', 'name': 'Быстрое кликание'}])
+    with pytest.raises(MacroFormatError):
+        ProgramCompiler().compile_file(path)
+
+
+def test_preset_from_plugin(tmp_path):
+    registry = PluginRegistry()
+    plugin, _ = registry.get('OSU!')
+    path = _write(tmp_path / 'osu.json', [
+        {'type': 'repeat', 'count': 2, 'actions': [{'type': 'preset', 'name': 'Быстрое кликание'}]},
+    ])
+    plan = ProgramCompiler(plugin, registry).compile_file(path)
+    preset = registry.preset(plugin, 'Быстрое кликание')
+    assert [key for _, key in _keys(plan)] == [a['key'] for a in preset['actions']] * 2
+
+
+def test_hotkey_compile_resolves_presets(tmp_path):
+    plugin, _ = PluginRegistry().get('OSU!')
+    path = _write(tmp_path / 'osu.json', [{'type': 'preset', 'name': 'Быстрое кликание'}])
+    plan = compile_macro_file(path, plugin)
+    assert len(plan) > 0
+
+
+@pytest.mark.parametrize('block', [
+    {'type': 'repeat', 'count': -2, 'actions': [{'type': 'key_press', 'key': 'a', 'time': 0.0}]},
+    {'type': 'repeat', 'count': 'много', 'actions': []},
+    {'type': 'wait', 'seconds': -1},
+    {'type': 'wait'},
+])
+def test_negative_or_bad_numbers_are_rejected(tmp_path, block):
+    path = _write(tmp_path / 'bad.json', [block])
+    with pytest.raises(MacroFormatError):
+        ProgramCompiler().compile_file(path)
+
+
+def test_zero_repeat_is_skipped(tmp_path):
+    path = _write(tmp_path / 'skip.json', [
+        {'type': 'repeat', 'count': 0, 'actions': [{'type': 'key_press', 'key': 'a', 'time': 0.0}]},
+        {'type': 'key_press', 'key': 'b', 'time': 0.0},
+    ])
+    plan = ProgramCompiler().compile_file(path)
+    assert len(plan) == 1
+    assert [key for _, key in _keys(plan)] == ['b']
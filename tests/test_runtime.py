@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from pynput.keyboard import KeyCode
+
+from engine.capture import CaptureBuffer
+from engine.recording import RecordingSession
+from engine.runtime import Runtime, record
+
+
+def _session(**options):
+    session = RecordingSession(use_journal=False, resolution=(1920, 1080), **options)
+    session.start(listen=False)
+    return session
+
+
+def test_record_until_stop_key():
+    session = _session()
+    batches = []
+    for char in 'ab':
+        session.on_press(KeyCode.from_char(char))
+    session.on_press(KeyCode.from_char('q'))
+    # После клавиши остановки ничего не пишется
+    session.on_press(KeyCode.from_char('c'))
+    asyncio.run(record(session, on_batch=lambda batch, messages: batches.append(batch)))
+    session.stop()
+    assert [event['key'] for event in session.events] == ['a', 'b']
+    assert sum(len(batch) for batch in batches) == 2
+    assert session.on_stop is None
+
+
+def test_request_stop_from_other_thread():
+    # Кнопка в окне: запрос из GUI-потока, задача записи - в цикле runtime
+    runtime = Runtime()
+    runtime.start()
+    session = _session()
+    try:
+        task = runtime.spawn(record(session, interval=1.0))
+        session.on_press(KeyCode.from_char('a'))
+        threading.Timer(0.05, session.request_stop).start()
+        task.result(2.0)
+    finally:
+        runtime.close()
+    session.stop()
+    assert [event['key'] for event in session.events] == ['a']
+
+
+def test_lost_stop_marker_does_not_hang():
+    session = _session()
+    session.capture = CaptureBuffer(capacity=1)
+
+    async def main():
+        task = asyncio.create_task(record(session, interval=1.0))
+        await asyncio.sleep(0)
+        # Буфер полон: метка остановки не влезает, остается только сигнал on_stop
+        session.on_press(KeyCode.from_char('a'))
+        session.request_stop()
+        await asyncio.wait_for(task, 2.0)
+    asyncio.run(main())
+    assert session.capture.dropped == 1
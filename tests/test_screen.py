@@ -0,0 +1,59 @@
+import pytest
+
+from engine import screen
+from engine.event_store import EventStore
+from engine.screen import ASPECT_FILL, ASPECT_STRETCH, mapping_for, remap_store
+
+EVENTS = [
+    {'type': 'click', 'x': 0, 'y': 0, 'button': 'left', 'time': 0.0},
+    {'type': 'move', 'x': 1920, 'y': 1080, 'time': 0.1},
+    {'type': 'key_press', 'key': 'a', 'time': 0.2},
+    {'type': 'move', 'x': 960.5, 'y': 540, 'time': 0.3},
+]
+
+
+def _store():
+    store = EventStore.from_dicts(EVENTS)
+    store.resolution = (1920, 1080)
+    return store
+
+
+def _points(store):
+    return [(event.get('x'), event.get('y')) for event in store]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    """Векторный путь, если NumPy установлен, и запасной на чистом Python"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(screen, 'np', None)
+
+
+def test_fit_keeps_aspect_and_centers(backend):
+    store = _store()
+    version = store.version
+    remap_store(store, mapping_for((1920, 1080), '1440x1440'))
+    # Поля сверху и снизу, отсутствующие координаты не трогаются
+    assert _points(store) == [(0, 315), (1440, 1125), (None, None), (720, 720)]
+    assert store.resolution == (1440, 1440)
+    assert store.version > version
+
+
+def test_stretch_and_fill(backend):
+    store = remap_store(_store(), mapping_for((1920, 1080), (960, 1080), ASPECT_STRETCH))
+    assert _points(store)[:2] == [(0, 0), (960, 1080)]
+    store = remap_store(_store(), mapping_for((1920, 1080), (960, 1080), ASPECT_FILL))
+    # Края по ширине обрезаются
+    assert _points(store)[:2] == [(-480, 0), (1440, 1080)]
+
+
+def test_same_or_unknown_resolution_is_untouched():
+    assert mapping_for((1920, 1080), '1920x1080') is None
+    assert mapping_for(None, (1920, 1080)) is None
+    store = _store()
+    version = store.version
+    assert remap_store(store, None) is store
+    assert store.version == version
+    assert _points(store) == [(e.get('x'), e.get('y')) for e in EVENTS]
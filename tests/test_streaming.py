@@ -0,0 +1,35 @@
+from engine.event_store import EventStore
+from engine.macro_file import save_macro_file
+from engine.plan import compile_plan
+from engine.streaming import StreamingPlan
+
+EVENTS = [
+    {'type': 'key_press', 'key': 'a', 'time': 0.0},
+    {'type': 'key_hold', 'key': 'w', 'time': 0.5, 'duration': 2.0},
+    {'type': 'move', 'x': 10, 'y': 10, 'time': 0.6},
+]
+
+
+def _save(tmp_path):
+    path = str(tmp_path / 'macro.mrec')
+    save_macro_file(path, EventStore.from_dicts(EVENTS))
+    return path
+
+
+def test_duration_includes_hold_release(tmp_path):
+    plan = StreamingPlan(_save(tmp_path))
+    try:
+        steps = list(plan.iter_steps())
+    finally:
+        plan.close()
+    assert plan.duration_ns == steps[-1][0]
+    assert plan.duration_ns == compile_plan(EventStore.from_dicts(EVENTS)).duration_ns
+
+
+def test_close_mid_pass_stops_reader(tmp_path):
+    plan = StreamingPlan(_save(tmp_path))
+    steps = plan.iter_steps()
+    next(steps)
+    reader = plan._read_ahead._thread
+    plan.close()
+    assert not reader.is_alive()
@@ -0,0 +1,74 @@
+import pytest
+
+from engine.event_store import EventStore
+from engine.timeline import INSERT_SPACING, Clip, Timeline
+
+
+def _store(keys, step=1.0):
+    return EventStore.from_dicts([{'type': 'key_press', 'key': key, 'time': i * step}
+                                  for i, key in enumerate(keys)])
+
+
+def _events(timeline):
+    return [(event['key'], round(event['time'], 6)) for event in timeline]
+
+
+def test_cut_closes_the_gap():
+    timeline = Timeline(_store('abcde'))
+    clip = timeline.cut(1, 3)
+    assert _events(timeline) == [('a', 0), ('d', 1), ('e', 2)]
+    assert len(clip) == 2 and clip.duration == 1.0
+
+
+def test_insert_at_start_keeps_events_apart():
+    timeline = Timeline(_store('abcd'))
+    timeline.insert(0, Clip.from_store(_store('xy')))
+    assert _events(timeline) == [('x', 0), ('y', 1), ('a', 1 + INSERT_SPACING),
+                                 ('b', 2 + INSERT_SPACING), ('c', 3 + INSERT_SPACING),
+                                 ('d', 4 + INSERT_SPACING)]
+
+
+def test_insert_in_middle_keeps_spacing():
+    timeline = Timeline(_store('abcd'))
+    timeline.insert(2, Clip.from_store(_store('xy')))
+    assert _events(timeline) == [('a', 0), ('b', 1), ('x', 2), ('y', 3), ('c', 4), ('d', 5)]
+
+
+def test_insert_at_end_and_gap():
+    timeline = Timeline(_store('ab'))
+    timeline.insert(2, Clip.from_store(_store('x')), gap=0.5)
+    assert _events(timeline) == [('a', 0), ('b', 1), ('x', 1 + INSERT_SPACING + 0.5)]
+
+
+def test_splice_replaces_range():
+    timeline = Timeline(_store('abcde'))
+    removed = timeline.splice(1, 3, Clip.from_store(_store('x')))
+    assert len(removed) == 2
+    assert _events(timeline) == [('a', 0), ('x', 1), ('d', 2), ('e', 3)]
+
+
+def test_retime_shifts_tail():
+    timeline = Timeline(_store('abcd'))
+    timeline.retime(1, 3, scale=2.0)
+    assert _events(timeline) == [('a', 0), ('b', 1), ('c', 3), ('d', 4)]
+    with pytest.raises(ValueError):
+        timeline.retime(0, 1, scale=0)
+
+
+def test_undo_redo_and_to_store():
+    store = _store('abcd')
+    timeline = Timeline(store)
+    original = _events(timeline)
+    timeline.cut(0, 2)
+    timeline.retime(0, 2, scale=0.5)
+    edited = _events(timeline)
+    assert timeline.undo() and timeline.undo()
+    assert not timeline.can_undo
+    assert _events(timeline) == original
+    assert timeline.redo() and timeline.redo()
+    assert _events(timeline) == edited
+    # Исходное хранилище не меняется, собранное совпадает со шкалой
+    assert [e['time'] for e in store] == [0.0, 1.0, 2.0, 3.0]
+    assert [(e['key'], round(e['time'], 6)) for e in timeline.to_store()] == edited
+    timeline.insert(0, Clip.from_store(_store('x')))
+    assert not timeline.can_redo
@@ -0,0 +1,161 @@
+import threading
+import time
+
+from engine.backend import RecordingBackend
+from engine.plan import compile_plan
+from engine.tracks import Track, TrackScheduler
+
+
+def _held(duration=1.0):
+    """Удержание клавиши на фоне нажатий раз в 10 мс"""
+    events = [{'type': 'key_hold', 'key': 'w', 'time': 0.0, 'duration': duration}]
+    events += [{'type': 'key_press', 'key': 'a', 'time': i * 0.01} for i in range(1, int(duration * 100))]
+    return compile_plan(events)
+
+
+def _taps(count, key='b'):
+    return compile_plan([{'type': 'key_press', 'key': key, 'time': i * 0.01} for i in range(count)])
+
+
+def _scheduler():
+    backend = RecordingBackend()
+    return TrackScheduler(backend=backend), backend
+
+
+def _track(plan, results, **options):
+    done = threading.Event()
+
+    def finished(stopped, report):
+        results.append(stopped)
+        done.set()
+
+    track = Track(plan, on_finished=finished, **options)
+    track.done = done
+    return track
+
+
+def _ops(backend, since=0):
+    return [(op, str(arg)) for when, op, arg in backend.calls if when >= since]
+
+
+def _keys(backend):
+    return [arg for op, arg in _ops(backend) if op != 'move']
+
+
+def test_stop_releases_held_keys():
+    scheduler, backend = _scheduler()
+    results = []
+    track = scheduler.add(_track(_held(), results))
+    time.sleep(0.05)
+    scheduler.stop()
+    assert track.done.wait(1.0)
+    scheduler.join(1.0)
+    assert results == [True]
+    assert _ops(backend)[-1] == ('release', 'w')
+    assert not track.held_keys
+    assert not scheduler.tracks()
+
+
+def test_pause_and_resume():
+    scheduler, backend = _scheduler()
+    results = []
+    track = scheduler.add(_track(_taps(10), results))
+    time.sleep(0.03)
+    scheduler.pause()
+    time.sleep(0.02)
+    assert scheduler.paused
+    paused_at = time.perf_counter_ns()
+    time.sleep(0.1)
+    assert not _ops(backend, paused_at)
+    scheduler.resume()
+    assert track.done.wait(1.0)
+    assert results == [False]
+    assert _keys(backend) == ['b'] * 10
+    # Шкала сдвинута на паузу: макрос на 0.09 с играл дольше паузы
+    assert track.shift_ns >= 100_000_000
+
+
+def test_pause_releases_and_repeats_held_key():
+    scheduler, backend = _scheduler()
+    results = []
+    track = scheduler.add(_track(_held(), results))
+    time.sleep(0.03)
+    requested = time.perf_counter_ns()
+    track.pause()
+    time.sleep(0.02)
+    assert ('release', 'w') in _ops(backend, requested)
+    requested = time.perf_counter_ns()
+    track.resume()
+    time.sleep(0.02)
+    assert _ops(backend, requested)[0] == ('press', 'w')
+    scheduler.stop()
+    assert track.done.wait(1.0)
+
+
+def test_add_while_running():
+    scheduler, backend = _scheduler()
+    results = []
+    first = scheduler.add(_track(_taps(20, 'a'), results))
+    time.sleep(0.05)
+    second = scheduler.add(_track(_taps(5, 'b'), results))
+    assert len(scheduler.tracks()) == 2
+    assert second.done.wait(1.0) and first.done.wait(1.0)
+    keys = _keys(backend)
+    assert keys.count('a') == 20 and keys.count('b') == 5
+    # Вторая дорожка доиграла раньше первой, а не после нее
+    assert keys[-1] == 'a'
+    assert results == [False, False]
+
+
+def test_add_while_paused_starts_paused():
+    scheduler, backend = _scheduler()
+    results = []
+    first = scheduler.add(_track(_held(), results))
+    time.sleep(0.02)
+    scheduler.pause()
+    second = scheduler.add(_track(_taps(3), results))
+    assert second.paused
+    time.sleep(0.05)
+    assert 'b' not in _keys(backend)
+    scheduler.resume()
+    assert second.done.wait(1.0)
+    assert _keys(backend).count('b') == 3
+    scheduler.stop()
+    assert first.done.wait(1.0)
+
+
+def test_pause_does_not_outlive_tracks():
+    scheduler, backend = _scheduler()
+    results = []
+    first = scheduler.add(_track(_held(), results))
+    scheduler.pause()
+    scheduler.stop()
+    assert first.done.wait(1.0)
+    scheduler.join(1.0)
+    second = scheduler.add(_track(_taps(2), results))
+    assert not second.paused
+    assert second.done.wait(1.0)
+
+
+def test_mouse_returns_after_finish():
+    scheduler, backend = _scheduler()
+    results = []
+    plan = compile_plan([{'type': 'click', 'x': 300, 'y': 400, 'button': 'left', 'time': 0.0}])
+    track = scheduler.add(_track(plan, results))
+    assert track.start_position == (0, 0)
+    assert track.done.wait(1.0)
+    assert _ops(backend)[-1] == ('move', '(0, 0)')
+
+
+def test_mouse_stays_after_stop_or_without_restore():
+    scheduler, backend = _scheduler()
+    results = []
+    track = scheduler.add(_track(_taps(2), results, restore_mouse=False))
+    assert track.done.wait(1.0)
+    track = scheduler.add(_track(compile_plan([
+        {'type': 'click', 'x': 300, 'y': 400, 'button': 'left', 'time': 0.0},
+        {'type': 'key_press', 'key': 'a', 'time': 1.0}]), results))
+    time.sleep(0.05)
+    scheduler.stop()
+    assert track.done.wait(1.0)
+    assert [op for op, _ in _ops(backend) if op == 'move'] == ['move']
@@ -0,0 +1,63 @@
+from engine.event_store import EventStore
+from engine.plugins import BasePlugin
+from engine.transform import (KeyRemapStage, OffsetStage, TransformCache, TransformPipeline,
+                              plugin_pipeline)
+
+
+class KeysPlugin(BasePlugin):
+    def __init__(self, keys):
+        self.keys = keys
+
+    def get_game_specific_keys(self):
+        return self.keys
+
+
+class ShiftPlugin(BasePlugin):
+    def process_batch(self, events):
+        return OffsetStage(5, 0)(events)
+
+    def has_batch_transform(self):
+        return True
+
+
+def test_key_remap_and_offset():
+    pipeline = TransformPipeline([KeyRemapStage({'jump': 'space', 'reload': 'r', 'shoot': 'left_click'}),
+                                  OffsetStage(10, -10)])
+    source = [{'type': 'key_press', 'key': 'jump'}, {'type': 'key_press', 'key': 'reload'},
+              {'type': 'key_press', 'key': 'shoot'}, {'type': 'click', 'x': 0, 'y': 20}]
+    events = pipeline.run(source)
+    assert [e.get('key') for e in events[:3]] == ['Key.space', 'r', 'shoot']
+    assert (events[3]['x'], events[3]['y']) == (10, 10)
+    # Исходные события не меняются
+    assert source[0]['key'] == 'jump' and source[3]['x'] == 0
+
+
+def test_empty_pipeline_returns_events_as_is():
+    events = [{'type': 'key_press', 'key': 'a'}]
+    assert TransformPipeline().run(events) is events
+
+
+def test_identity_mapping_adds_no_stage():
+    assert not plugin_pipeline(None)
+    assert not plugin_pipeline(KeysPlugin({}))
+    assert not plugin_pipeline(KeysPlugin({'z': 'z', 'Key.space': 'space', 'fire': 'left_click'}))
+    assert plugin_pipeline(KeysPlugin({'click_left': 'z'}))
+
+
+def test_cache_skips_copy_without_stages():
+    cache = TransformCache()
+    store = EventStore.from_dicts([{'type': 'key_press', 'key': 'z', 'time': 0.0}])
+    assert cache.get(store, KeysPlugin({'z': 'z'})) is store
+
+
+def test_cache_reuses_result_until_store_changes():
+    cache = TransformCache()
+    plugin = ShiftPlugin()
+    store = EventStore.from_dicts([{'type': 'click', 'x': 1, 'y': 1, 'button': 'left', 'time': 0.0}])
+    first = cache.get(store, plugin)
+    assert first[0]['x'] == 6
+    assert cache.get(store, plugin) is first
+    store.append({'type': 'click', 'x': 2, 'y': 2, 'button': 'left', 'time': 0.1})
+    second = cache.get(store, plugin)
+    assert second is not first
+    assert [e['x'] for e in second] == [6, 7]